@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify
 import copy
+import logging
+import os
+import threading
 from app.utils.jwt_utils import get_user_id_from_token
 from app.services.s3_service import get_config_from_s3, put_config_to_s3, is_s3_configured
 
@@ -172,11 +175,40 @@ def salvar_configuracoes():
         if not ok2:
             _log.warning("[Configuracoes] S3 put_config_to_s3 falhou para default")
 
+    if 'autonomia' in data:
+        notificar_invalidacao_regras()
+
     return jsonify({
         'message': 'Configurações salvas com sucesso',
         'configuracoes': configuracoes_usuario[user_id]
     }), 200
 
+
+def notificar_invalidacao_regras():
+    """
+    Avisa o(s) langgraph-app (LANGGRAPH_APP_URLS, separados por vírgula) que as regras de
+    handoff mudaram: eles guardam as regras em cache (TTL) e passam a buscá-las de novo.
+    Roda em segundo plano para não atrasar o salvamento; sem a variável, o cache expira pelo TTL.
+    """
+    urls = [u.strip().rstrip('/') for u in os.getenv('LANGGRAPH_APP_URLS', '').split(',') if u.strip()]
+    if not urls:
+        return
+    headers = {}
+    token = os.getenv('REGRAS_CACHE_INVALIDATE_TOKEN')
+    if token:
+        headers['X-Invalidate-Token'] = token
+
+    def notificar():
+        import requests
+        for url in urls:
+            try:
+                # Sem user_id: regras_redirecionamento serve sempre as de 'default'
+                requests.post(f"{url}/cache/regras_redirecionamento/invalidate", json={}, headers=headers, timeout=3)
+            except Exception as e:
+                logging.getLogger(__name__).warning("[Configuracoes] Falha ao invalidar cache de regras em %s: %s", url, e)
+
+    threading.Thread(target=notificar, name='invalidar-regras', daemon=True).start()
+
 @configuracoes_bp.route('/api/configuracoes/regras_redirecionamento', methods=['GET'])
 def obter_regras_redirecionamento():
     """Retorna as regras de redirecionamento (handoff) e respostas permitidas. Usado pelo LangSmith/Studio.
@@ -204,6 +236,10 @@ def resetar_configuracoes():
         import logging
         logging.getLogger(__name__).warning("[Configuracoes] S3 put_config_to_s3 falhou no reset user_id=%s", user_id)
 
+    if user_id == 'default':
+        # As regras de handoff servidas ao langgraph-app são sempre as de 'default'
+        notificar_invalidacao_regras()
+
     return jsonify({
         'message': 'Configurações resetadas',
         'configuracoes': CONFIGURACOES_PADRAO
@@ -6,12 +6,28 @@ esperado pelo LangGraph Server e LangSmith Studio.
 Usa o grafo MessagesState diretamente.
 Injeta regras de redirecionamento (Autonomia) em config para o grafo.
 """
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, make_response
+from app.services.batch_runner import BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, run_batch
+from app.services.graph_introspection import GraphIntrospection
+from app.services import metrics, span_tracer
+from app.services.idempotency import IDEMPOTENCY_HEADER, IdempotencyConflict, IdempotencyStore, request_fingerprint
+from app.services.run_manager import MULTITASK_STRATEGIES, RunManager, RunQueueFull, ThreadBusy
+from app.services.run_registry import RunRegistry
+from app.services.single_flight import SingleFlight, coalesce_key
+from app.services.stream_serializer import StreamSerializer, dumps as fast_dumps, to_jsonable
+from app.services.tracing_mode import tracing
+from app.services.values_delta import MessagesDeltaEncoder, values_delta_requested
+from app.services.warmup import RetryBackoff, WarmupState
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 import uuid
 import json
 import logging
+import functools
+import hashlib
+import threading
+import time
 from datetime import datetime
+from itertools import islice
 
 logger = logging.getLogger(__name__)
 
@@ -47,12 +63,44 @@ def _inject_regras_redirecionamento(config: dict) -> None:
         config["configurable"]["regras_redirecionamento"] = regras
         respostas = autonomia.get("respostas") or CONFIGURACOES_PADRAO.get("autonomia", {}).get("respostas", {})
         config["configurable"]["respostas_permitidas"] = respostas
+        # Agent Builder: tools habilitadas e temperatura selecionam o modelo pré-vinculado no grafo
+        agent_builder = cfg.get("agent_builder", {}) or {}
+        if "tools_enabled" in agent_builder:
+            config["configurable"].setdefault("tools_enabled", agent_builder["tools_enabled"])
+        if agent_builder.get("temperature") is not None:
+            config["configurable"].setdefault("temperature", agent_builder["temperature"])
     except Exception as e:
         logger.warning("[LangGraphServer] Falha ao carregar regras de redirecionamento: %s", e)
         config["configurable"]["regras_redirecionamento"] = _DEFAULT_REGRAS_REDIRECIONAMENTO
         config["configurable"]["respostas_permitidas"] = CONFIGURACOES_PADRAO.get("autonomia", {}).get("respostas", {})
 
 
+def _get_thread_catalog():
+    """
+    Retorna o checkpointer do grafo se ele mantiver catálogo de threads (SqliteCheckpointSaver).
+    Com LANGGRAPH_CHECKPOINTER=memory não há catálogo e retorna None.
+    """
+    try:
+        checkpointer = getattr(get_graph(), "checkpointer", None)
+    except Exception as e:
+        logger.debug(f"[LangGraphServer] Catálogo de threads indisponível: {e}")
+        return None
+    return checkpointer if hasattr(checkpointer, "search_threads") else None
+
+
+def _catalog_thread_to_json(entry):
+    """Formata um registro do catálogo no formato de thread do LangGraph Server."""
+    return {
+        "thread_id": entry["thread_id"],
+        "created_at": entry["created_at"],
+        "updated_at": entry["updated_at"],
+        "metadata": entry["metadata"],
+        "status": entry["status"],
+        "values": {},
+        "last_message": entry["last_message"],
+    }
+
+
 # Funções helper para logging estruturado
 def log_request(endpoint_name, method, **kwargs):
     """
@@ -194,34 +242,145 @@ def validate_messages(messages):
     
     return True, None
 
-# Instância global do grafo (lazy loading)
+# Instância global do grafo (carregada no warmup ou na primeira requisição)
 _graph = None
 _graph_error = None
+_graph_lock = threading.Lock()
+# Após uma falha, novas tentativas com backoff exponencial (não guarda o erro para sempre)
+_graph_backoff = RetryBackoff.from_env()
 
 def get_graph():
-    """Obtém o grafo (singleton com lazy loading)"""
+    """
+    Obtém o grafo (singleton). Se o carregamento falhar, o erro é repetido até o fim
+    do backoff (LANGGRAPH_GRAPH_RETRY_BASE/MAX) e então o import é tentado de novo.
+    """
     global _graph, _graph_error
     
-    # Se já tentou carregar e falhou, retornar erro
-    if _graph_error is not None:
-        raise _graph_error
-    
     # Se já carregou, retornar
     if _graph is not None:
         return _graph
     
-    # Tentar carregar o grafo
+    with _graph_lock:
+        if _graph is not None:
+            return _graph
+        # Falhou há pouco: não tentar de novo antes do fim do backoff
+        if _graph_error is not None and not _graph_backoff.ready():
+            raise _graph_error
+        
+        # Tentar carregar o grafo
+        try:
+            from app.services.langgraph_graph import graph
+            _graph = graph
+            _graph_error = None
+            _graph_backoff.success()
+            logger.info("[LangGraphServer] Grafo inicializado com sucesso")
+            return _graph
+        except Exception as e:
+            _graph_error = e
+            delay = _graph_backoff.failure()
+            logger.error(f"[LangGraphServer] Erro ao inicializar grafo (tentativa {_graph_backoff.failures}, "
+                         f"nova tentativa em {delay:.1f}s): {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            raise
+
+
+# Variante sem checkpointer do grafo carregado: (grafo de origem, grafo compilado sem checkpointer)
+_stateless_graph = None
+
+
+def get_stateless_graph():
+    """
+    Grafo para runs stateless (/runs/wait, /runs/stream): mesmos nós e arestas, compilado
+    sem checkpointer. Nenhum checkpoint é serializado/gravado por nó e o run não precisa
+    de thread_id. Compilado uma vez a partir do builder do grafo principal.
+    """
+    global _stateless_graph
+    graph_instance = get_graph()
+    if getattr(graph_instance, "checkpointer", None) is None:
+        return graph_instance
+    if _stateless_graph is None or _stateless_graph[0] is not graph_instance:
+        stateless = graph_instance.builder.compile(name=graph_instance.name)
+        _stateless_graph = (graph_instance, stateless)
+        logger.info("[LangGraphServer] Variante stateless do grafo compilada (sem checkpointer)")
+    return _stateless_graph[1]
+
+
+# Introspecção do grafo carregado (estrutura, mermaid, schemas, subgrafos) com ETag
+_graph_introspection = None
+
+
+def get_graph_introspection():
+    """
+    GraphIntrospection do grafo atual. Calculada uma vez por instância do grafo: se o
+    grafo for recarregado (outra instância em _graph), é recriada e os ETags mudam.
+    """
+    global _graph_introspection
+    graph_instance = get_graph()
+    introspection = _graph_introspection
+    if introspection is None or introspection.graph is not graph_instance:
+        introspection = GraphIntrospection(graph_instance, graph_id="agent")
+        _graph_introspection = introspection
+    return introspection
+
+
+_warmup = WarmupState()
+
+
+def _warmup_bound_models():
+    """Pré-vincula as tools para o padrão e para as combinações do Agent Builder dos usuários."""
+    from app.services.langgraph_graph import bound_models
+    combos = [{}]
     try:
-        from app.services.langgraph_graph import graph
-        _graph = graph
-        logger.info("[LangGraphServer] Grafo inicializado com sucesso")
-        return _graph
+        from app.routes.configuracoes import configuracoes_usuario
     except Exception as e:
-        _graph_error = e
-        logger.error(f"[LangGraphServer] Erro ao inicializar grafo: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        raise
+        logger.warning(f"[LangGraphServer] Warmup: configurações dos usuários indisponíveis: {e}")
+        configuracoes_usuario = {}
+    for cfg in list(configuracoes_usuario.values()):
+        agent_builder = (cfg or {}).get("agent_builder") or {}
+        combos.append({
+            "temperature": agent_builder.get("temperature"),
+            "tools_enabled": agent_builder.get("tools_enabled"),
+        })
+    return {"bound_models": bound_models.warmup(combos)}
+
+
+def _warmup_regulacoes():
+    from app.services.regulacoes_service import get_regulacao, list_regulacoes
+    regulacoes = list_regulacoes()
+    for item in regulacoes:
+        get_regulacao(item["id"])
+    return {"regulacoes": len(regulacoes)}
+
+
+def warmup_graph():
+    """
+    Aquecimento no startup: carrega o grafo, compila a variante stateless, calcula os
+    schemas do Studio, vincula as tools e carrega as regulações. Cada fase tem a
+    duração registrada em GET /ready. Não levanta exceção: falhas ficam no estado de
+    prontidão e o grafo é tentado de novo com backoff (ver get_graph).
+    """
+    global _warmup
+    state = WarmupState()
+    if state.run_phase("graph", get_graph):
+        state.run_phase("stateless_graph", get_stateless_graph)
+        state.run_phase("schemas", lambda: {"version": get_graph_introspection().version})
+        state.run_phase("tools", _warmup_bound_models, required=False)
+    state.run_phase("regulacoes", _warmup_regulacoes, required=False)
+    state.finish()
+    _warmup = state
+    logger.info(f"[LangGraphServer] Warmup {'concluído' if state.ready else 'com falhas'} "
+                f"em {state.snapshot()['total_ms']:.1f} ms")
+    return state.ready
+
+
+def _conditional_response(payload, etag, mimetype="application/json"):
+    """Resposta com ETag; 304 quando If-None-Match bate com a versão em cache."""
+    body = payload if isinstance(payload, str) else fast_dumps(payload)
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 
 def convert_messages_to_json(messages):
@@ -250,10 +409,14 @@ def convert_messages_to_json(messages):
                     role = "tool"
             
             content = msg.content if hasattr(msg, 'content') else str(msg)
-            result.append({
+            converted = {
                 "role": role,
                 "content": content
-            })
+            }
+            # id estável da mensagem (add_messages atribui um id a cada mensagem do estado)
+            if getattr(msg, 'id', None):
+                converted["id"] = msg.id
+            result.append(converted)
         elif isinstance(msg, dict):
             # Já está no formato correto
             result.append(msg)
@@ -342,6 +505,416 @@ def convert_state_to_json(state_values):
         return state_values
 
 
+def _format_checkpoint_timestamp(created_at):
+    """Normaliza o timestamp de um checkpoint para ISO 8601 com Z."""
+    if not created_at:
+        return datetime.utcnow().isoformat() + "Z"
+    if isinstance(created_at, (int, float)):
+        return datetime.utcfromtimestamp(created_at).isoformat() + "Z"
+    if not created_at.endswith('Z') and '+' not in created_at:
+        return created_at + "Z"
+    return created_at
+
+
+def _state_snapshot_to_history_item(thread_id, state):
+    """Converte um StateSnapshot (get_state_history) no item de histórico do LangGraph Server."""
+    values = state.values or {}
+    configurable = (state.config or {}).get("configurable", {})
+    parent_configurable = (state.parent_config or {}).get("configurable", {}) if state.parent_config else None
+    return {
+        "values": {"messages": convert_messages_to_json(values.get("messages", []))},
+        "checkpoint": {
+            "thread_id": thread_id,
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+            "checkpoint_id": configurable.get("checkpoint_id"),
+            "checkpoint_map": configurable.get("checkpoint_map", {})
+        },
+        "metadata": convert_state_to_json(dict(state.metadata or {})),
+        "created_at": _format_checkpoint_timestamp(state.created_at),
+        "next": list(state.next or []),
+        "tasks": [{"id": task.id, "name": task.name} for task in (state.tasks or [])],
+        "parent_checkpoint": {
+            "thread_id": thread_id,
+            "checkpoint_ns": parent_configurable.get("checkpoint_ns", ""),
+            "checkpoint_id": parent_configurable.get("checkpoint_id"),
+        } if parent_configurable else None
+    }
+
+
+# Modos de stream suportados pelos endpoints de run (podem vir combinados em lista, como no Studio)
+_SUPPORTED_STREAM_MODES = ("values", "updates", "messages")
+# Nós cujos tokens de LLM são repassados no modo "messages" (classificadores do init ficam de fora)
+_TOKEN_STREAM_NODES = ("agent",)
+
+
+def _normalize_stream_modes(stream_mode):
+    """
+    Normaliza stream_mode (string ou lista) para a lista de modos aceitos pelo graph.stream.
+    "messages-tuple" (nome usado pelo SDK) é tratado como "messages"; modos desconhecidos são ignorados.
+    """
+    modes = stream_mode if isinstance(stream_mode, list) else [stream_mode or "values"]
+    result = []
+    for mode in modes:
+        mode = "messages" if mode == "messages-tuple" else mode
+        if mode in _SUPPORTED_STREAM_MODES and mode not in result:
+            result.append(mode)
+    return result or ["values"]
+
+
+def _sse_event(event_id, event, data):
+    """Formata um evento Server-Sent Events (JSON via orjson quando disponível)."""
+    return f"id: {event_id}\nevent: {event}\ndata: {fast_dumps(data)}\n\n"
+
+
+def _sse_event_id(text):
+    """Id numérico de um evento formatado por _sse_event (primeira linha "id: N")."""
+    return int(text.split("\n", 1)[0][len("id: "):])
+
+
+# Runs de stream executam no pool do RunManager; os handlers só acompanham os eventos
+# (buffer por run, com replay via Last-Event-ID em join_run_stream)
+_run_manager = RunManager.from_env()
+# Registro persistente dos runs (list_thread_runs / get_thread_run), atualizado a cada mudança de status
+_run_registry = RunRegistry.from_env()
+# Runs que ficaram pending/running num processo encerrado (reinício/queda) viram interrupted
+_run_registry.recover_stale()
+_run_manager.add_listener(_run_registry.on_run_status)
+# langgraph_runs_in_flight no /metrics: runs aguardando/executando neste worker
+metrics.registry.describe("langgraph_runs_in_flight", "gauge", "Runs aguardando ou executando no RunManager")
+metrics.registry.gauge_callback(lambda: [
+    ("langgraph_runs_in_flight", {"status": status}, count)
+    for status, count in _run_manager.metrics()["runs"].items() if status in ("pending", "running")
+])
+
+
+def _track_run(run_id, thread_id, assistant_id, config, metadata=None, parent_span=None):
+    """
+    Registra o run e anexa aos callbacks do config o contador de tokens do registro,
+    as métricas de nós/LLM/tools do /metrics e, se a requisição estiver sendo
+    gravada, os spans do tracing local (filhos de parent_span ou do span da requisição).
+    O run_id também vai para a metadata dos checkpoints gravados pelo run (usado no rollback).
+    """
+    _run_registry.create(run_id, thread_id, assistant_id, metadata)
+    config.setdefault("metadata", {})["run_id"] = run_id
+    handlers = [_run_registry.track_usage(run_id), metrics.metrics_callback]
+    span_handler = span_tracer.callback_handler(parent_span)
+    if span_handler is not None:
+        handlers.append(span_handler)
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        config["callbacks"] = handlers
+    elif isinstance(callbacks, list):
+        config["callbacks"] = callbacks + handlers
+    else:
+        for handler in handlers:
+            callbacks.add_handler(handler)
+
+
+# Respostas/runs por Idempotency-Key (POST /threads, /threads/<id>/runs/stream, /runs/wait)
+_idempotency = IdempotencyStore.from_env()
+# Quanto uma repetição espera pela requisição original ainda em andamento
+_IDEMPOTENCY_WAIT_SECONDS = 300
+
+
+def _replay_idempotent(result):
+    """Resposta para uma repetição com a mesma Idempotency-Key."""
+    if result["kind"] == "stream":
+        run = _run_manager.get(result["run_id"])
+        headers = {**result["headers"], 'Idempotent-Replayed': 'true'}
+        if run is not None:
+            # Acompanha o run já criado desde o primeiro evento, sem executar o grafo de novo
+            return Response(metrics.track_sse(_run_manager.subscribe(run, -1, "continue")), mimetype='text/event-stream', headers=headers)
+        # Eventos já expiraram: devolve o registro do run
+        run_data = _run_registry.get(result["run_id"])
+        if run_data is None:
+            return jsonify({"error": "Run não encontrado", "message": f"Run {result['run_id']} expirou"}), 404
+        return jsonify(run_data), 200, {'Idempotent-Replayed': 'true', 'X-Run-ID': result["run_id"]}
+    response = Response(result["body"], status=result["status"], mimetype=result["mimetype"])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _idempotency_caller():
+    """
+    Dono da chave de idempotência: user_id do token (Authorization), senão
+    config.configurable.user_id do corpo, senão "anonymous". Chaves iguais de
+    usuários diferentes não se misturam.
+    """
+    token = (request.headers.get("Authorization") or "").replace("Bearer ", "").strip()
+    user_id = None
+    if token:
+        try:
+            from app.utils.jwt_utils import get_user_id_from_token
+            user_id = get_user_id_from_token(token)
+        except Exception as e:
+            logger.debug(f"[LangGraphServer] Idempotency-Key: token não decodificado: {e}")
+        if not user_id or user_id == "default":
+            # Token opaco: o próprio token (hash) identifica o chamador
+            return "token:" + hashlib.sha256(token.encode()).hexdigest()[:32]
+    if not user_id:
+        body = request.get_json(force=True, silent=True)
+        configurable = ((body.get("config") or {}).get("configurable") or {}) if isinstance(body, dict) else {}
+        user_id = configurable.get("user_id") if isinstance(configurable, dict) else None
+    return f"user:{user_id}" if user_id else "anonymous"
+
+
+def idempotent(view):
+    """
+    Aplica o header Idempotency-Key a um endpoint POST (ver app/services/idempotency.py).
+    Respostas JSON 2xx são guardadas; respostas de stream guardam o run_id e as repetições
+    acompanham o mesmo run. Respostas de erro (409/429/503, 5xx...) liberam a chave para a
+    próxima tentativa. A chave vale por chamador e rota. Sem o header, o endpoint se
+    comporta como antes.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or request.method != 'POST':
+            return view(*args, **kwargs)
+        scoped_key = f"{_idempotency_caller()}:{request.path}:{key}"
+        fingerprint = request_fingerprint(request.method, request.path, request.get_data(cache=True))
+        while True:
+            try:
+                entry, owner = _idempotency.begin(scoped_key, fingerprint)
+            except IdempotencyConflict as e:
+                return jsonify({"error": "Idempotency-Key em conflito", "message": str(e)}), 422
+            if owner:
+                break
+            logger.info(f"[LangGraphServer] Repetição com Idempotency-Key {key} em {request.path}")
+            if not entry.done.wait(_IDEMPOTENCY_WAIT_SECONDS):
+                return jsonify({
+                    "error": "Requisição original ainda em andamento",
+                    "message": f"Idempotency-Key {key} ainda está sendo processada"
+                }), 409
+            if entry.result is not None:
+                return _replay_idempotent(entry.result)
+            # A requisição original falhou e liberou a chave: esta executa
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _idempotency.release(scoped_key, entry)
+            raise
+        run_id = response.headers.get('X-Run-ID')
+        if not 200 <= response.status_code < 300 or (response.is_streamed and not run_id):
+            _idempotency.release(scoped_key, entry)
+        elif response.is_streamed:
+            headers = {k: v for k, v in response.headers.items() if k.startswith('X-') or k == 'Cache-Control'}
+            _idempotency.complete(scoped_key, entry, {"kind": "stream", "run_id": run_id, "headers": headers})
+        else:
+            _idempotency.complete(scoped_key, entry, {
+                "kind": "response",
+                "status": response.status_code,
+                "body": response.get_data(),
+                "mimetype": response.mimetype,
+            })
+        return response
+    return wrapper
+
+
+# Coalescência de /runs/wait idênticos (LANGGRAPH_COALESCE_RUNS / LANGGRAPH_COALESCE_TTL)
+_single_flight = SingleFlight.from_env()
+
+
+def _rollback_checkpoint_id(graph_instance, thread_id, run_ids):
+    """Checkpoint mais recente da thread que não foi gravado pelos runs descartados (run_ids)."""
+    checkpointer = getattr(graph_instance, "checkpointer", None)
+    if checkpointer is None:
+        return None
+    for checkpoint in checkpointer.list({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}):
+        if (checkpoint.metadata or {}).get("run_id") not in run_ids:
+            return checkpoint.config["configurable"]["checkpoint_id"]
+    return None
+
+
+def _multitask_strategy(data):
+    """multitask_strategy do corpo da requisição (padrão reject). Retorna (estratégia, None) ou (None, resposta 400)."""
+    multitask_strategy = data.get("multitask_strategy") or "reject"
+    if multitask_strategy not in MULTITASK_STRATEGIES:
+        return None, (jsonify({
+            "error": "multitask_strategy inválido",
+            "message": f"Use um de {list(MULTITASK_STRATEGIES)}, recebido: {multitask_strategy}"
+        }), 400)
+    return multitask_strategy, None
+
+
+def _prepare_rollback(graph_instance, thread_id, config, multitask_strategy):
+    """
+    rollback: o novo run parte do checkpoint anterior aos runs em andamento na thread.
+    Retorna os run_ids que serão descartados (removidos do registro quando o novo run for admitido).
+    """
+    if multitask_strategy != "rollback" or not thread_id:
+        return []
+    rolled_back = [run.run_id for run in _run_manager.active_runs(thread_id)]
+    base_checkpoint_id = _rollback_checkpoint_id(graph_instance, thread_id, rolled_back) if rolled_back else None
+    if base_checkpoint_id:
+        config["configurable"]["checkpoint_id"] = base_checkpoint_id
+    return rolled_back
+
+
+def _submit_run(events, run_id, thread_id, assistant_id, multitask_strategy="reject", rolled_back=()):
+    """
+    Enfileira o run no RunManager (admissão por thread + limite da fila) e devolve o Run.
+    Levanta ThreadBusy/RunQueueFull (o registro do run é removido/marcado como error).
+    Não depende do contexto da requisição: também é usado pelas threads de /runs/batch.
+    """
+    # O run executa no pool: leva junto a decisão de tracing da requisição (modo sampled)
+    events = tracing.bind_events(events)
+    try:
+        run = _run_manager.submit(run_id, events, thread_id=thread_id, assistant_id=assistant_id,
+                                  event_id=_sse_event_id, multitask_strategy=multitask_strategy)
+    except ThreadBusy:
+        _run_registry.delete(run_id)
+        raise
+    except RunQueueFull as e:
+        _run_registry.update_status(run_id, "error", str(e))
+        raise
+    for previous_run_id in rolled_back:
+        _run_registry.delete(previous_run_id)
+    return run
+
+
+def _admission_error_response(error, endpoint_name):
+    """Resposta para um run recusado na admissão: 409 (thread ocupada) ou 503 (fila cheia)."""
+    logger.warning(f"[LangGraphServer] {endpoint_name}: {error}")
+    if isinstance(error, ThreadBusy):
+        return jsonify({"error": "Thread ocupada", "message": str(error)}), 409
+    return jsonify({"error": "Servidor ocupado", "message": str(error)}), 503, {"Retry-After": "5"}
+
+
+def _submit_stream_run(events, run_id, thread_id, assistant_id, on_disconnect, headers, endpoint_name,
+                       multitask_strategy="reject", rolled_back=()):
+    """Enfileira o run no RunManager e devolve a Response SSE que acompanha seus eventos."""
+    try:
+        run = _submit_run(events, run_id, thread_id, assistant_id, multitask_strategy, rolled_back)
+    except (ThreadBusy, RunQueueFull) as e:
+        return _admission_error_response(e, endpoint_name)
+    return Response(
+        metrics.track_sse(_run_manager.subscribe(run, on_disconnect=on_disconnect)),
+        mimetype='text/event-stream',
+        headers=headers
+    )
+
+
+def _invoke_run(graph_instance, graph_input, config, run_id, thread_id, assistant_id,
+                multitask_strategy="reject", rolled_back=()):
+    """
+    Executa o grafo como run do RunManager e espera o estado final (endpoints que respondem JSON
+    e itens de /runs/batch). Assim eles também passam pelo pool limitado, pela fila e pela
+    admissão por thread. O grafo roda com stream_mode="values" para que o cancelamento do run
+    pare entre os passos; o buffer do run recebe só um evento curto por passo.
+    Retorna (estado_final, run); levanta ThreadBusy/RunQueueFull e relança erros do grafo.
+    """
+    outcome = {}
+
+    def events():
+        try:
+            for step, values in enumerate(graph_instance.stream(graph_input, config=config, stream_mode="values")):
+                outcome["values"] = values
+                yield _sse_event(step, "step", {"run_id": run_id, "step": step})
+        except Exception as e:
+            outcome["error"] = e
+            raise
+
+    run = _submit_run(events(), run_id, thread_id, assistant_id, multitask_strategy, rolled_back)
+    run.done.wait()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("values") or {}, run
+
+
+class _RunInterrupted(Exception):
+    """Run cancelado antes de terminar (a mensagem é o run_id)."""
+
+
+def _invoke_in_pool(graph_instance, graph_input, config, run_id, thread_id, assistant_id, endpoint_name,
+                    multitask_strategy="reject", rolled_back=()):
+    """_invoke_run para endpoints JSON: retorna (estado_final, None) ou (None, resposta 409/503)."""
+    try:
+        values, run = _invoke_run(graph_instance, graph_input, config, run_id, thread_id, assistant_id,
+                                  multitask_strategy, rolled_back)
+    except (ThreadBusy, RunQueueFull) as e:
+        return None, _admission_error_response(e, endpoint_name)
+    if run.status == "interrupted":
+        return None, (jsonify({"error": "Run cancelado", "message": f"Run {run_id} foi cancelado"}), 409)
+    return values, None
+
+
+def _message_chunk_to_json(chunk):
+    """Converte um AIMessageChunk (token) para JSON, preservando id e tool_call_chunks."""
+    data = dict(to_jsonable(chunk))
+    data["id"] = getattr(chunk, "id", None)
+    data["type"] = chunk.__class__.__name__
+    tool_call_chunks = getattr(chunk, "tool_call_chunks", None)
+    if tool_call_chunks:
+        data["tool_call_chunks"] = tool_call_chunks
+    return data
+
+
+def _stream_run_events(graph_instance, stream_input, config, stream_modes, run_id, start_data, endpoint_name,
+                       values_delta=False):
+    """
+    Executa o grafo com graph.stream(stream_mode=[...]) e gera os eventos SSE do run.
+
+    - values: event state_update com o estado completo após cada passo
+    - updates: event state_update com a atualização de cada nó
+    - messages: event messages com [chunk, metadata] para cada token do LLM em _TOKEN_STREAM_NODES,
+      enviado assim que chega (o primeiro byte sai no primeiro token, não na resposta completa)
+    
+    Com values_delta=True (opt-in), os eventos de values levam só as mensagens novas/alteradas
+    desde o último evento desta conexão (ver app/services/values_delta.py).
+    
+    O estado é convertido pelo StreamSerializer da conexão: cada mensagem é convertida
+    uma única vez, mesmo reaparecendo em todos os eventos de values.
+    """
+    event_id = 0
+    serializer = StreamSerializer()
+    delta_encoder = MessagesDeltaEncoder() if values_delta else None
+    try:
+        yield _sse_event(event_id, "run_start", start_data)
+        event_id += 1
+
+        for mode, chunk in graph_instance.stream(stream_input, config=config, stream_mode=stream_modes):
+            try:
+                if mode == "messages":
+                    message, metadata = chunk
+                    node_name = (metadata or {}).get("langgraph_node")
+                    if node_name not in _TOKEN_STREAM_NODES:
+                        continue
+                    meta = {
+                        "run_id": run_id,
+                        "langgraph_node": node_name,
+                        "langgraph_step": metadata.get("langgraph_step"),
+                    }
+                    yield _sse_event(event_id, "messages", [_message_chunk_to_json(message), meta])
+                elif mode == "values":
+                    values_json = serializer.to_jsonable(chunk)
+                    payload = {"run_id": run_id, "node": None}
+                    if delta_encoder is not None:
+                        payload.update(delta_encoder.encode_values(values_json))
+                    else:
+                        payload["values"] = values_json
+                    yield _sse_event(event_id, "state_update", payload)
+                else:
+                    for node_name, update in (chunk or {}).items():
+                        yield _sse_event(event_id, "state_update", {
+                            "run_id": run_id,
+                            "node": node_name,
+                            "update": serializer.to_jsonable(update),
+                        })
+                        event_id += 1
+                    continue
+                event_id += 1
+            except Exception as stream_error:
+                logger.error(f"[LangGraphServer] {endpoint_name}: Erro ao processar evento do stream ({mode}): {stream_error}")
+                continue
+
+        yield _sse_event(event_id, "run_end", {"run_id": run_id, "status": "completed"})
+    except Exception as e:
+        yield _sse_event(event_id, "error", {"event": "error", "data": {"run_id": run_id, "error": str(e)}})
+        raise  # o RunManager marca o run como "error"
+
+
 @langgraph_server_bp.route('/', methods=['GET', 'OPTIONS'])
 def root():
     """
@@ -413,7 +986,7 @@ def info():
                 "assistants": True,
                 "threads": True,
                 "streaming": True,  # Temos endpoints de stream
-                "checkpointing": True  # Usamos MemorySaver para checkpointing
+                "checkpointing": True  # Checkpointer SQLite (WAL) ou MemorySaver (LANGGRAPH_CHECKPOINTER)
             },
             "endpoints": {
                 "assistants": "/assistants",
@@ -648,83 +1221,32 @@ def get_assistant(assistant_id):
 @langgraph_server_bp.route('/langgraph/assistants/<assistant_id>/schemas', methods=['GET', 'OPTIONS'])
 def get_assistant_schemas(assistant_id):
     """
-    Obtém schemas (input/output) de um assistente específico.
+    Obtém schemas (input/output/state/config/context) de um assistente específico.
     
     Args:
         assistant_id: ID do assistente
     
-    Retorna schemas do assistente ou 404 se não existir.
+    Schemas derivados do grafo compilado (ver app/services/graph_introspection.py),
+    com ETag/If-None-Match. Retorna 404 se o assistente não existir.
     """
     try:
         if request.method == 'OPTIONS':
             return '', 200
         
-        logger.info(f"[LangGraphServer] get_assistant_schemas: Buscando schemas do assistente {assistant_id}")
-        
         # Por enquanto, apenas o assistente "agent" existe
-        if assistant_id == "agent":
-            # Retornar schemas no formato correto esperado pelo LangSmith Studio
-            # O formato deve incluir graph_id, state_schema, input_schema, output_schema
-            message_schema = {
-                "type": "object",
-                "properties": {
-                    "role": {
-                        "type": "string",
-                        "enum": ["user", "assistant", "system", "tool"]
-                    },
-                    "content": {
-                        "type": "string"
-                    }
-                },
-                "required": ["role", "content"]
-            }
-            
-            schemas = {
-                "graph_id": "agent",
-                "state_schema": {
-                    "type": "object",
-                    "properties": {
-                        "messages": {
-                            "type": "array",
-                            "items": message_schema,
-                            "description": "Lista de mensagens da conversa"
-                        }
-                    },
-                    "required": ["messages"],
-                    "additionalProperties": False
-                },
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "messages": {
-                            "type": "array",
-                            "items": message_schema,
-                            "description": "Mensagens de entrada para o grafo"
-                        }
-                    },
-                    "required": ["messages"],
-                    "additionalProperties": False
-                },
-                "output_schema": {
-                    "type": "object",
-                    "properties": {
-                        "messages": {
-                            "type": "array",
-                            "items": message_schema,
-                            "description": "Mensagens de saída do grafo"
-                        }
-                    },
-                    "required": ["messages"],
-                    "additionalProperties": False
-                }
-            }
-            logger.info(f"[LangGraphServer] get_assistant_schemas: Schemas do assistente {assistant_id} retornados")
-            logger.info(f"[LangGraphServer] get_assistant_schemas: state_schema tem 'messages' como chave principal: {'messages' in schemas.get('state_schema', {}).get('properties', {})}")
-            logger.info(f"[LangGraphServer] get_assistant_schemas: Schema completo: {json.dumps(schemas, indent=2)}")
-            return jsonify(schemas), 200
-        else:
+        if assistant_id != "agent":
             logger.warning(f"[LangGraphServer] get_assistant_schemas: Assistente {assistant_id} não encontrado")
             return assistant_not_found_response(assistant_id)
+        
+        try:
+            schemas, etag = get_graph_introspection().schemas()
+        except Exception as graph_error:
+            logger.error(f"[LangGraphServer] get_assistant_schemas: Erro ao obter grafo: {graph_error}")
+            return jsonify({
+                "error": "Graph not available",
+                "message": str(graph_error)
+            }), 503
+        return _conditional_response(schemas, etag)
             
     except Exception as e:
         logger.error(f"[LangGraphServer] Erro ao obter schemas do assistant {assistant_id}: {e}")
@@ -733,6 +1255,15 @@ def get_assistant_schemas(assistant_id):
         return jsonify({"error": str(e)}), 500
 
 
+def _xray_param(value):
+    """Converte ?xray= (true/false/inteiro) para o argumento de graph.get_graph(xray=...)."""
+    if value is None or value.lower() in ("", "false", "0"):
+        return False
+    if value.lower() == "true":
+        return True
+    return int(value)
+
+
 @langgraph_server_bp.route('/assistants/<assistant_id>/graph', methods=['GET', 'OPTIONS'])
 @langgraph_server_bp.route('/langgraph/assistants/<assistant_id>/graph', methods=['GET', 'OPTIONS'])
 def get_assistant_graph(assistant_id):
@@ -742,109 +1273,43 @@ def get_assistant_graph(assistant_id):
     Args:
         assistant_id: ID do assistente
     
-    Retorna estrutura do grafo ou 404 se não existir.
+    Query parameters:
+    - xray: true ou profundidade (inteiro) para incluir os nós dos subgrafos
+    - format: "json" (padrão, nós e arestas) ou "mermaid" (text/plain)
+    
+    Estrutura derivada do grafo compilado, com ETag/If-None-Match.
+    Retorna 404 se o assistente não existir.
     """
     try:
         if request.method == 'OPTIONS':
             return '', 200
         
-        logger.info(f"[LangGraphServer] get_assistant_graph: Buscando grafo do assistente {assistant_id}")
-        
         # Por enquanto, apenas o assistente "agent" existe
-        if assistant_id == "agent":
-            try:
-                graph_instance = get_graph()
-                
-                # Obter estrutura básica do grafo
-                # O grafo compilado tem informações sobre nós e arestas
-                graph_structure = {
-                    "nodes": [
-                        {
-                            "id": "init",
-                            "name": "init",
-                            "type": "init"
-                        },
-                        {
-                            "id": "agent",
-                            "name": "agent",
-                            "type": "agent"
-                        },
-                        {
-                            "id": "tools",
-                            "name": "tools",
-                            "type": "tool"
-                        },
-                        {
-                            "id": "end",
-                            "name": "end",
-                            "type": "end"
-                        }
-                    ],
-                    "edges": [
-                        {
-                            "source": "START",
-                            "target": "init"
-                        },
-                        {
-                            "source": "init",
-                            "target": "agent"
-                        },
-                        {
-                            "source": "agent",
-                            "target": "tools",
-                            "condition": "has_tool_calls"
-                        },
-                        {
-                            "source": "agent",
-                            "target": "end",
-                            "condition": "no_tool_calls"
-                        },
-                        {
-                            "source": "tools",
-                            "target": "agent"
-                        },
-                        {
-                            "source": "end",
-                            "target": "END"
-                        }
-                    ],
-                    "state_schema": {
-                        "type": "object",
-                        "properties": {
-                            "messages": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "role": {
-                                            "type": "string",
-                                            "enum": ["user", "assistant", "system", "tool"]
-                                        },
-                                        "content": {
-                                            "type": "string"
-                                        }
-                                    },
-                                    "required": ["role", "content"]
-                                },
-                                "description": "Lista de mensagens da conversa"
-                            }
-                        },
-                        "required": ["messages"],
-                        "additionalProperties": False
-                    }
-                }
-                
-                logger.info(f"[LangGraphServer] get_assistant_graph: Grafo do assistente {assistant_id} retornado")
-                return jsonify(graph_structure), 200
-            except Exception as graph_error:
-                logger.error(f"[LangGraphServer] get_assistant_graph: Erro ao obter grafo: {graph_error}")
-                return jsonify({
-                    "error": "Graph not available",
-                    "message": str(graph_error)
-                }), 503
-        else:
+        if assistant_id != "agent":
             logger.warning(f"[LangGraphServer] get_assistant_graph: Assistente {assistant_id} não encontrado")
             return assistant_not_found_response(assistant_id)
+        
+        try:
+            xray = _xray_param(request.args.get("xray"))
+        except ValueError:
+            return jsonify({"error": "xray deve ser true, false ou um inteiro"}), 400
+        output_format = request.args.get("format", "json")
+        if output_format not in ("json", "mermaid"):
+            return jsonify({"error": "format deve ser 'json' ou 'mermaid'"}), 400
+        
+        try:
+            introspection = get_graph_introspection()
+            if output_format == "mermaid":
+                mermaid, etag = introspection.mermaid(xray)
+                return _conditional_response(mermaid, etag, mimetype="text/plain")
+            structure, etag = introspection.graph_json(xray)
+        except Exception as graph_error:
+            logger.error(f"[LangGraphServer] get_assistant_graph: Erro ao obter grafo: {graph_error}")
+            return jsonify({
+                "error": "Graph not available",
+                "message": str(graph_error)
+            }), 503
+        return _conditional_response(structure, etag)
             
     except Exception as e:
         logger.error(f"[LangGraphServer] Erro ao obter grafo do assistant {assistant_id}: {e}")
@@ -855,33 +1320,41 @@ def get_assistant_graph(assistant_id):
 
 @langgraph_server_bp.route('/assistants/<assistant_id>/subgraphs', methods=['GET', 'OPTIONS'])
 @langgraph_server_bp.route('/langgraph/assistants/<assistant_id>/subgraphs', methods=['GET', 'OPTIONS'])
-def get_assistant_subgraphs(assistant_id):
+@langgraph_server_bp.route('/assistants/<assistant_id>/subgraphs/<namespace>', methods=['GET', 'OPTIONS'])
+@langgraph_server_bp.route('/langgraph/assistants/<assistant_id>/subgraphs/<namespace>', methods=['GET', 'OPTIONS'])
+def get_assistant_subgraphs(assistant_id, namespace=None):
     """
     Obtém subgrafos de um assistente específico.
     
     Args:
         assistant_id: ID do assistente
+        namespace: Opcional, filtra pelo namespace do subgrafo
+    
+    Query parameters:
+    - recurse: true para incluir subgrafos aninhados
     
-    Retorna lista de subgrafos ou 404 se não existir.
-    Por enquanto, retorna lista vazia pois não temos subgrafos aninhados.
+    Retorna {namespace: schemas} derivado do grafo compilado (vazio se o grafo não
+    tiver subgrafos), com ETag/If-None-Match, ou 404 se o assistente não existir.
     """
     try:
         if request.method == 'OPTIONS':
             return '', 200
         
-        logger.info(f"[LangGraphServer] get_assistant_subgraphs: Buscando subgrafos do assistente {assistant_id}")
-        
         # Por enquanto, apenas o assistente "agent" existe
-        if assistant_id == "agent":
-            # Por enquanto, não temos subgrafos aninhados
-            # Retornar lista vazia (formato esperado pelo LangSmith Studio)
-            subgraphs = []
-            
-            logger.info(f"[LangGraphServer] get_assistant_subgraphs: Subgrafos do assistente {assistant_id} retornados (vazio)")
-            return jsonify(subgraphs), 200
-        else:
+        if assistant_id != "agent":
             logger.warning(f"[LangGraphServer] get_assistant_subgraphs: Assistente {assistant_id} não encontrado")
             return assistant_not_found_response(assistant_id)
+        
+        recurse = request.args.get("recurse", "false").lower() == "true"
+        try:
+            subgraphs, etag = get_graph_introspection().subgraphs(namespace, recurse)
+        except Exception as graph_error:
+            logger.error(f"[LangGraphServer] get_assistant_subgraphs: Erro ao obter grafo: {graph_error}")
+            return jsonify({
+                "error": "Graph not available",
+                "message": str(graph_error)
+            }), 503
+        return _conditional_response(subgraphs, etag)
             
     except Exception as e:
         logger.error(f"[LangGraphServer] Erro ao obter subgrafos do assistant {assistant_id}: {e}")
@@ -974,11 +1447,11 @@ def search_threads():
     {
         "limit": 100,
         "offset": 0,
-        "metadata": {},  # Opcional: filtros de metadata
-        "before": "thread_id"  # Opcional: buscar antes de um thread_id
+        "metadata": {},  # Opcional: filtros de metadata (igualdade por chave)
+        "status": "idle"  # Opcional
     }
     
-    Retorna array direto de threads.
+    Retorna array direto de threads (mais recentes primeiro), do catálogo do checkpointer.
     """
     start_time = datetime.utcnow()
     try:
@@ -988,27 +1461,19 @@ def search_threads():
         data = request.get_json(force=True, silent=True) or {}
         log_request("search_threads", request.method, data_keys=list(data.keys()))
         
-        limit = data.get('limit', 100)
-        offset = data.get('offset', 0)
-        metadata_filter = data.get('metadata', {})
-        before = data.get('before', None)
+        limit = int(data.get('limit', 100) or 100)
+        offset = int(data.get('offset', 0) or 0)
+        metadata_filter = data.get('metadata') or {}
+        status = data.get('status')
         
-        # Por enquanto, retornar lista vazia pois não temos sistema de busca de threads
-        # Em produção, isso deveria consultar o checkpointer para buscar threads
+        # Busca paginada e indexada no catálogo de threads do checkpointer (SQLite)
         threads = []
-        
-        # Se houver um grafo com checkpointer, tentar obter threads
-        try:
-            graph_instance = get_graph()
-            # Por enquanto, não temos método para listar threads do checkpointer
-            # O MemorySaver não expõe uma API para listar threads
-            # Em produção, seria necessário usar um checkpointer persistente (ex: PostgreSQL)
-        except Exception as e:
-            logger.debug(f"[LangGraphServer] search_threads: Não foi possível obter threads do checkpointer: {e}")
-        
-        # Aplicar paginação
-        if offset > 0 or limit < len(threads):
-            threads = threads[offset:offset+limit]
+        catalog = _get_thread_catalog()
+        if catalog is not None:
+            entries = catalog.search_threads(metadata=metadata_filter, status=status, limit=limit, offset=offset)
+            threads = [_catalog_thread_to_json(entry) for entry in entries]
+        else:
+            logger.debug("[LangGraphServer] search_threads: Checkpointer sem catálogo de threads, retornando lista vazia")
         
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
         log_response("search_threads", 200, duration_ms, threads_count=len(threads))
@@ -1024,22 +1489,29 @@ def search_threads():
 
 def list_threads():
     """
-    Lista threads existentes.
+    Lista threads existentes (mais recentes primeiro) a partir do catálogo do checkpointer.
     
-    Nota: Por enquanto retorna lista vazia, pois não temos persistência
-    de threads. Em produção, isso deveria consultar o checkpointer.
+    Query params opcionais: limit (padrão 100), offset (padrão 0), status e
+    metadata (JSON com filtros, ex.: metadata={"assistant_id": "agent"}).
     """
     try:
-        # Por enquanto, retornar lista vazia
-        # Em produção, consultar checkpointer para listar threads
+        limit = request.args.get('limit', 100, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        metadata_filter = json.loads(request.args.get('metadata') or '{}')
+        catalog = _get_thread_catalog()
+        if catalog is None:
+            return jsonify({"threads": []}), 200
+        entries = catalog.search_threads(metadata=metadata_filter, status=request.args.get('status'),
+                                         limit=limit, offset=offset)
         return jsonify({
-            "threads": []
+            "threads": [_catalog_thread_to_json(entry) for entry in entries]
         }), 200
     except Exception as e:
         logger.error(f"[LangGraphServer] Erro ao listar threads: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@idempotent
 def create_thread():
     """
     Cria uma nova thread e opcionalmente executa o grafo.
@@ -1054,6 +1526,7 @@ def create_thread():
     
     Se mensagens forem fornecidas, executa o grafo.
     Se não, cria uma thread vazia (comportamento esperado pelo LangSmith Studio).
+    Com o header Idempotency-Key, repetições recebem a resposta da primeira chamada.
     
     Retorna:
     {
@@ -1073,15 +1546,22 @@ def create_thread():
         
         log_request("create_thread", request.method, assistant_id=assistant_id, messages_count=len(messages))
         
-        # Gerar thread_id
-        thread_id = str(uuid.uuid4())
+        # Gerar thread_id (ou usar o informado, como no LangGraph Server)
+        thread_id = data.get("thread_id") or str(uuid.uuid4())
+        
+        # Registrar no catálogo de threads para aparecer em search/list mesmo antes do primeiro run
+        thread_metadata = {"graph_id": "agent", "assistant_id": assistant_id, **(data.get("metadata") or {})}
+        catalog = _get_thread_catalog()
+        catalog_entry = catalog.upsert_thread(thread_id, thread_metadata) if catalog is not None else None
         
         # Se não houver mensagens, criar thread vazia (comportamento esperado pelo LangSmith Studio)
         if not messages:
             result_dict = {
                 "thread_id": thread_id,
-                "created_at": datetime.utcnow().isoformat() + "Z",
+                "created_at": catalog_entry["created_at"] if catalog_entry else datetime.utcnow().isoformat() + "Z",
                 "updated_at": datetime.utcnow().isoformat() + "Z",
+                "metadata": thread_metadata,
+                "status": "idle",
                 "values": {
                     "messages": []
                 }
@@ -1119,16 +1599,27 @@ def create_thread():
                 "message": str(graph_error)
             }), 503
         
+        multitask_strategy, error_response = _multitask_strategy(data)
+        if error_response:
+            return error_response
+        
         config = data.get("config", {"configurable": {"thread_id": thread_id}})
         if "configurable" not in config:
             config["configurable"] = {}
         config["configurable"]["thread_id"] = thread_id
         _inject_regras_redirecionamento(config)
         
-        # Executar grafo com MessagesState
+        # Executar grafo com MessagesState no pool do RunManager
         # Com checkpointer, o LangGraph automaticamente preserva o estado
         logger.info(f"[LangGraphServer] create_thread: Executando grafo para thread {thread_id}")
-        result = graph_instance.invoke({"messages": langchain_messages}, config=config)
+        run_id = str(uuid.uuid4())
+        rolled_back = _prepare_rollback(graph_instance, thread_id, config, multitask_strategy)
+        _track_run(run_id, thread_id, assistant_id, config, data.get("metadata"))
+        result, error_response = _invoke_in_pool(graph_instance, {"messages": langchain_messages}, config,
+                                                 run_id, thread_id, assistant_id, "create_thread",
+                                                 multitask_strategy=multitask_strategy, rolled_back=rolled_back)
+        if error_response is not None:
+            return error_response
         
         # Converter todas as mensagens do resultado para formato de resposta
         # O resultado contém TODAS as mensagens (input + resposta)
@@ -1136,16 +1627,18 @@ def create_thread():
         
         result_dict = {
             "thread_id": thread_id,
-            "created_at": datetime.utcnow().isoformat() + "Z",
+            "created_at": catalog_entry["created_at"] if catalog_entry else datetime.utcnow().isoformat() + "Z",
             "updated_at": datetime.utcnow().isoformat() + "Z",
+            "metadata": thread_metadata,
+            "status": "idle",
             "values": {
                 "messages": all_messages
             }
         }
         
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-        log_response("create_thread", 200, duration_ms, thread_id=thread_id, messages_count=len(all_messages))
-        return jsonify(result_dict), 200
+        log_response("create_thread", 200, duration_ms, thread_id=thread_id, run_id=run_id, messages_count=len(all_messages))
+        return jsonify(result_dict), 200, {'X-Run-ID': run_id}
         
     except RuntimeError as e:
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -1198,6 +1691,16 @@ def get_thread(thread_id):
         # Config com thread_id para checkpointer
         config = {"configurable": {"thread_id": thread_id}}
         
+        # Dados do catálogo de threads (created_at, updated_at, metadata), se disponível
+        catalog = _get_thread_catalog()
+        catalog_entry = catalog.get_thread(thread_id) if catalog is not None else None
+        catalog_fields = {
+            "created_at": catalog_entry["created_at"],
+            "updated_at": catalog_entry["updated_at"],
+            "metadata": catalog_entry["metadata"],
+            "status": catalog_entry["status"],
+        } if catalog_entry else {}
+        
         # Recuperar estado do checkpointer
         try:
             state = graph_instance.get_state(config)
@@ -1210,7 +1713,8 @@ def get_thread(thread_id):
                     "thread_id": thread_id,
                     "values": {
                         "messages": []
-                    }
+                    },
+                    **catalog_fields
                 }), 200
             
             # Extrair mensagens do estado
@@ -1223,7 +1727,8 @@ def get_thread(thread_id):
                 "thread_id": thread_id,
                 "values": {
                     "messages": response_messages
-                }
+                },
+                **catalog_fields
             }
             
             duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -1252,7 +1757,12 @@ def get_thread_history(thread_id):
     
     Suporta GET e POST conforme especificação LangGraph Server.
     GET: parâmetros via query string (limit, before)
-    POST: parâmetros via body JSON (limit, before, metadata, checkpoint)
+    POST: parâmetros via body JSON (limit, before, metadata)
+    
+    before/limit/metadata são repassados ao checkpointer (get_state_history) e só
+    a página pedida é desserializada e convertida.
+    Com ?values_mode=delta (ou header X-Values-Mode: delta), cada item traz messages_delta
+    em relação ao item anterior da resposta em vez do array completo.
     
     O LangSmith Studio chama este endpoint para obter o histórico da thread.
     Quando não há histórico disponível, retorna lista vazia.
@@ -1262,16 +1772,23 @@ def get_thread_history(thread_id):
             return '', 200
         
         # Parsear parâmetros
+        metadata_filter = None
         if request.method == 'GET':
             limit = request.args.get('limit', default=10, type=int)
             before = request.args.get('before', default=None, type=str)
         else:  # POST
-            data = request.get_json() or {}
+            data = request.get_json(silent=True) or {}
             limit = data.get('limit', 10)
             before = data.get('before', None)
-            # metadata e checkpoint são aceitos mas não usados na filtragem por enquanto
+            metadata_filter = data.get('metadata') or None
+        limit = max(0, int(limit if limit is not None else 10))
         
-        logger.info(f"[LangGraphServer] get_thread_history: Buscando histórico da thread {thread_id} (limit={limit}, before={before})")
+        # before pode vir como checkpoint_id (string) ou como config/checkpoint ({"checkpoint_id": ...})
+        before_id = before
+        if isinstance(before, dict):
+            before_id = (before.get("configurable") or before).get("checkpoint_id")
+        
+        logger.info(f"[LangGraphServer] get_thread_history: Buscando histórico da thread {thread_id} (limit={limit}, before={before_id})")
         
         # Obter grafo
         try:
@@ -1286,125 +1803,20 @@ def get_thread_history(thread_id):
             }), 503
         
         config = {"configurable": {"thread_id": thread_id}}
+        before_config = {"configurable": {"thread_id": thread_id, "checkpoint_id": before_id}} if before_id else None
         history_items = []
         
         try:
-            # Tentar usar get_state_history se disponível
-            if hasattr(graph_instance, "get_state_history"):
-                states = list(graph_instance.get_state_history(config))
-                
-                # Processar cada state e criar item de histórico completo
-                for idx, state in enumerate(states):
-                    if state is None:
-                        continue
-                    
-                    # Extrair valores do state
-                    values = state.values or {}
-                    messages = convert_messages_to_json(values.get("messages", []))
-                    
-                    # Extrair informações de checkpoint
-                    checkpoint_id = None
-                    checkpoint_ns = ""
-                    checkpoint_map = {}
-                    metadata = {}
-                    created_at = None
-                    next_nodes = []
-                    
-                    # Tentar extrair informações do state
-                    if hasattr(state, 'checkpoint'):
-                        checkpoint = state.checkpoint
-                        if isinstance(checkpoint, dict):
-                            checkpoint_id = checkpoint.get('id') or checkpoint.get('checkpoint_id')
-                            checkpoint_ns = checkpoint.get('ns', '')
-                            checkpoint_map = checkpoint.get('map', {})
-                    
-                    # Tentar extrair metadata
-                    if hasattr(state, 'metadata'):
-                        metadata = state.metadata if isinstance(state.metadata, dict) else {}
-                    
-                    # Tentar extrair created_at
-                    if hasattr(state, 'created_at'):
-                        created_at = state.created_at
-                    elif hasattr(state, 'ts'):
-                        created_at = state.ts
-                    
-                    # Tentar extrair next nodes
-                    if hasattr(state, 'next'):
-                        next_nodes = state.next if isinstance(state.next, list) else []
-                    
-                    # Gerar checkpoint_id se não disponível
-                    if not checkpoint_id:
-                        checkpoint_id = f"{thread_id}-{idx}"
-                    
-                    # Gerar timestamp se não disponível
-                    if not created_at:
-                        created_at = datetime.utcnow().isoformat() + "Z"
-                    elif isinstance(created_at, (int, float)):
-                        # Converter timestamp numérico para ISO 8601
-                        from datetime import datetime as dt
-                        created_at = dt.fromtimestamp(created_at).isoformat() + "Z"
-                    elif not created_at.endswith('Z'):
-                        # Garantir formato ISO 8601 com Z
-                        if '+' not in created_at and 'Z' not in created_at:
-                            created_at = created_at + "Z"
-                    
-                    # Criar item de histórico completo
-                    history_item = {
-                        "values": {"messages": messages},
-                        "checkpoint": {
-                            "thread_id": thread_id,
-                            "checkpoint_ns": checkpoint_ns,
-                            "checkpoint_id": checkpoint_id,
-                            "checkpoint_map": checkpoint_map
-                        },
-                        "metadata": metadata,
-                        "created_at": created_at,
-                        "next": next_nodes,
-                        "tasks": [],  # Tasks não são expostas pelo MemorySaver
-                        "parent_checkpoint": None  # Parent checkpoint não é exposto pelo MemorySaver
-                    }
-                    
-                    history_items.append(history_item)
-            else:
-                # Fallback: usar get_state e retornar como único item
-                state = graph_instance.get_state(config)
-                if state is not None and state.values:
-                    messages = convert_messages_to_json(state.values.get("messages", []))
-                    
-                    # Criar checkpoint básico
-                    checkpoint_id = f"{thread_id}-0"
-                    created_at = datetime.utcnow().isoformat() + "Z"
-                    
-                    history_item = {
-                        "values": {"messages": messages},
-                        "checkpoint": {
-                            "thread_id": thread_id,
-                            "checkpoint_ns": "",
-                            "checkpoint_id": checkpoint_id,
-                            "checkpoint_map": {}
-                        },
-                        "metadata": {},
-                        "created_at": created_at,
-                        "next": [],
-                        "tasks": [],
-                        "parent_checkpoint": None
-                    }
-                    
-                    history_items.append(history_item)
-            
-            # Aplicar filtro 'before' se fornecido
-            if before:
-                # Filtrar checkpoints anteriores (mais antigos) ao checkpoint_id especificado
-                filtered_items = []
-                for item in history_items:
-                    if item["checkpoint"]["checkpoint_id"] == before:
-                        break  # Parar quando encontrar o checkpoint especificado
-                    filtered_items.append(item)  # Adicionar checkpoints anteriores
-                history_items = filtered_items
-            
-            # Aplicar limite
-            history_items = history_items[:limit]
-            
+            # before/limit/metadata vão direto para o checkpointer (pushdown) e o iterador é consumido
+            # sob demanda: o custo é proporcional ao tamanho da página, não ao tamanho da thread
+            states = graph_instance.get_state_history(config, filter=metadata_filter, before=before_config, limit=limit)
+            # Modo delta opt-in: cada item leva só as mensagens que diferem do item anterior da página
+            delta_encoder = MessagesDeltaEncoder() if values_delta_requested(request) else None
+            for state in islice(states, limit):
+                item = _state_snapshot_to_history_item(thread_id, state)
+                if delta_encoder is not None:
+                    item.update(delta_encoder.encode_values(item["values"]))
+                history_items.append(item)
         except Exception as state_error:
             logger.error(f"[LangGraphServer] get_thread_history: Erro ao recuperar histórico: {state_error}")
             import traceback
@@ -1434,7 +1846,8 @@ def list_thread_runs(thread_id):
     - offset: Número de resultados para pular (padrão: 0)
     - status: Filtrar por status (pending, running, success, error, timeout, interrupted)
     
-    Retorna array de runs com informações: run_id, thread_id, assistant_id, status, created_at, updated_at, metadata
+    Retorna array de runs com informações: run_id, thread_id, assistant_id, status, created_at, updated_at,
+    started_at, ended_at, duration_ms, usage (tokens), error, metadata
     """
     try:
         if request.method == 'OPTIONS':
@@ -1447,68 +1860,10 @@ def list_thread_runs(thread_id):
         
         logger.info(f"[LangGraphServer] list_thread_runs: Listando runs da thread {thread_id} (limit={limit}, offset={offset}, status={status_filter})")
         
-        # Por enquanto, retornar lista vazia pois não temos sistema de tracking de runs
-        # Em produção, isso deveria consultar um sistema de persistência de runs
-        # Por enquanto, podemos tentar inferir runs do histórico de estados do checkpointer
+        # Runs registrados na criação (registro indexado por thread/status: custo proporcional à página)
+        runs = _run_registry.list_thread_runs(thread_id, status=status_filter, limit=limit, offset=offset)
         
-        runs = []
-        
-        try:
-            graph_instance = get_graph()
-            config = {"configurable": {"thread_id": thread_id}}
-            
-            # Tentar obter histórico de estados para inferir runs
-            if hasattr(graph_instance, "get_state_history"):
-                states = list(graph_instance.get_state_history(config))
-                
-                # Cada checkpoint pode representar um "run"
-                for idx, state in enumerate(states):
-                    if state is None:
-                        continue
-                    
-                    # Gerar run_id baseado no checkpoint
-                    run_id = f"{thread_id}-run-{idx}"
-                    
-                    # Determinar status baseado no estado
-                    run_status = "success"  # Default
-                    if hasattr(state, "next") and state.next:
-                        run_status = "running"
-                    
-                    # Extrair timestamp se disponível
-                    created_at = datetime.utcnow().isoformat() + "Z"
-                    if hasattr(state, "created_at"):
-                        created_at = state.created_at
-                    elif hasattr(state, "ts"):
-                        if isinstance(state.ts, (int, float)):
-                            from datetime import datetime as dt
-                            created_at = dt.fromtimestamp(state.ts).isoformat() + "Z"
-                        else:
-                            created_at = str(state.ts)
-                    
-                    run = {
-                        "run_id": run_id,
-                        "thread_id": thread_id,
-                        "assistant_id": "agent",
-                        "status": run_status,
-                        "created_at": created_at,
-                        "updated_at": created_at,
-                        "metadata": {}
-                    }
-                    
-                    # Aplicar filtro de status se fornecido
-                    if status_filter and run["status"] != status_filter:
-                        continue
-                    
-                    runs.append(run)
-        except Exception as e:
-            logger.warning(f"[LangGraphServer] list_thread_runs: Erro ao obter histórico de estados: {e}")
-            # Continuar com lista vazia
-        
-        # Aplicar paginação
-        total_runs = len(runs)
-        runs = runs[offset:offset+limit]
-        
-        logger.info(f"[LangGraphServer] list_thread_runs: Retornando {len(runs)} runs (total: {total_runs}) para thread {thread_id}")
+        logger.info(f"[LangGraphServer] list_thread_runs: Retornando {len(runs)} runs para thread {thread_id}")
         
         # Retornar array direto conforme especificação LangGraph Server
         return jsonify(runs), 200
@@ -1538,6 +1893,11 @@ def get_thread_run(thread_id, run_id):
         "status": "success|running|error|pending|timeout|interrupted",
         "created_at": "...",
         "updated_at": "...",
+        "started_at": "...",
+        "ended_at": "...",
+        "duration_ms": 1234,
+        "usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+        "error": null,
         "metadata": {},
         "kwargs": {}
     }
@@ -1548,54 +1908,9 @@ def get_thread_run(thread_id, run_id):
         
         logger.info(f"[LangGraphServer] get_thread_run: Buscando run {run_id} da thread {thread_id}")
         
-        # Por enquanto, tentar inferir informações do run do histórico
-        # Em produção, isso deveria consultar um sistema de persistência de runs
-        try:
-            graph_instance = get_graph()
-            config = {"configurable": {"thread_id": thread_id}}
-            
-            # Tentar obter histórico para encontrar o run
-            run_data = None
-            if hasattr(graph_instance, "get_state_history"):
-                states = list(graph_instance.get_state_history(config))
-                
-                # Procurar run_id no histórico (pode estar no formato thread_id-run-{idx})
-                for idx, state in enumerate(states):
-                    if state is None:
-                        continue
-                    
-                    # Gerar run_id esperado
-                    expected_run_id = f"{thread_id}-run-{idx}"
-                    if expected_run_id == run_id or str(run_id) in str(state):
-                        # Determinar status
-                        run_status = "success"
-                        if hasattr(state, "next") and state.next:
-                            run_status = "running"
-                        
-                        # Extrair timestamp
-                        created_at = datetime.utcnow().isoformat() + "Z"
-                        if hasattr(state, "created_at"):
-                            created_at = state.created_at
-                        elif hasattr(state, "ts"):
-                            if isinstance(state.ts, (int, float)):
-                                from datetime import datetime as dt
-                                created_at = dt.fromtimestamp(state.ts).isoformat() + "Z"
-                            else:
-                                created_at = str(state.ts)
-                        
-                        run_data = {
-                            "run_id": run_id,
-                            "thread_id": thread_id,
-                            "assistant_id": "agent",
-                            "status": run_status,
-                            "created_at": created_at,
-                            "updated_at": created_at,
-                            "metadata": {},
-                            "kwargs": {}
-                        }
-                        break
-        except Exception as e:
-            logger.warning(f"[LangGraphServer] get_thread_run: Erro ao obter informações do run: {e}")
+        run_data = _run_registry.get(run_id, thread_id=thread_id)
+        if run_data:
+            run_data["kwargs"] = {}
         
         if not run_data:
             logger.warning(f"[LangGraphServer] get_thread_run: Run {run_id} não encontrado para thread {thread_id}")
@@ -1652,6 +1967,10 @@ def update_thread(thread_id):
             log_error("update_thread", "Mensagens inválidas", {"thread_id": thread_id})
             return error_response
         
+        multitask_strategy, error_response = _multitask_strategy(data)
+        if error_response:
+            return error_response
+        
         # Obter grafo
         try:
             graph_instance = get_graph()
@@ -1691,7 +2010,15 @@ def update_thread(thread_id):
         # 3. Executa o grafo
         # 4. Salva novo estado
         logger.info(f"[LangGraphServer] update_thread: Executando grafo para thread {thread_id} com {len(langchain_messages)} nova(s) mensagem(ns)")
-        result = graph_instance.invoke({"messages": langchain_messages}, config=config)
+        run_id = str(uuid.uuid4())
+        assistant_id = data.get("assistant_id", "agent")
+        rolled_back = _prepare_rollback(graph_instance, thread_id, config, multitask_strategy)
+        _track_run(run_id, thread_id, assistant_id, config, data.get("metadata"))
+        result, error_response = _invoke_in_pool(graph_instance, {"messages": langchain_messages}, config,
+                                                 run_id, thread_id, assistant_id, "update_thread",
+                                                 multitask_strategy=multitask_strategy, rolled_back=rolled_back)
+        if error_response is not None:
+            return error_response
         
         # Converter todas as mensagens do resultado para formato de resposta
         # O resultado contém TODAS as mensagens (histórico + novas + resposta)
@@ -1706,8 +2033,8 @@ def update_thread(thread_id):
         }
         
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-        log_response("update_thread", 200, duration_ms, thread_id=thread_id, messages_count=len(all_messages))
-        return jsonify(result_dict), 200
+        log_response("update_thread", 200, duration_ms, thread_id=thread_id, run_id=run_id, messages_count=len(all_messages))
+        return jsonify(result_dict), 200, {'X-Run-ID': run_id}
         
     except RuntimeError as e:
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -1721,6 +2048,7 @@ def update_thread(thread_id):
 
 @langgraph_server_bp.route('/threads/<thread_id>/runs/stream', methods=['POST', 'OPTIONS'])
 @langgraph_server_bp.route('/langgraph/threads/<thread_id>/runs/stream', methods=['POST', 'OPTIONS'])
+@idempotent
 def create_run_stream(thread_id):
     """
     Cria um run em uma thread existente e faz stream do output em tempo real.
@@ -1731,10 +2059,15 @@ def create_run_stream(thread_id):
         "input": {
             "messages": [{"role": "user", "content": "..."}]
         },
-        "stream_mode": "values",  # Opcional: "values", "updates", "messages"
+        "stream_mode": "values",  # Opcional: "values", "updates", "messages" ou lista combinando-os
         "stream_resumable": false,  # Opcional
-        "on_disconnect": "cancel"  # Opcional: "cancel", "continue"
+        "on_disconnect": "cancel",  # Opcional: "cancel", "continue"
+        "multitask_strategy": "reject"  # Opcional: "reject", "enqueue", "interrupt", "rollback"
     }
+    
+    multitask_strategy define o que acontece se a thread já tiver um run em andamento
+    (ver app/services/run_manager.py): reject responde 409.
+    Com o header Idempotency-Key, repetições acompanham o mesmo run em vez de criar outro.
     """
     start_time = datetime.utcnow()
     try:
@@ -1755,16 +2088,22 @@ def create_run_stream(thread_id):
             # Se input_data é uma lista, pode ser que as mensagens estejam diretamente lá
             messages = input_data
         
-        stream_mode = data.get("stream_mode", "values")
-        # stream_mode pode ser uma lista no LangGraph Studio
-        if isinstance(stream_mode, list):
-            stream_mode = stream_mode[0] if stream_mode else "values"
+        # stream_mode pode ser uma lista no LangGraph Studio (ex.: ["values", "messages"])
+        stream_modes = _normalize_stream_modes(data.get("stream_mode", "values"))
+        # Modo delta opt-in (?values_mode=delta ou header X-Values-Mode: delta)
+        values_delta = values_delta_requested(request)
         
         stream_resumable = data.get("stream_resumable", False)
-        on_disconnect = data.get("on_disconnect", "cancel")
+        # Run resumível (ou com Idempotency-Key, que o cliente pode repetir) sobrevive à queda
+        # da conexão por padrão; demais runs são cancelados
+        retryable = stream_resumable or bool(request.headers.get(IDEMPOTENCY_HEADER))
+        on_disconnect = data.get("on_disconnect") or ("continue" if retryable else "cancel")
+        multitask_strategy, error_response = _multitask_strategy(data)
+        if error_response:
+            return error_response
         
         log_request("create_run_stream", request.method, thread_id=thread_id, assistant_id=assistant_id, 
-                   messages_count=len(messages), stream_mode=stream_mode)
+                   messages_count=len(messages), stream_mode=stream_modes)
         
         # Obter grafo
         try:
@@ -1850,98 +2189,11 @@ def create_run_stream(thread_id):
         run_id = str(uuid.uuid4())
         
         def generate():
-            try:
-                event_id = 0
-                
-                # Enviar evento de início do run
-                yield f"id: {event_id}\n"
-                yield f"event: run_start\n"
-                yield f"data: {json.dumps({'run_id': run_id, 'thread_id': thread_id, 'assistant_id': assistant_id})}\n\n"
-                event_id += 1
-                
-                # Stream dos eventos do grafo
-                # Se não houver mensagens, passar estado vazio ou recuperar do checkpointer
-                stream_input = {"messages": langchain_messages} if langchain_messages else {}
-                for event in graph_instance.stream(stream_input, config=config):
-                    try:
-                        # LangGraph stream pode retornar tuplas (node_name, state) ou dicionários
-                        event_data = {}
-                        node_name = None
-                        
-                        # Processar formato de tupla: (node_name, state_dict)
-                        if isinstance(event, tuple) and len(event) == 2:
-                            node_name, state_obj = event
-                            # Converter state object para dict se necessário
-                            if isinstance(state_obj, dict):
-                                event_data = state_obj
-                            elif hasattr(state_obj, "values"):
-                                event_data = {"values": state_obj.values}
-                            elif hasattr(state_obj, "__dict__"):
-                                event_data = state_obj.__dict__
-                            else:
-                                event_data = {"state": str(state_obj)}
-                        # Processar formato de dicionário
-                        elif isinstance(event, dict):
-                            event_data = event
-                            node_name = event.get("node") or event.get("__pregel_node")
-                        else:
-                            # Formato desconhecido, converter para string
-                            event_data = {"raw": str(event)}
-                        
-                        # Extrair valores do estado de forma segura
-                        state_values = {}
-                        if isinstance(event_data, dict):
-                            if "values" in event_data:
-                                state_values = event_data["values"]
-                            else:
-                                state_values = event_data
-                        
-                        # Converter state_values para formato JSON serializável
-                        # Isso converte mensagens LangChain (AIMessage, HumanMessage, etc.) para formato JSON
-                        state_values_json = convert_state_to_json(state_values)
-                        event_data_json = convert_state_to_json(event_data)
-                        
-                        # Formatar evento conforme stream_mode
-                        if stream_mode == "values":
-                            # Enviar apenas valores do estado
-                            yield f"id: {event_id}\n"
-                            yield f"event: state_update\n"
-                            yield f"data: {json.dumps({'run_id': run_id, 'node': node_name, 'values': state_values_json})}\n\n"
-                            event_id += 1
-                        elif stream_mode == "updates":
-                            # Enviar atualizações completas
-                            yield f"id: {event_id}\n"
-                            yield f"event: state_update\n"
-                            yield f"data: {json.dumps({'run_id': run_id, 'node': node_name, 'update': event_data_json})}\n\n"
-                            event_id += 1
-                        else:
-                            # Modo padrão: enviar tudo
-                            yield f"id: {event_id}\n"
-                            yield f"event: state_update\n"
-                            yield f"data: {json.dumps({'run_id': run_id, 'node': node_name, 'event': event_data_json})}\n\n"
-                            event_id += 1
-                    except Exception as stream_error:
-                        logger.error(f"[LangGraphServer] create_run_stream: Erro ao processar evento do stream: {stream_error}")
-                        logger.error(f"[LangGraphServer] create_run_stream: Tipo do evento: {type(event)}, Valor: {event}")
-                        # Continuar com próximo evento
-                        continue
-                
-                # Enviar evento de conclusão do run
-                yield f"id: {event_id}\n"
-                yield f"event: run_end\n"
-                yield f"data: {json.dumps({'run_id': run_id, 'status': 'completed'})}\n\n"
-                
-            except Exception as e:
-                error_event = {
-                    "event": "error",
-                    "data": {
-                        "run_id": run_id,
-                        "error": str(e)
-                    }
-                }
-                yield f"id: {event_id}\n"
-                yield f"event: error\n"
-                yield f"data: {json.dumps(error_event)}\n\n"
+            # Se não houver mensagens, passar estado vazio ou recuperar do checkpointer
+            stream_input = {"messages": langchain_messages} if langchain_messages else {}
+            start_data = {'run_id': run_id, 'thread_id': thread_id, 'assistant_id': assistant_id}
+            yield from _stream_run_events(graph_instance, stream_input, config, stream_modes, run_id,
+                                          start_data, "create_run_stream", values_delta=values_delta)
         
         headers = {
             'Cache-Control': 'no-cache',
@@ -1949,18 +2201,21 @@ def create_run_stream(thread_id):
             'Content-Type': 'text/event-stream',
             'X-Run-ID': run_id  # Adicionar run_id no header para o LangSmith Studio
         }
+        if values_delta:
+            headers['X-Values-Mode'] = 'delta'
         
         if stream_resumable:
+            # O cliente pode reconectar em GET /threads/<thread_id>/runs/<run_id>/stream com Last-Event-ID
             headers['X-Stream-Resumable'] = 'true'
         
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
         log_response("create_run_stream", 200, duration_ms, thread_id=thread_id, run_id=run_id, stream_started=True)
         
-        return Response(
-            generate(),
-            mimetype='text/event-stream',
-            headers=headers
-        )
+        rolled_back = _prepare_rollback(graph_instance, thread_id, config, multitask_strategy)
+        _track_run(run_id, thread_id, assistant_id, config, data.get("metadata"))
+        return _submit_stream_run(generate(), run_id, thread_id, assistant_id, on_disconnect, headers,
+                                  "create_run_stream", multitask_strategy=multitask_strategy,
+                                  rolled_back=rolled_back)
         
     except Exception as e:
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -1975,9 +2230,11 @@ def join_run_stream(thread_id, run_id):
     Junta-se a um stream de run existente.
     
     Permite resumir um stream a partir de um evento específico usando o header Last-Event-ID.
+    Disponível para runs criados com stream_resumable=true: os eventos posteriores ao
+    Last-Event-ID são reenviados e depois o stream segue ao vivo até o fim do run.
     
     Query parameters:
-    - stream_mode: Modo de stream (values, updates, messages, etc.)
+    - last_event_id: Alternativa ao header Last-Event-ID (ex.: EventSource sem headers customizados)
     - cancel_on_disconnect: Se true, cancela o run se cliente desconectar (padrão: false)
     
     Headers:
@@ -1987,33 +2244,35 @@ def join_run_stream(thread_id, run_id):
         if request.method == 'OPTIONS':
             return '', 200
         
-        stream_mode = request.args.get('stream_mode', 'values')
-        cancel_on_disconnect = request.args.get('cancel_on_disconnect', 'false').lower() == 'true'
-        last_event_id = request.headers.get('Last-Event-ID', None)
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id not in (None, '') else -1
+        except ValueError:
+            last_event_id = -1
         
         logger.info(f"[LangGraphServer] join_run_stream: Juntando-se ao stream do run {run_id} da thread {thread_id} (last_event_id={last_event_id})")
         
-        # Obter grafo
-        try:
-            graph_instance = get_graph()
-        except Exception as graph_error:
-            logger.error(f"[LangGraphServer] join_run_stream: Erro ao obter grafo: {graph_error}")
-            import traceback
-            logger.error(traceback.format_exc())
+        run = _run_manager.get(run_id)
+        if run is None or run.thread_id != thread_id:
+            logger.warning(f"[LangGraphServer] join_run_stream: Run {run_id} sem eventos registrados neste worker")
             return jsonify({
-                "error": "Grafo não disponível",
-                "message": str(graph_error)
-            }), 503
-        
-        # Por enquanto, retornar erro pois não temos sistema de tracking de streams ativos
-        # Em produção, isso deveria consultar streams ativos e retomar de onde parou
-        logger.warning(f"[LangGraphServer] join_run_stream: Stream resumable não implementado completamente para run {run_id}")
+                "error": "Stream não encontrado ou não resumable",
+                "message": f"Run {run_id} não tem stream ativo ou não suporta resumir. Use POST /threads/{thread_id}/runs/stream para criar novo stream."
+            }), 404
         
-        # Retornar erro informativo
-        return jsonify({
-            "error": "Stream não encontrado ou não resumable",
-            "message": f"Run {run_id} não tem stream ativo ou não suporta resumir. Use POST /threads/{thread_id}/runs/stream para criar novo stream."
-        }), 404
+        # Quem se junta ao stream não cancela o run ao sair, a menos que peça cancel_on_disconnect=true
+        cancel_on_disconnect = request.args.get('cancel_on_disconnect', 'false').lower() == 'true'
+        return Response(
+            metrics.track_sse(_run_manager.subscribe(run, last_event_id, "cancel" if cancel_on_disconnect else "continue")),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no',
+                'Content-Type': 'text/event-stream',
+                'X-Run-ID': run_id,
+                'X-Stream-Resumable': 'true'
+            }
+        )
         
     except Exception as e:
         logger.error(f"[LangGraphServer] join_run_stream: Erro inesperado: {e}")
@@ -2049,6 +2308,10 @@ def stream_thread(thread_id):
         if not messages:
             return jsonify({"error": "messages é obrigatório no input"}), 400
         
+        multitask_strategy, error_response = _multitask_strategy(data)
+        if error_response:
+            return error_response
+        
         # Obter grafo
         try:
             graph_instance = get_graph()
@@ -2078,23 +2341,34 @@ def stream_thread(thread_id):
         config["configurable"]["thread_id"] = thread_id
         _inject_regras_redirecionamento(config)
         
+        run_id = str(uuid.uuid4())
+        
         def generate():
+            # Cada evento leva "id: N" para o buffer do run (reconexão via Last-Event-ID em join_run_stream)
+            event_id = 0
             try:
                 for event in graph_instance.stream({"messages": langchain_messages}, config=config):
-                    yield f"data: {json.dumps(event)}\n\n"
-                yield "data: [DONE]\n\n"
+                    yield f"id: {event_id}\ndata: {fast_dumps(to_jsonable(event))}\n\n"
+                    event_id += 1
+                yield f"id: {event_id}\ndata: [DONE]\n\n"
             except Exception as e:
                 error_event = {"event": "error", "data": {"error": str(e)}}
-                yield f"data: {json.dumps(error_event)}\n\n"
+                yield f"id: {event_id}\ndata: {json.dumps(error_event)}\n\n"
+                raise
         
-        return Response(
-            generate(),
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'X-Accel-Buffering': 'no'
-            }
-        )
+        headers = {
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'X-Run-ID': run_id
+        }
+        # Executa no pool do RunManager como os demais runs de stream (fila limitada, cancelamento
+        # quando o cliente desconecta com on_disconnect=cancel)
+        assistant_id = data.get("assistant_id", "agent")
+        rolled_back = _prepare_rollback(graph_instance, thread_id, config, multitask_strategy)
+        _track_run(run_id, thread_id, assistant_id, config, data.get("metadata"))
+        return _submit_stream_run(generate(), run_id, thread_id, assistant_id,
+                                  data.get("on_disconnect") or "cancel", headers, "stream_thread",
+                                  multitask_strategy=multitask_strategy, rolled_back=rolled_back)
         
     except Exception as e:
         logger.error(f"[LangGraphServer] Erro ao fazer stream da thread {thread_id}: {e}")
@@ -2103,11 +2377,14 @@ def stream_thread(thread_id):
 
 @langgraph_server_bp.route('/runs/wait', methods=['POST', 'OPTIONS'])
 @langgraph_server_bp.route('/langgraph/runs/wait', methods=['POST', 'OPTIONS'])
+@idempotent
 def create_stateless_run_wait():
     """
     Cria um run stateless (sem thread_id) e espera pela conclusão.
     
-    Executa o grafo diretamente sem persistência de estado entre execuções.
+    Executa o grafo sem persistência de estado entre execuções
+    (variante do grafo sem checkpointer, ver get_stateless_graph), como run do pool do
+    RunManager: com pool e fila cheios responde 503.
     Útil para requisições one-shot onde não é necessário manter histórico.
     
     Formato esperado:
@@ -2121,6 +2398,9 @@ def create_stateless_run_wait():
     }
     
     Retorna resultado completo após conclusão.
+    Com o header Idempotency-Key, repetições recebem o resultado da primeira execução.
+    Requisições idênticas (assistant_id, input e config) simultâneas compartilham uma
+    única execução do grafo; as que reaproveitam o resultado recebem X-Coalesced: true.
     """
     start_time = datetime.utcnow()
     try:
@@ -2148,7 +2428,7 @@ def create_stateless_run_wait():
         
         # Obter grafo
         try:
-            graph_instance = get_graph()
+            graph_instance = get_stateless_graph()
         except Exception as graph_error:
             logger.error(f"[LangGraphServer] create_stateless_run_wait: Erro ao obter grafo: {graph_error}")
             import traceback
@@ -2171,19 +2451,35 @@ def create_stateless_run_wait():
             elif hasattr(msg, 'content'):
                 langchain_messages.append(msg)
         
-        # Gerar run_id para tracking
-        run_id = str(uuid.uuid4())
-        
         if "configurable" not in config:
             config["configurable"] = {}
         _inject_regras_redirecionamento(config)
         
-        # Executar grafo sem thread_id (stateless)
-        logger.info(f"[LangGraphServer] create_stateless_run_wait: Executando grafo para run {run_id}")
-        result = graph_instance.invoke({"messages": langchain_messages}, config=config)
-        
-        # Converter mensagens do resultado
-        all_messages = convert_messages_to_json(result.get("messages", []))
+        def execute():
+            # Gerar run_id para tracking
+            run_id = str(uuid.uuid4())
+            # Executar grafo sem thread_id (stateless) no pool do RunManager; o status no
+            # registro acompanha o run (listener do RunManager)
+            logger.info(f"[LangGraphServer] create_stateless_run_wait: Executando grafo para run {run_id}")
+            _track_run(run_id, None, assistant_id, config, metadata)
+            result, run = _invoke_run(graph_instance, {"messages": langchain_messages}, config,
+                                      run_id, None, assistant_id)
+            if run.status == "interrupted":
+                # Exceção: o single-flight não guarda o resultado de um run cancelado
+                raise _RunInterrupted(run_id)
+            # Converter mensagens do resultado
+            return run_id, convert_messages_to_json(result.get("messages", []))
+        
+        # Requisições idênticas simultâneas compartilham uma única execução (single-flight)
+        key = coalesce_key(assistant_id, input_data, config)
+        try:
+            (run_id, all_messages), coalesced = _single_flight.do(key, execute)
+        except (ThreadBusy, RunQueueFull) as e:
+            return _admission_error_response(e, "create_stateless_run_wait")
+        except _RunInterrupted as e:
+            return jsonify({"error": "Run cancelado", "message": f"Run {e} foi cancelado"}), 409
+        if coalesced:
+            logger.info(f"[LangGraphServer] create_stateless_run_wait: Resultado compartilhado do run {run_id}")
         
         run_result = {
             "run_id": run_id,
@@ -2198,8 +2494,12 @@ def create_stateless_run_wait():
         }
         
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-        log_response("create_stateless_run_wait", 200, duration_ms, run_id=run_id, messages_count=len(all_messages))
-        return jsonify(run_result), 200
+        log_response("create_stateless_run_wait", 200, duration_ms, run_id=run_id,
+                     messages_count=len(all_messages), coalesced=coalesced)
+        response = jsonify(run_result)
+        if coalesced:
+            response.headers["X-Coalesced"] = "true"
+        return response, 200
         
     except Exception as e:
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -2213,7 +2513,8 @@ def create_stateless_run_stream():
     """
     Cria um run stateless (sem thread_id) e faz stream do output em tempo real.
     
-    Executa o grafo diretamente sem persistência de estado, fazendo stream dos eventos.
+    Executa o grafo diretamente sem persistência de estado, fazendo stream dos eventos
+    (variante do grafo sem checkpointer, ver get_stateless_graph).
     
     Formato esperado:
     {
@@ -2223,7 +2524,8 @@ def create_stateless_run_stream():
         },
         "stream_mode": "values",
         "metadata": {},
-        "config": {}
+        "config": {},
+        "on_disconnect": "cancel"  # Opcional: "cancel", "continue"
     }
     """
     start_time = datetime.utcnow()
@@ -2239,12 +2541,14 @@ def create_stateless_run_stream():
         assistant_id = data.get("assistant_id", "agent")
         input_data = data.get("input", {})
         messages = input_data.get("messages", [])
-        stream_mode = data.get("stream_mode", "values")
+        stream_modes = _normalize_stream_modes(data.get("stream_mode", "values"))
+        values_delta = values_delta_requested(request)
         metadata = data.get("metadata", {})
         config = data.get("config", {})
+        on_disconnect = data.get("on_disconnect") or "cancel"
         
         log_request("create_stateless_run_stream", request.method, assistant_id=assistant_id, 
-                   messages_count=len(messages), stream_mode=stream_mode)
+                   messages_count=len(messages), stream_mode=stream_modes)
         
         # Validar mensagens
         is_valid, error_response = validate_messages(messages)
@@ -2254,7 +2558,7 @@ def create_stateless_run_stream():
         
         # Obter grafo
         try:
-            graph_instance = get_graph()
+            graph_instance = get_stateless_graph()
         except Exception as graph_error:
             logger.error(f"[LangGraphServer] create_stateless_run_stream: Erro ao obter grafo: {graph_error}")
             import traceback
@@ -2285,88 +2589,10 @@ def create_stateless_run_stream():
         _inject_regras_redirecionamento(config)
         
         def generate():
-            try:
-                event_id = 0
-                
-                # Enviar evento de início do run
-                yield f"id: {event_id}\n"
-                yield f"event: run_start\n"
-                yield f"data: {json.dumps({'run_id': run_id, 'assistant_id': assistant_id})}\n\n"
-                event_id += 1
-                
-                # Stream dos eventos do grafo (sem thread_id)
-                stream_input = {"messages": langchain_messages}
-                for event in graph_instance.stream(stream_input, config=config):
-                    try:
-                        # Processar evento conforme formato
-                        event_data = {}
-                        node_name = None
-                        
-                        if isinstance(event, tuple) and len(event) == 2:
-                            node_name, state_obj = event
-                            if isinstance(state_obj, dict):
-                                event_data = state_obj
-                            elif hasattr(state_obj, "values"):
-                                event_data = {"values": state_obj.values}
-                            elif hasattr(state_obj, "__dict__"):
-                                event_data = state_obj.__dict__
-                            else:
-                                event_data = {"state": str(state_obj)}
-                        elif isinstance(event, dict):
-                            event_data = event
-                            node_name = event.get("node") or event.get("__pregel_node")
-                        else:
-                            event_data = {"raw": str(event)}
-                        
-                        # Extrair valores do estado
-                        state_values = {}
-                        if isinstance(event_data, dict):
-                            if "values" in event_data:
-                                state_values = event_data["values"]
-                            else:
-                                state_values = event_data
-                        
-                        # Converter state_values para formato JSON serializável
-                        # Isso converte mensagens LangChain (AIMessage, HumanMessage, etc.) para formato JSON
-                        state_values_json = convert_state_to_json(state_values)
-                        event_data_json = convert_state_to_json(event_data)
-                        
-                        # Formatar evento conforme stream_mode
-                        if stream_mode == "values":
-                            yield f"id: {event_id}\n"
-                            yield f"event: state_update\n"
-                            yield f"data: {json.dumps({'run_id': run_id, 'node': node_name, 'values': state_values_json})}\n\n"
-                            event_id += 1
-                        elif stream_mode == "updates":
-                            yield f"id: {event_id}\n"
-                            yield f"event: state_update\n"
-                            yield f"data: {json.dumps({'run_id': run_id, 'node': node_name, 'update': event_data_json})}\n\n"
-                            event_id += 1
-                        else:
-                            yield f"id: {event_id}\n"
-                            yield f"event: state_update\n"
-                            yield f"data: {json.dumps({'run_id': run_id, 'node': node_name, 'event': event_data_json})}\n\n"
-                            event_id += 1
-                    except Exception as stream_error:
-                        logger.error(f"[LangGraphServer] create_stateless_run_stream: Erro ao processar evento: {stream_error}")
-                        continue
-                
-                # Enviar evento de conclusão
-                yield f"id: {event_id}\n"
-                yield f"event: run_end\n"
-                yield f"data: {json.dumps({'run_id': run_id, 'status': 'completed'})}\n\n"
-                
-            except Exception as e:
-                error_event = {
-                    "event": "error",
-                    "data": {
-                        "run_id": run_id,
-                        "error": str(e)
-                    }
-                }
-                yield f"id: {event_id}\n"
-                yield f"event: error\n"
-                yield f"data: {json.dumps(error_event)}\n\n"
+            stream_input = {"messages": langchain_messages}
+            start_data = {'run_id': run_id, 'assistant_id': assistant_id}
+            yield from _stream_run_events(graph_instance, stream_input, config, stream_modes, run_id,
+                                          start_data, "create_stateless_run_stream", values_delta=values_delta)
         
         headers = {
             'Cache-Control': 'no-cache',
@@ -2374,15 +2600,15 @@ def create_stateless_run_stream():
             'Content-Type': 'text/event-stream',
             'X-Run-ID': run_id
         }
+        if values_delta:
+            headers['X-Values-Mode'] = 'delta'
         
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
         log_response("create_stateless_run_stream", 200, duration_ms, run_id=run_id, stream_started=True)
         
-        return Response(
-            generate(),
-            mimetype='text/event-stream',
-            headers=headers
-        )
+        _track_run(run_id, None, assistant_id, config, metadata)
+        return _submit_stream_run(generate(), run_id, None, assistant_id, on_disconnect, headers,
+                                  "create_stateless_run_stream")
         
     except Exception as e:
         duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -2390,6 +2616,167 @@ def create_stateless_run_stream():
         return jsonify({"error": str(e)}), 500
 
 
+def _to_langchain_messages(messages):
+    """Converte mensagens {"role", "content"} do body para mensagens LangChain."""
+    classes = {"user": HumanMessage, "assistant": AIMessage, "system": SystemMessage}
+    return [classes[msg["role"]](content=msg.get("content", ""))
+            for msg in messages if isinstance(msg, dict) and msg.get("role") in classes]
+
+
+@langgraph_server_bp.route('/runs/batch', methods=['POST', 'OPTIONS'])
+@langgraph_server_bp.route('/langgraph/runs/batch', methods=['POST', 'OPTIONS'])
+def create_batch_runs():
+    """
+    Executa vários inputs com paralelismo limitado e transmite os resultados em NDJSON.
+    
+    Formato esperado:
+    {
+        "assistant_id": "agent",
+        "inputs": [
+            {"input": {"messages": [...]}, "thread_id": "opcional", "config": {}, "metadata": {}},
+            ...
+        ],
+        "config": {},  # Opcional: config comum, mesclada com a config de cada item
+        "max_concurrency": 4,  # Opcional: limitado por LANGGRAPH_BATCH_MAX_CONCURRENCY
+        "multitask_strategy": "reject"  # Opcional: vale para itens com thread_id
+    }
+    
+    Itens sem thread_id executam no grafo stateless; com thread_id, no grafo com
+    checkpointer (itens da mesma thread executam em sequência). Cada item é um run do
+    RunManager: passa pela admissão por thread (com reject, thread com run em andamento
+    gera erro no item) e pela fila do processo (fila cheia também gera erro no item). Cada linha da resposta é um resultado, na ordem em
+    que os itens terminam:
+    {"type": "item", "index", "run_id", "thread_id", "status", "values" | "error", "queued_ms", "duration_ms"}
+    e a última linha é {"type": "summary", "total", "succeeded", "failed", "duration_ms"}.
+    Falhas de itens não interrompem o lote (ver app/services/batch_runner.py).
+    """
+    start_time = datetime.utcnow()
+    try:
+        if request.method == 'OPTIONS':
+            return '', 200
+        
+        data, error_response = validate_request_body(['inputs'])
+        if error_response:
+            log_error("create_batch_runs", "Request body inválido", {})
+            return error_response
+        
+        inputs = data.get("inputs")
+        if not isinstance(inputs, list) or not inputs:
+            return jsonify({"error": "inputs deve ser uma lista não vazia"}), 400
+        if len(inputs) > BATCH_MAX_ITEMS:
+            return jsonify({
+                "error": "Lote grande demais",
+                "message": f"Máximo de {BATCH_MAX_ITEMS} itens por lote, recebido: {len(inputs)}"
+            }), 400
+        
+        assistant_id = data.get("assistant_id", "agent")
+        multitask_strategy, error_response = _multitask_strategy(data)
+        if error_response:
+            return error_response
+        shared_config = data.get("config") or {}
+        try:
+            max_concurrency = max(1, min(int(data.get("max_concurrency") or BATCH_MAX_CONCURRENCY), BATCH_MAX_CONCURRENCY))
+        except (TypeError, ValueError):
+            return jsonify({"error": "max_concurrency deve ser um inteiro"}), 400
+        
+        log_request("create_batch_runs", request.method, assistant_id=assistant_id,
+                    items=len(inputs), max_concurrency=max_concurrency)
+        
+        # Obter grafos (stateless para itens sem thread, com checkpointer para os demais)
+        try:
+            graph_instance = get_graph()
+            stateless_graph = get_stateless_graph()
+        except Exception as graph_error:
+            logger.error(f"[LangGraphServer] create_batch_runs: Erro ao obter grafo: {graph_error}")
+            return jsonify({
+                "error": "Grafo não disponível",
+                "message": str(graph_error)
+            }), 503
+        
+        # Preparar os itens ainda no contexto da requisição (regras de Autonomia usam o token)
+        items = []
+        for item in inputs:
+            item = item if isinstance(item, dict) else {}
+            messages = (item.get("input") or {}).get("messages", [])
+            is_valid, invalid_response = validate_messages(messages)
+            thread_id = item.get("thread_id")
+            item_config = {**shared_config, **(item.get("config") or {})}
+            item_config["configurable"] = {
+                **(shared_config.get("configurable") or {}),
+                **((item.get("config") or {}).get("configurable") or {}),
+            }
+            if thread_id:
+                item_config["configurable"]["thread_id"] = thread_id
+            _inject_regras_redirecionamento(item_config)
+            items.append({
+                "thread_id": thread_id,
+                "config": item_config,
+                "metadata": item.get("metadata") or {},
+                "messages": _to_langchain_messages(messages) if is_valid else None,
+                "invalid": None if is_valid else invalid_response[0].get_json(),
+            })
+        
+        # Itens executam no pool do lote, fora do contexto da requisição
+        request_span = span_tracer.current_span()
+        
+        def execute(index, item):
+            if item["invalid"] is not None:
+                raise ValueError(item["invalid"].get("message") or item["invalid"].get("error"))
+            thread_id = item["thread_id"]
+            run_id = str(uuid.uuid4())
+            config = item["config"]
+            graph = graph_instance if thread_id else stateless_graph
+            rolled_back = _prepare_rollback(graph, thread_id, config, multitask_strategy)
+            _track_run(run_id, thread_id, assistant_id, config, {**item["metadata"], "batch_index": index},
+                       parent_span=request_span)
+            # Admissão por thread e fila do RunManager, como os demais runs (ThreadBusy/RunQueueFull = erro do item)
+            try:
+                result, run = _invoke_run(graph, {"messages": item["messages"]}, config, run_id, thread_id,
+                                          assistant_id, multitask_strategy, rolled_back)
+            except (ThreadBusy, RunQueueFull):
+                raise
+            except Exception as run_error:
+                logger.warning(f"[LangGraphServer] create_batch_runs: Item {index} (run {run_id}) falhou: {run_error}")
+                return {"run_id": run_id, "thread_id": thread_id, "status": "error", "error": str(run_error)}
+            if run.status == "interrupted":
+                return {"run_id": run_id, "thread_id": thread_id, "status": "error", "error": "Run cancelado"}
+            return {
+                "run_id": run_id,
+                "thread_id": thread_id,
+                "values": {"messages": convert_messages_to_json(result.get("messages", []))},
+            }
+        
+        execute = tracing.bind_call(execute)
+        
+        def generate():
+            counts = {"success": 0, "error": 0}
+            batch_started = datetime.utcnow()
+            for result in run_batch(items, execute, max_concurrency, group_key=lambda item: item["thread_id"]):
+                counts[result["status"]] += 1
+                yield fast_dumps({"type": "item", **result}) + "\n"
+            duration_ms = int((datetime.utcnow() - batch_started).total_seconds() * 1000)
+            log_response("create_batch_runs", 200, duration_ms, items=len(items),
+                         succeeded=counts["success"], failed=counts["error"])
+            yield fast_dumps({
+                "type": "summary",
+                "total": len(items),
+                "succeeded": counts["success"],
+                "failed": counts["error"],
+                "duration_ms": duration_ms,
+            }) + "\n"
+        
+        return Response(generate(), headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Content-Type': 'application/x-ndjson',
+        })
+        
+    except Exception as e:
+        duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+        log_error("create_batch_runs", e, {"duration_ms": duration_ms})
+        return jsonify({"error": str(e)}), 500
+
+
 @langgraph_server_bp.route('/debug/routes', methods=['GET'])
 def debug_routes():
     """
@@ -2483,6 +2870,23 @@ def get_store_namespaces():
         return jsonify({"error": str(e)}), 500
 
 
+@langgraph_server_bp.route('/ready', methods=['GET'])
+@langgraph_server_bp.route('/langgraph/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness: 200 quando o warmup terminou e o grafo está carregado, 503 caso contrário.
+    Retorna as fases do warmup com status e duração (ms). Se o worker ainda não estiver
+    pronto, tenta aquecer de novo (respeitando o backoff do carregamento do grafo).
+    """
+    if not _warmup.ready:
+        warmup_graph()
+    snapshot = _warmup.snapshot()
+    if _graph_error is not None and _graph is None:
+        snapshot["graph_error"] = str(_graph_error)
+        snapshot["retry_in_seconds"] = round(max(0.0, _graph_backoff.retry_at - time.monotonic()), 1)
+    return jsonify(snapshot), 200 if snapshot["ready"] else 503
+
+
 @langgraph_server_bp.route('/health', methods=['GET'])
 @langgraph_server_bp.route('/langgraph/health', methods=['GET'])
 def health_check():
@@ -2500,12 +2904,20 @@ def health_check():
             logger.warning(f"[LangGraphServer] health_check: Grafo não disponível: {e}")
         
         if graph_available:
-            return jsonify({
+            result = {
                 "status": "ok",
                 "message": "LangGraph Server está disponível",
                 "assistants": ["agent"],
                 "graph_available": True
-            }), 200
+            }
+            # Métricas de memória/evicção do checkpointer em memória (LANGGRAPH_CHECKPOINTER=memory)
+            checkpointer = getattr(graph_instance, "checkpointer", None)
+            if hasattr(checkpointer, "metrics"):
+                result["checkpointer"] = checkpointer.metrics()
+            # Pool de runs em background (RunManager)
+            result["runs"] = _run_manager.metrics()
+            result["coalescing"] = _single_flight.metrics()
+            return jsonify(result), 200
         else:
             return jsonify({
                 "status": "partial",
@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+
+from app.services import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métricas no formato de exposição do Prometheus, somadas entre os workers (ver app/services/metrics.py)"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
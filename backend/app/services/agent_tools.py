@@ -1,18 +1,20 @@
 """
 Tools/Funções que o agente pode usar para análise e recomendações.
-Cada tool é decorado com @traceable para rastreamento e retorna dados estruturados.
+Cada tool é decorado com @traceable para rastreamento e retorna dados estruturados
+(conforme LANGGRAPH_TRACING_MODE: off devolve a função sem wrapper, ver tracing_mode.py).
 """
 import os
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel, Field
-from langsmith import traceable
+
+from app.services.tracing_mode import tracing
 
 # Helper para criar decorator traceable com project_name padrão
 def traceable_tool(name: str):
-    """Cria decorator traceable com project_name configurado"""
+    """Cria decorator traceable com project_name configurado (off/sampled/full)"""
     project_name = os.getenv('LANGSMITH_PROJECT', 'alphaadvisor')
-    return traceable(name=name, project_name=project_name)
+    return tracing.traceable(name, project_name)
 
 # Importar dados do cliente
 try:
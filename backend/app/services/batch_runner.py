@@ -0,0 +1,87 @@
+"""
+Execução em lote de runs (POST /runs/batch) com paralelismo limitado.
+
+Jobs noturnos de avaliação e revisão de carteiras faziam um POST /runs/wait por
+vez. run_batch() recebe a lista de itens e uma função que executa um item, roda
+os itens num pool de até max_concurrency threads e devolve os resultados na ordem
+em que terminam (o endpoint transmite cada um como uma linha NDJSON):
+
+- falha de um item não interrompe o lote: o item sai com status "error";
+- itens da mesma thread (group_key) executam em sequência, na ordem do lote,
+  para não gravarem checkpoints concorrentes na mesma thread;
+- cada resultado traz index, status, queued_ms (espera até começar) e
+  duration_ms (execução do item);
+- se o consumidor parar de ler (cliente desconectou), os itens que ainda não
+  começaram são descartados.
+
+LANGGRAPH_BATCH_MAX_CONCURRENCY (padrão 4) limita o max_concurrency pedido e
+LANGGRAPH_BATCH_MAX_ITEMS (padrão 200) limita o tamanho do lote.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("LANGGRAPH_BATCH_MAX_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("LANGGRAPH_BATCH_MAX_ITEMS", "200"))
+
+
+def _elapsed_ms(since: float) -> int:
+    return int((time.monotonic() - since) * 1000)
+
+
+def run_batch(
+    items: Sequence[Any],
+    execute: Callable[[int, Any], Dict[str, Any]],
+    max_concurrency: int = 4,
+    group_key: Optional[Callable[[Any], Optional[Hashable]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Executa execute(index, item) para cada item e produz um resultado por item, na
+    ordem de término: {"index", "status": "success" | "error", "queued_ms",
+    "duration_ms", ...campos devolvidos por execute | "error"}. Exceções viram
+    status "error"; execute também pode devolver status/error junto com seus campos.
+    Itens com o mesmo group_key(item) não None executam em sequência.
+    """
+    # Grupos preservam a ordem do lote; itens sem chave formam grupos de um item
+    groups: Dict[Hashable, List[int]] = {}
+    for index, item in enumerate(items):
+        key = group_key(item) if group_key else None
+        groups.setdefault(("item", index) if key is None else ("group", key), []).append(index)
+
+    results: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    stop = threading.Event()
+    batch_started = time.monotonic()
+
+    def run_group(indexes: List[int]) -> None:
+        for index in indexes:
+            if stop.is_set():
+                return
+            queued_ms = _elapsed_ms(batch_started)
+            started = time.monotonic()
+            try:
+                output = execute(index, items[index]) or {}
+                result = {"index": index, "status": "success", **output}
+            except Exception as e:
+                logger.warning("[BatchRunner] Item %d falhou: %s", index, e)
+                result = {"index": index, "status": "error", "error": str(e)}
+            result["queued_ms"] = queued_ms
+            result["duration_ms"] = _elapsed_ms(started)
+            results.put(result)
+
+    workers = max(1, min(int(max_concurrency), len(groups) or 1))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="langgraph-batch")
+    try:
+        for indexes in groups.values():
+            executor.submit(run_group, indexes)
+        for _ in range(len(items)):
+            yield results.get()
+    finally:
+        # Consumidor parou (fim ou desconexão): itens ainda não iniciados são descartados
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
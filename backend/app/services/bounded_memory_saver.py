@@ -0,0 +1,216 @@
+"""
+Checkpointer em memória com limites (LANGGRAPH_CHECKPOINTER=memory).
+
+O MemorySaver guarda todo checkpoint de toda thread para sempre; como cada
+checkpoint carrega a lista completa de mensagens, um worker de longa duração
+cresce sem limite. O BoundedMemorySaver mantém o mesmo formato do InMemorySaver
+e aplica três limites após cada gravação:
+
+- máximo de threads: threads ociosas saem por LRU (último acesso em get/list/put);
+- máximo de checkpoints por thread: mantém os K mais recentes + o primeiro;
+- orçamento de bytes (tamanho serializado de checkpoints, blobs e writes):
+  threads menos recentes são removidas até caber.
+
+As métricas de evicção ficam em metrics() (exibidas em /health).
+
+Configuração via .env:
+- LANGGRAPH_MEMORY_MAX_THREADS (padrão 500)
+- LANGGRAPH_MEMORY_MAX_CHECKPOINTS (padrão 20 por thread)
+- LANGGRAPH_MEMORY_MAX_BYTES (padrão 268435456 = 256 MB)
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.memory import InMemorySaver
+
+logger = logging.getLogger(__name__)
+
+
+def _typed_size(value: Tuple[str, bytes]) -> int:
+    return len(value[0]) + len(value[1] or b"")
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """InMemorySaver com LRU de threads, limite de checkpoints por thread e orçamento de bytes."""
+
+    def __init__(
+        self,
+        max_threads: int = 500,
+        max_checkpoints_per_thread: int = 20,
+        max_bytes: int = 256 * 1024 * 1024,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.max_threads = max(1, int(max_threads))
+        self.max_checkpoints_per_thread = max(1, int(max_checkpoints_per_thread))
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.RLock()
+        # thread_id -> None, do menos para o mais recentemente usado
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        # Índices por thread para remoção em O(tamanho da thread)
+        self._blob_keys: Dict[str, Set[tuple]] = defaultdict(set)
+        self._write_keys: Dict[str, Set[tuple]] = defaultdict(set)
+        self._versions: Dict[tuple, Dict[str, Any]] = {}
+        self._thread_bytes: Dict[str, int] = defaultdict(int)
+        self._total_bytes = 0
+        self.stats = {
+            "threads_evicted_lru": 0,
+            "threads_evicted_bytes": 0,
+            "checkpoints_pruned": 0,
+            "blobs_pruned": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "BoundedMemorySaver":
+        """Cria o checkpointer a partir das variáveis de ambiente."""
+        return cls(
+            max_threads=int(os.getenv("LANGGRAPH_MEMORY_MAX_THREADS", "500")),
+            max_checkpoints_per_thread=int(os.getenv("LANGGRAPH_MEMORY_MAX_CHECKPOINTS", "20")),
+            max_bytes=int(os.getenv("LANGGRAPH_MEMORY_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    # ------------------------------------------------------------------
+    # Contabilidade
+    # ------------------------------------------------------------------
+
+    def _touch(self, thread_id: str) -> None:
+        with self._lock:
+            self._lru[thread_id] = None
+            self._lru.move_to_end(thread_id)
+
+    def _add_bytes(self, thread_id: str, size: int) -> None:
+        self._thread_bytes[thread_id] += size
+        self._total_bytes += size
+
+    def metrics(self) -> Dict[str, Any]:
+        """Tamanho atual e contadores de evicção."""
+        with self._lock:
+            return {
+                "threads": len(self._lru),
+                "bytes": self._total_bytes,
+                "max_threads": self.max_threads,
+                "max_checkpoints_per_thread": self.max_checkpoints_per_thread,
+                "max_bytes": self.max_bytes,
+                **self.stats,
+            }
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver
+    # ------------------------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig):
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self._lru:
+            self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any):
+        if config and config["configurable"]["thread_id"] in self._lru:
+            self._touch(config["configurable"]["thread_id"])
+        return super().list(config, **kwargs)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            size = _typed_size(self.storage[thread_id][checkpoint_ns][checkpoint["id"]][0])
+            size += _typed_size(self.storage[thread_id][checkpoint_ns][checkpoint["id"]][1])
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                if key not in self._blob_keys[thread_id]:
+                    self._blob_keys[thread_id].add(key)
+                    size += _typed_size(self.blobs[key])
+            self._versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            self._add_bytes(thread_id, size)
+            self._touch(thread_id)
+            self._prune_thread(thread_id, checkpoint_ns)
+            self._enforce_limits(thread_id)
+        return result
+
+    def put_writes(self, config: RunnableConfig, writes: Any, task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        outer_key = (thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"])
+        with self._lock:
+            before = sum(_typed_size(w[2]) for w in self.writes.get(outer_key, {}).values())
+            super().put_writes(config, writes, task_id, task_path)
+            after = sum(_typed_size(w[2]) for w in self.writes.get(outer_key, {}).values())
+            self._write_keys[thread_id].add(outer_key)
+            self._add_bytes(thread_id, after - before)
+            self._touch(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.storage.pop(thread_id, None)
+            for key in self._write_keys.pop(thread_id, set()):
+                self.writes.pop(key, None)
+            for key in self._blob_keys.pop(thread_id, set()):
+                self.blobs.pop(key, None)
+            for key in [k for k in self._versions if k[0] == thread_id]:
+                del self._versions[key]
+            self._total_bytes -= self._thread_bytes.pop(thread_id, 0)
+            self._lru.pop(thread_id, None)
+
+    # ------------------------------------------------------------------
+    # Limites
+    # ------------------------------------------------------------------
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Mantém o primeiro checkpoint e os K mais recentes do namespace; remove blobs órfãos."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        excess = len(checkpoints) - (self.max_checkpoints_per_thread + 1)
+        if excess <= 0:
+            return
+        ordered = sorted(checkpoints)
+        removed = 0
+        for checkpoint_id in ordered[1:1 + excess]:
+            saved = checkpoints.pop(checkpoint_id)
+            freed = _typed_size(saved[0]) + _typed_size(saved[1])
+            writes = self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            if writes:
+                freed += sum(_typed_size(w[2]) for w in writes.values())
+            self._write_keys[thread_id].discard((thread_id, checkpoint_ns, checkpoint_id))
+            self._versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self._add_bytes(thread_id, -freed)
+            removed += 1
+        self.stats["checkpoints_pruned"] += removed
+
+        # Blobs referenciados por algum checkpoint restante do namespace continuam
+        referenced = {
+            (thread_id, checkpoint_ns, channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in self._versions.get((thread_id, checkpoint_ns, checkpoint_id), {}).items()
+        }
+        for key in [k for k in self._blob_keys[thread_id] if k[1] == checkpoint_ns and k not in referenced]:
+            blob = self.blobs.pop(key, None)
+            self._blob_keys[thread_id].discard(key)
+            if blob is not None:
+                self._add_bytes(thread_id, -_typed_size(blob))
+                self.stats["blobs_pruned"] += 1
+
+    def _enforce_limits(self, current_thread: str) -> None:
+        """Remove threads menos recentes até respeitar max_threads e max_bytes."""
+        while len(self._lru) > self.max_threads:
+            victim = next(iter(self._lru))
+            self.delete_thread(victim)
+            self.stats["threads_evicted_lru"] += 1
+            logger.info("[BoundedMemorySaver] Thread %s removida por LRU", victim)
+        while self.max_bytes and self._total_bytes > self.max_bytes and len(self._lru) > 1:
+            victim = next(iter(self._lru))
+            if victim == current_thread:
+                break
+            self.delete_thread(victim)
+            self.stats["threads_evicted_bytes"] += 1
+            logger.info("[BoundedMemorySaver] Thread %s removida pelo orçamento de bytes", victim)
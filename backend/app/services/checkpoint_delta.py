@@ -0,0 +1,181 @@
+"""
+Armazenamento incremental (delta) da lista de mensagens nos checkpoints.
+
+Com MessagesState, cada checkpoint grava a lista `messages` inteira; uma thread de
+N turnos acaba guardando O(N²) mensagens. O MessageDeltaCodec grava, para cada nova
+versão do canal, só as mensagens acrescentadas em relação à versão do checkpoint pai,
+com um snapshot completo a cada LANGGRAPH_CHECKPOINT_SNAPSHOT_EVERY versões (padrão 10).
+
+Formato: blobs delta têm type "delta+<type do serde>" e conteúdo
+{"base": <versão anterior>, "depth": <n>, "append": [mensagens novas]}. Blobs com
+qualquer outro type são valores completos, então bancos já existentes são lidos sem
+migração e o delta pode ser desligado (LANGGRAPH_CHECKPOINT_DELTA=false) a qualquer momento.
+
+O delta só é usado quando a nova lista começa exatamente pelos mesmos objetos de
+mensagem da versão anterior (mesma execução ou mesma thread recém-carregada neste
+processo); em qualquer outro caso (fork/time-travel, outro worker, edição de mensagem)
+grava-se o valor completo.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DELTA_PREFIX = "delta+"
+DEFAULT_SNAPSHOT_EVERY = 10
+
+
+def is_delta(type_: str) -> bool:
+    return bool(type_) and type_.startswith(DELTA_PREFIX)
+
+
+class _LRU(OrderedDict):
+    def __init__(self, max_size: int) -> None:
+        super().__init__()
+        self.max_size = max_size
+
+    def get_touch(self, key: Any) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class MessageDeltaCodec:
+    """Codifica/decodifica blobs de canais de lista (ex.: messages) como deltas."""
+
+    def __init__(
+        self,
+        serde: Any,
+        channels: Tuple[str, ...] = ("messages",),
+        snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+        cache_size: int = 256,
+    ) -> None:
+        self.serde = serde
+        self.channels = tuple(channels)
+        self.snapshot_every = max(1, int(snapshot_every))
+        self._lock = threading.Lock()
+        # (thread, ns, channel) -> (checkpoint_id, version, lista de referências, profundidade)
+        self._heads = _LRU(cache_size)
+        # (thread, ns, channel, version) -> (tupla de mensagens, profundidade)
+        self._decoded = _LRU(cache_size)
+        self.stats = {"deltas": 0, "snapshots": 0}
+
+    @classmethod
+    def from_env(cls, serde: Any) -> Optional["MessageDeltaCodec"]:
+        """Codec configurado por variáveis de ambiente, ou None se o delta estiver desligado."""
+        if os.getenv("LANGGRAPH_CHECKPOINT_DELTA", "true").lower() != "true":
+            return None
+        return cls(serde, snapshot_every=int(os.getenv("LANGGRAPH_CHECKPOINT_SNAPSHOT_EVERY", str(DEFAULT_SNAPSHOT_EVERY))))
+
+    def encode(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        parent_checkpoint_id: Optional[str],
+        checkpoint_id: str,
+        channel: str,
+        version: Any,
+        value: Any,
+    ) -> Tuple[str, bytes]:
+        """Serializa o valor do canal como delta da versão do checkpoint pai, quando possível."""
+        key = (thread_id, checkpoint_ns, channel)
+        with self._lock:
+            head = self._heads.get_touch(key)
+        depth = 0
+        typed = None
+        if head is not None and isinstance(value, list):
+            head_checkpoint_id, base_version, base_refs, base_depth = head
+            n = len(base_refs)
+            if (
+                head_checkpoint_id == parent_checkpoint_id
+                and base_depth + 1 < self.snapshot_every
+                and len(value) >= n
+                and all(value[i] is base_refs[i] for i in range(n))
+            ):
+                depth = base_depth + 1
+                inner_type, blob = self.serde.dumps_typed(
+                    {"base": base_version, "depth": depth, "append": value[n:]}
+                )
+                typed = (DELTA_PREFIX + inner_type, blob)
+        if typed is None:
+            typed = self.serde.dumps_typed(value)
+        with self._lock:
+            self.stats["deltas" if depth else "snapshots"] += 1
+            if isinstance(value, list):
+                self._heads.put(key, (checkpoint_id, version, list(value), depth))
+        return typed
+
+    def advance(self, thread_id: str, checkpoint_ns: str, parent_checkpoint_id: Optional[str], checkpoint_id: str) -> None:
+        """Checkpoint novo sem nova versão do canal: a cabeça passa a ser o novo checkpoint."""
+        with self._lock:
+            for channel in self.channels:
+                key = (thread_id, checkpoint_ns, channel)
+                head = self._heads.get(key)
+                if head is not None and head[0] == parent_checkpoint_id:
+                    self._heads.put(key, (checkpoint_id,) + head[1:])
+
+    def observe(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, channel: str, version: Any, value: Any) -> None:
+        """Registra o último checkpoint lido: o próximo put da thread pode gravar delta sobre ele."""
+        if channel not in self.channels or not isinstance(value, list):
+            return
+        key = (thread_id, checkpoint_ns, channel)
+        with self._lock:
+            decoded = self._decoded.get((thread_id, checkpoint_ns, channel, version))
+            depth = decoded[1] if decoded else 0
+            self._heads.put(key, (checkpoint_id, version, list(value), depth))
+
+    def decode(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        channel: str,
+        version: Any,
+        typed: Tuple[str, bytes],
+        load_raw: Callable[[Any], Optional[Tuple[str, bytes]]],
+    ) -> Any:
+        """
+        Reconstrói o valor completo de um blob (delta ou não).
+        load_raw(versão) retorna o blob bruto (type, bytes) de outra versão do mesmo canal.
+        """
+        if not is_delta(typed[0]):
+            return self.serde.loads_typed(typed)
+        cache_key = (thread_id, checkpoint_ns, channel, version)
+        with self._lock:
+            cached = self._decoded.get_touch(cache_key)
+        if cached is not None:
+            return list(cached[0])
+
+        # Sobe a cadeia de deltas até um snapshot (ou até uma versão já decodificada)
+        chain: List[Tuple[Any, Dict[str, Any]]] = []
+        current_version, current = version, typed
+        base_values: List[Any] = []
+        while True:
+            if not is_delta(current[0]):
+                base_values = list(self.serde.loads_typed(current))
+                break
+            payload = self.serde.loads_typed((current[0][len(DELTA_PREFIX):], current[1]))
+            chain.append((current_version, payload))
+            base_version = payload["base"]
+            with self._lock:
+                cached = self._decoded.get_touch((thread_id, checkpoint_ns, channel, base_version))
+            if cached is not None:
+                base_values = list(cached[0])
+                break
+            current = load_raw(base_version)
+            if current is None:
+                raise ValueError(f"Blob base ausente para {channel}@{base_version} (thread {thread_id})")
+            current_version = base_version
+
+        values = base_values
+        for chain_version, payload in reversed(chain):
+            values = values + list(payload["append"])
+            with self._lock:
+                self._decoded.put((thread_id, checkpoint_ns, channel, chain_version), (tuple(values), payload["depth"]))
+        return list(values)
@@ -0,0 +1,161 @@
+"""
+Descrição do grafo compilado para o LangSmith Studio (graph, schemas, subgraphs).
+
+GET /assistants/<id>/graph devolvia uma lista fixa de nós e arestas
+(init/agent/tools/end) que já não batia com langgraph_graph.py (nó context,
+handoff e roteamento condicional), e /schemas montava os schemas a cada
+requisição. Aqui tudo é derivado do grafo compilado uma única vez por grafo
+carregado:
+
+- estrutura em JSON (graph.get_graph(xray).to_json()) e em mermaid;
+- input/output/state/config/context JSON schemas;
+- subgrafos (namespace -> schemas), diretos ou recursivos.
+
+As variantes ficam em cache por chave normalizada: xray vira False, True ou uma
+profundidade de 1 a MAX_XRAY_DEPTH - 1 (valores maiores equivalem a True) e
+subgrafos só são guardados para namespaces existentes, então parâmetros
+arbitrários da query string não fazem o cache crescer.
+
+Cada recurso tem um ETag derivado do conteúdo e da versão do grafo (hash da
+estrutura + schemas): o endpoint responde 304 para If-None-Match igual. Quando o
+grafo é recarregado (outra instância), o servidor cria um novo GraphIntrospection
+e os ETags mudam.
+"""
+import hashlib
+import json
+import logging
+import threading
+import warnings
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import create_model
+
+logger = logging.getLogger(__name__)
+
+# Profundidade de xray a partir da qual o resultado é o mesmo de xray=True
+MAX_XRAY_DEPTH = 8
+
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_xray(xray: Any) -> Any:
+    """xray como False, True ou profundidade em [1, MAX_XRAY_DEPTH) (chave de cache limitada)."""
+    if isinstance(xray, bool):
+        return xray
+    try:
+        depth = int(xray)
+    except (TypeError, ValueError):
+        return bool(xray)
+    if depth <= 0:
+        return False
+    return True if depth >= MAX_XRAY_DEPTH else depth
+
+
+def _state_jsonschema(graph: Any) -> Dict[str, Any]:
+    """Schema do estado completo a partir dos canais do grafo (fallback: schema de output)."""
+    try:
+        fields = {key: (graph.channels[key].UpdateType, None) for key in graph.stream_channels_list}
+        return create_model(graph.get_name("State"), **fields).model_json_schema()
+    except Exception as e:
+        logger.debug("[GraphIntrospection] Schema de estado pelos canais falhou (%s); usando output", e)
+        return graph.get_output_jsonschema()
+
+
+def _config_jsonschema(graph: Any) -> Optional[Dict[str, Any]]:
+    try:
+        with warnings.catch_warnings():
+            # config_schema está deprecado no LangGraph 1.x (context_schema), mas o Studio ainda lê
+            warnings.simplefilter("ignore")
+            return graph.get_config_jsonschema()
+    except Exception as e:
+        logger.debug("[GraphIntrospection] Config schema indisponível: %s", e)
+        return None
+
+
+def _context_jsonschema(graph: Any) -> Optional[Dict[str, Any]]:
+    get_schema = getattr(graph, "get_context_jsonschema", None)
+    try:
+        return get_schema() if get_schema else None
+    except Exception as e:
+        logger.debug("[GraphIntrospection] Context schema indisponível: %s", e)
+        return None
+
+
+def graph_schemas(graph: Any, graph_id: str) -> Dict[str, Any]:
+    """Schemas no formato de GET /assistants/<id>/schemas do LangGraph Server."""
+    return {
+        "graph_id": graph_id,
+        "input_schema": graph.get_input_jsonschema(),
+        "output_schema": graph.get_output_jsonschema(),
+        "state_schema": _state_jsonschema(graph),
+        "config_schema": _config_jsonschema(graph),
+        "context_schema": _context_jsonschema(graph),
+    }
+
+
+class GraphIntrospection:
+    """Estrutura, schemas e subgrafos de um grafo compilado, calculados uma vez (com ETag)."""
+
+    def __init__(self, graph: Any, graph_id: str = "agent") -> None:
+        self.graph = graph
+        self.graph_id = graph_id
+        self._lock = threading.Lock()
+        # recurso -> (conteúdo, etag); variantes (xray, recurse) calculadas na primeira consulta
+        self._cache: Dict[Tuple[Any, ...], Tuple[Any, str]] = {}
+        structure = self._structure(xray=False)
+        schemas = graph_schemas(graph, graph_id)
+        self.version = _digest([structure, schemas])
+        self._store(("graph", False), structure)
+        self._store(("schemas",), schemas)
+        self._store(("mermaid", False), graph.get_graph().draw_mermaid())
+        logger.info("[GraphIntrospection] Grafo %s introspectado (versão %s, %d nós)",
+                    graph_id, self.version, len(structure.get("nodes", [])))
+
+    def _structure(self, xray: Any) -> Dict[str, Any]:
+        return self.graph.get_graph(xray=xray).to_json()
+
+    def _store(self, key: Tuple[Any, ...], value: Any) -> Tuple[Any, str]:
+        entry = (value, f"{self.version}-{_digest([key, value])}")
+        self._cache[key] = entry
+        return entry
+
+    def _get(self, key: Tuple[Any, ...], compute) -> Tuple[Any, str]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = self._store(key, compute())
+            return entry
+
+    def graph_json(self, xray: Any = False) -> Tuple[Dict[str, Any], str]:
+        """(estrutura em JSON, etag); xray=True/int inclui os nós dos subgrafos."""
+        xray = normalize_xray(xray)
+        return self._get(("graph", xray), lambda: self._structure(xray))
+
+    def mermaid(self, xray: Any = False) -> Tuple[str, str]:
+        xray = normalize_xray(xray)
+        return self._get(("mermaid", xray), lambda: self.graph.get_graph(xray=xray).draw_mermaid())
+
+    def schemas(self) -> Tuple[Dict[str, Any], str]:
+        return self._get(("schemas",), lambda: graph_schemas(self.graph, self.graph_id))
+
+    def subgraphs(self, namespace: Optional[str] = None, recurse: bool = False) -> Tuple[Dict[str, Any], str]:
+        """(namespace -> schemas do subgrafo, etag)."""
+        def compute():
+            return {
+                ns: graph_schemas(subgraph, self.graph_id)
+                for ns, subgraph in self.graph.get_subgraphs(namespace=namespace, recurse=recurse)
+            }
+        key = ("subgraphs", namespace, bool(recurse))
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+        value = compute()
+        if namespace is not None and not value:
+            # Namespace inexistente: não entra no cache (a chave vem da URL)
+            return value, f"{self.version}-{_digest([key, value])}"
+        with self._lock:
+            return self._cache.get(key) or self._store(key, value)
@@ -0,0 +1,133 @@
+"""
+Armazenamento de chaves de idempotência (header Idempotency-Key).
+
+Studio e frontend repetem POST /threads, /threads/<id>/runs/stream e /runs/wait
+quando a rede oscila; sem idempotência cada repetição executa o grafo inteiro de
+novo. Com o header Idempotency-Key, a primeira requisição vira "dona" da chave e
+as repetições:
+
+- recebem a resposta guardada (JSON), ou, para streams, acompanham o run já
+  criado (run_id + buffer de eventos);
+- se chegarem enquanto a primeira ainda está em andamento, esperam ela terminar;
+- se vierem com outro corpo/rota para a mesma chave, recebem IdempotencyConflict.
+
+Só respostas 2xx são guardadas: erros (409 de thread ocupada, 429/503 de
+sobrecarga, 5xx ou exceções) liberam a chave e a próxima tentativa executa de
+novo. O endpoint escopa a chave por chamador (user_id do token ou do corpo) e
+rota, então a mesma chave de usuários diferentes não colide.
+
+O armazenamento é em memória, por processo, limitado por TTL
+(LANGGRAPH_IDEMPOTENCY_TTL, padrão 3600 s) e por número de chaves
+(LANGGRAPH_IDEMPOTENCY_MAX_KEYS, padrão 10000; as mais antigas já concluídas saem
+primeiro).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class IdempotencyConflict(Exception):
+    """Chave de idempotência reutilizada com outra requisição."""
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    """Identifica a requisição original (método, rota e corpo)."""
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), body or b""):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IdempotencyEntry:
+    """Estado de uma chave: em andamento (done não setado) ou concluída com o resultado."""
+
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint = fingerprint
+        self.created_at = time.time()
+        self.completed_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """Chaves de idempotência com TTL e limite de tamanho."""
+
+    def __init__(self, ttl_seconds: float = 3600, max_keys: int = 10000) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max(1, int(max_keys))
+        self._entries: "OrderedDict[str, IdempotencyEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "waits": 0, "conflicts": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyStore":
+        return cls(
+            ttl_seconds=float(os.getenv("LANGGRAPH_IDEMPOTENCY_TTL", "3600")),
+            max_keys=int(os.getenv("LANGGRAPH_IDEMPOTENCY_MAX_KEYS", "10000")),
+        )
+
+    def begin(self, key: str, fingerprint: str) -> Tuple[IdempotencyEntry, bool]:
+        """
+        Reserva a chave. Retorna (entrada, dona): dona=True quando esta requisição deve
+        executar e depois chamar complete()/release(); caso contrário a entrada é de
+        uma requisição anterior (concluída ou em andamento: aguarde entry.done).
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    self.stats["conflicts"] += 1
+                    raise IdempotencyConflict(f"Idempotency-Key {key!r} já usada com outra requisição")
+                self.stats["hits" if entry.done.is_set() else "waits"] += 1
+                return entry, False
+            entry = IdempotencyEntry(fingerprint)
+            self._entries[key] = entry
+            self._evict()
+            return entry, True
+
+    def complete(self, key: str, entry: IdempotencyEntry, result: Dict[str, Any]) -> None:
+        """Guarda o resultado da requisição dona e libera quem estiver esperando."""
+        with self._lock:
+            entry.result = result
+            entry.completed_at = time.time()
+            if self._entries.get(key) is entry:
+                self._entries.move_to_end(key)
+        entry.done.set()
+
+    def release(self, key: str, entry: IdempotencyEntry) -> None:
+        """Descarta a chave sem resultado (erro): a próxima tentativa executa de novo."""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def _expire(self, now: float) -> None:
+        # Concluídas são movidas para o fim na ordem de conclusão: basta varrer até a primeira válida
+        expired = []
+        for key, entry in self._entries.items():
+            if entry.completed_at is None:
+                continue
+            if now - entry.completed_at <= self.ttl_seconds:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._entries[key]
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_keys:
+            victim = next((k for k, e in self._entries.items() if e.done.is_set()), None)
+            if victim is None:
+                return  # só chaves em andamento: não descarta
+            del self._entries[victim]
+            self.stats["evicted"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
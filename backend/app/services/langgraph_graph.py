@@ -1,6 +1,7 @@
 """Agente LangGraph com ferramentas (ReAct) — módulo usado pelo Studio para Chat.
 
-Estado: MessagesState (chave "messages") para o Studio ativar a interface de Chat.
+Estado: MessagesState (chave "messages") para o Studio ativar a interface de Chat,
+estendido com o resumo da janela de contexto (ContextState).
 Usa as tools do backend Flask para análise de carteira e recomendações.
 Suporta regras de redirecionamento (handoff) via config.configurable.regras_redirecionamento.
 """
@@ -36,7 +37,15 @@ try:
     from langchain_openai import ChatOpenAI
     from langgraph.graph import MessagesState, StateGraph, START, END
     from langgraph.prebuilt import ToolNode
-    from langgraph.checkpoint.memory import MemorySaver
+
+    from app.services.model_registry import BoundModelRegistry
+    from app.services.sqlite_checkpointer import create_checkpointer
+    from app.services.context_window import (
+        ContextState,
+        ContextWindowSettings,
+        build_prompt_messages,
+        update_context,
+    )
 
     from app.services.langgraph_tools import (
         obter_perfil,
@@ -58,7 +67,8 @@ except Exception as e:
 
 # Usar modelo configurável via .env ou padrão gpt-4o
 model_name = os.getenv('AI_MODEL', 'gpt-4o')
-model = ChatOpenAI(model=model_name, temperature=0.7)
+model_temperature = 0.7
+model = ChatOpenAI(model=model_name, temperature=model_temperature)
 
 # Todas as tools do backend
 tools = [
@@ -73,6 +83,20 @@ tools = [
     consultar_regulacao,
 ]
 
+# Modelos com tools já vinculadas, por (modelo, temperatura, tools habilitadas)
+bound_models = BoundModelRegistry(
+    tools,
+    lambda name, temperature: ChatOpenAI(model=name, temperature=temperature),
+    model_name,
+    model_temperature,
+    # Modelos que o cliente pode pedir em configurable.model_name (além de AI_MODEL)
+    allowed_models=os.getenv("AI_MODEL_ALLOWLIST", "").split(","),
+)
+bound_models.register_model(model_name, model_temperature, model)
+
+# Janela de contexto: orçamento de tokens, truncamento de tools antigas e resumo incremental
+context_settings = ContextWindowSettings.from_env()
+
 tool_node = ToolNode(tools)
 
 SYSTEM = (
@@ -136,9 +160,17 @@ def end_node(state: MessagesState) -> dict:
     return state
 
 
-def agent_node(state: MessagesState) -> dict:
-    messages = [SystemMessage(content=SYSTEM)] + state["messages"]
-    response = model.bind_tools(tools).invoke(messages)
+def context_node(state: ContextState) -> dict:
+    """
+    Nó de gerenciamento de contexto (antes de cada chamada do agent).
+    Avança o início da janela quando o orçamento de tokens estoura e resume o que saiu.
+    """
+    return update_context(state, model, context_settings)
+
+
+def agent_node(state: ContextState, config: Optional[RunnableConfig] = None) -> dict:
+    messages = build_prompt_messages(SYSTEM, state, context_settings)
+    response = bound_models.get_for_config(config).invoke(messages)
     return {"messages": [response]}
 
 
@@ -341,14 +373,19 @@ def handoff_node(state: MessagesState, config: RunnableConfig) -> dict:
 
 
 try:
+    # Pré-vincular a combinação padrão para o primeiro turno não pagar o bind_tools
+    bound_models.warmup()
+
     # Criar checkpointer para preservar estado entre invocações
-    checkpointer = MemorySaver()
-    logger.info("[LangGraphGraph] Checkpointer (MemorySaver) criado")
+    # SQLite (WAL) por padrão: threads sobrevivem a restarts e são compartilhadas entre workers
+    checkpointer = create_checkpointer()
+    logger.info(f"[LangGraphGraph] Checkpointer ({type(checkpointer).__name__}) criado")
     
     # Construir grafo com nós explícitos init, end e handoff
     graph = (
-        StateGraph(MessagesState)
+        StateGraph(ContextState)
         .add_node("init", init_node)
+        .add_node("context", context_node)
         .add_node("agent", agent_node)
         .add_node("tools", tool_node)
         .add_node("end", end_node)
@@ -359,7 +396,7 @@ try:
             should_route_after_init,
             {
                 "handoff": "handoff",
-                "agent": "agent",
+                "agent": "context",
             },
         )
         .add_conditional_edges(
@@ -370,12 +407,13 @@ try:
                 "end": "end",
             },
         )
-        .add_edge("tools", "agent")
+        .add_edge("context", "agent")
+        .add_edge("tools", "context")
         .add_edge("end", END)
         .add_edge("handoff", END)
         .compile(name="agent", checkpointer=checkpointer)
     )
-    logger.info("[LangGraphGraph] Grafo compilado com sucesso (checkpointer, init/end/handoff)")
+    logger.info("[LangGraphGraph] Grafo compilado com sucesso (checkpointer, init/context/end/handoff)")
 except Exception as e:
     logger.error(f"[LangGraphGraph] Erro ao compilar grafo: {e}")
     import traceback
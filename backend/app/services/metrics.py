@@ -0,0 +1,453 @@
+"""
+Métricas no formato Prometheus (GET /metrics), agregadas em processo e entre workers.
+
+log_request/log_response só geravam linhas de log com duration_ms e os
+node_timings do TraceabilityService ficavam em arquivos de trace isolados. Aqui
+cada processo agrega em memória (contadores e histogramas com buckets fixos: um
+bisect + soma sob lock por observação):
+
+- http_request_duration_seconds{route, method, status}: hooks before/after_request (init_app);
+- langgraph_node_duration_seconds{node, status}: nós do grafo (init, context, agent, tools, handoff...);
+- llm_request_duration_seconds{model, purpose, status} e llm_tokens_total{model, purpose, type};
+  purpose vem do nó que chamou o modelo (agent, router no init/handoff, summary no context,
+  compliance no compliance_check);
+- tool_duration_seconds{tool, status};
+- gauges: sse_connections (streams abertos) e os registrados com gauge_callback
+  (ex.: langgraph_runs_in_flight do RunManager).
+
+Nós, LLM e tools são medidos por MetricsCallbackHandler, anexado aos callbacks de
+cada run do servidor (ver _track_run em langgraph_server).
+
+Vários workers (gunicorn): cada processo grava um snapshot em
+LANGGRAPH_METRICS_DIR/metrics-<pid>.json a cada LANGGRAPH_METRICS_FLUSH_SECONDS
+(padrão 5) e /metrics soma os snapshots de todos os workers. Contadores e
+histogramas de workers que já morreram continuam somados (séries monotônicas);
+gauges só contam processos vivos. Quando um worker sai, o master (child_exit em
+gunicorn.conf.py) chama mark_process_dead(pid): contadores e histogramas do
+snapshot são somados em metrics-dead.json e o arquivo do pid é removido (um pid
+reaproveitado não herda nem sobrescreve séries do worker morto). O diretório é
+limpo no start do gunicorn (on_starting). LANGGRAPH_METRICS_DIR vazio = só o
+processo atual.
+"""
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+GaugeCallback = Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(key: Iterable[Tuple[str, str]], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+               for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Tuple[Dict[Tuple[str, LabelKey], float],
+                                                                  Dict[Tuple[str, LabelKey], float],
+                                                                  Dict[Tuple[str, LabelKey], List[Any]]]:
+    """Soma contadores, gauges e histogramas de vários snapshots, por (nome, labels)."""
+    counters: Dict[Tuple[str, LabelKey], float] = {}
+    gauges: Dict[Tuple[str, LabelKey], float] = {}
+    histograms: Dict[Tuple[str, LabelKey], List[Any]] = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, value in snapshot["gauges"]:
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0.0) + value
+        for name, labels, bucket_counts, total, count in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            entry = histograms.get(key)
+            if entry is None or len(entry[0]) != len(bucket_counts):
+                histograms[key] = [list(bucket_counts), total, count]
+            else:
+                entry[0] = [a + b for a, b in zip(entry[0], bucket_counts)]
+                entry[1] += total
+                entry[2] += count
+    return counters, gauges, histograms
+
+
+class MetricsRegistry:
+    """Contadores, histogramas e gauges em memória, com snapshot por processo para agregação."""
+
+    def __init__(self, directory: Optional[str] = None, flush_seconds: float = 5.0) -> None:
+        self.directory = directory or None
+        self.flush_seconds = max(0.5, float(flush_seconds))
+        self._meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self._lock = threading.Lock()
+        self._reset()
+        self._gauge_callbacks: List[GaugeCallback] = []
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        if hasattr(os, "register_at_fork"):
+            # Worker não herda os números do master (gunicorn --preload)
+            os.register_at_fork(after_in_child=self._reset)
+
+    @classmethod
+    def from_env(cls) -> "MetricsRegistry":
+        directory = os.getenv("LANGGRAPH_METRICS_DIR")
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "alphaadvisor_metrics")
+        return cls(directory=directory or None, flush_seconds=float(os.getenv("LANGGRAPH_METRICS_FLUSH_SECONDS", "5")))
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        # (nome, labels) -> [contagens por bucket (+Inf no fim), soma, total]
+        self._histograms: Dict[Tuple[str, LabelKey], List[Any]] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._flusher_pid: Optional[int] = None
+
+    # ------------------------------------------------------------------
+    # Registro e coleta
+    # ------------------------------------------------------------------
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._meta[name] = (kind, help_text, tuple(buckets))
+
+    def gauge_callback(self, callback: GaugeCallback) -> None:
+        """Gauge calculado na coleta: callback() -> [(nome, labels, valor)]."""
+        self._gauge_callbacks.append(callback)
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1.0) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+        self._ensure_flusher()
+
+    def gauge_add(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0.0) + value
+        self._ensure_flusher()
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        buckets = self._meta[name][2] if name in self._meta else DEFAULT_BUCKETS
+        key = (name, _label_key(labels))
+        index = bisect_left(buckets, value)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+        self._ensure_flusher()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado deste processo (gauges de callback avaliados agora)."""
+        with self._lock:
+            counters = [[name, list(map(list, labels)), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(map(list, labels)), list(entry[0]), entry[1], entry[2]]
+                          for (name, labels), entry in self._histograms.items()]
+            gauges = [[name, list(map(list, labels)), value] for (name, labels), value in self._gauges.items()]
+        for callback in self._gauge_callbacks:
+            try:
+                for name, labels, value in callback():
+                    gauges.append([name, list(map(list, _label_key(labels))), value])
+            except Exception as e:
+                logger.warning("[Metrics] Gauge callback falhou: %s", e)
+        return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    # ------------------------------------------------------------------
+    # Agregação entre workers
+    # ------------------------------------------------------------------
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def flush(self) -> None:
+        """Grava o snapshot deste processo (escrita atômica via rename)."""
+        if not self.directory:
+            return
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("[Metrics] Falha ao gravar snapshot %s: %s", path, e)
+
+    def _ensure_flusher(self) -> None:
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        thread.start()
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def mark_process_dead(self, pid: int) -> None:
+        """
+        Arquiva o snapshot de um worker encerrado (chamado pelo master): contadores e
+        histogramas vão para metrics-dead.json, gauges são descartados.
+        """
+        if not self.directory:
+            return
+        path = self._snapshot_path(pid)
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        archive_path = os.path.join(self.directory, "metrics-dead.json")
+        snapshots = [snapshot]
+        try:
+            with open(archive_path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+        counters, _, histograms = _merge_snapshots(snapshots)
+        archive = {
+            "pid": 0,
+            "counters": [[name, list(map(list, labels)), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, list(map(list, labels)), *entry] for (name, labels), entry in histograms.items()],
+            "gauges": [],
+        }
+        tmp_path = f"{archive_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(archive, f)
+            os.replace(tmp_path, archive_path)
+            os.remove(path)
+        except OSError as e:
+            logger.warning("[Metrics] Falha ao arquivar snapshot do pid %s: %s", pid, e)
+
+    def clear_directory(self) -> None:
+        """Remove snapshots de execuções anteriores (chamado no start do servidor)."""
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Snapshot deste processo + os gravados pelos demais workers."""
+        own = self.snapshot()
+        snapshots = [own]
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if snapshot.get("pid") == own["pid"]:
+                    continue
+                if snapshot["gauges"] and not _pid_alive(snapshot.get("pid", 0)):
+                    snapshot["gauges"] = []
+                snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        counters, gauges, histograms = _merge_snapshots(self.collect())
+
+        lines: List[str] = []
+        names = sorted({name for name, _ in counters} | {name for name, _ in gauges}
+                       | {name for name, _ in histograms} | set(self._meta))
+        for name in names:
+            kind, help_text, buckets = self._meta.get(name, ("untyped", "", DEFAULT_BUCKETS))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(buckets) + [float("inf")], bucket_counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float("inf") else repr(float(bound))
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            else:
+                series = counters if kind == "counter" else gauges
+                for (metric, labels), value in sorted(series.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry.from_env()
+registry.describe("http_request_duration_seconds", "histogram", "Latência das requisições HTTP por rota e status")
+registry.describe("langgraph_node_duration_seconds", "histogram", "Duração de cada nó do grafo")
+registry.describe("llm_request_duration_seconds", "histogram", "Latência das chamadas de LLM por modelo e finalidade")
+registry.describe("llm_tokens_total", "counter", "Tokens de LLM por modelo, finalidade e tipo (input/output)")
+registry.describe("tool_duration_seconds", "histogram", "Duração da execução das tools")
+registry.describe("sse_connections", "gauge", "Streams SSE abertos")
+
+
+# ----------------------------------------------------------------------
+# Flask
+# ----------------------------------------------------------------------
+
+def init_app(app: Any) -> None:
+    """Mede a latência de todas as requisições da app (rota = regra do Flask, não a URL)."""
+    from flask import g, request
+
+    @app.before_request
+    def _metrics_start() -> None:
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response: Any) -> Any:
+        started = getattr(g, "_metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "<não encontrada>"
+            registry.observe("http_request_duration_seconds", time.perf_counter() - started,
+                             {"route": route, "method": request.method, "status": response.status_code})
+        return response
+
+
+def track_sse(events: Iterable[str]) -> Iterator[str]:
+    """Repassa os eventos de um stream SSE contando a conexão em sse_connections enquanto aberta."""
+    registry.gauge_add("sse_connections", 1)
+    try:
+        yield from events
+    finally:
+        registry.gauge_add("sse_connections", -1)
+
+
+# ----------------------------------------------------------------------
+# Callbacks (nós, LLM, tools)
+# ----------------------------------------------------------------------
+
+# Nó do grafo -> finalidade da chamada de LLM feita nele
+LLM_PURPOSES = {
+    "agent": "agent",
+    "init": "router",
+    "handoff": "router",
+    "context": "summary",
+    "compliance_check": "compliance",
+}
+
+
+def llm_usage(response: Any) -> Tuple[int, int]:
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Mede nós do grafo, chamadas de LLM e tools a partir dos callbacks do LangChain."""
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None) -> None:
+        self.metrics = metrics or registry
+        # run_id -> (início, labels)
+        self._started: Dict[UUID, Tuple[float, Dict[str, Any]]] = {}
+
+    def _start(self, run_id: UUID, labels: Dict[str, Any]) -> None:
+        self._started[run_id] = (time.perf_counter(), labels)
+
+    def _end(self, run_id: UUID, metric: str, status: str) -> Optional[Dict[str, Any]]:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return None
+        labels = dict(started[1], status=status)
+        self.metrics.observe(metric, time.perf_counter() - started[0], labels)
+        return labels
+
+    # Nós: o run do nó é o chain com tag graph:step:N (runnables internos herdam só a metadata)
+    def on_chain_start(self, serialized: Any, inputs: Any, *, run_id: UUID, tags: Optional[List[str]] = None,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and any(tag.startswith("graph:step:") for tag in tags or ()):
+            self._start(run_id, {"node": node})
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, "langgraph_node_duration_seconds", "success")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # GraphInterrupt/ParentCommand também chegam aqui: contam como "error" do nó
+        self._end(run_id, "langgraph_node_duration_seconds", "error")
+
+    # LLM
+    def _llm_start(self, run_id: UUID, metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        model = metadata.get("ls_model_name") or params.get("model_name") or params.get("model") or "desconhecido"
+        node = metadata.get("langgraph_node")
+        self._start(run_id, {"model": model, "purpose": LLM_PURPOSES.get(node, node or "other")})
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._llm_start(run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._llm_start(run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        labels = self._end(run_id, "llm_request_duration_seconds", "success")
+        if labels is None:
+            return
+        input_tokens, output_tokens = llm_usage(response)
+        base = {"model": labels["model"], "purpose": labels["purpose"]}
+        if input_tokens:
+            self.metrics.inc("llm_tokens_total", dict(base, type="input"), input_tokens)
+        if output_tokens:
+            self.metrics.inc("llm_tokens_total", dict(base, type="output"), output_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, "llm_request_duration_seconds", "error")
+
+    # Tools
+    def on_tool_start(self, serialized: Any, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "desconhecida"
+        self._start(run_id, {"tool": name})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, "tool_duration_seconds", "success")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, "tool_duration_seconds", "error")
+
+
+metrics_callback = MetricsCallbackHandler()
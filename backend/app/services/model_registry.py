@@ -0,0 +1,158 @@
+"""Registro de modelos com tools pré-vinculadas (bind_tools uma vez só).
+
+model.bind_tools(tools) converte o schema JSON de cada tool toda vez que é chamado;
+no loop agent/tools isso acontecia a cada iteração. O registro guarda o runnable
+já vinculado por (modelo, temperatura, conjunto de tools habilitadas) e o reutiliza
+entre turnos. O conjunto de tools vem de config.configurable.tools_enabled
+(Agent Builder): tools ausentes no dict continuam habilitadas.
+
+model_name e temperature também vêm do config enviado pelo cliente, então são
+normalizados antes de virar chave do cache:
+- model_name fora da allowlist (modelo padrão + allowed_models, ex. AI_MODEL_ALLOWLIST)
+  usa o modelo padrão;
+- temperature inválida (não numérica, NaN, infinita) usa a padrão; as demais são
+  limitadas a [0, 2] e arredondadas a 2 casas.
+O cache é LRU com no máximo max_entries runnables (e instâncias de modelo).
+
+Cópia idêntica em backend/app/services/model_registry.py e
+langgraph-app/src/agent/model_registry.py: os dois apps são implantados
+separadamente e não têm pacote comum. Altere os dois arquivos juntos
+(tests/unit_tests/test_model_registry.py compara as cópias).
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+RegistryKey = Tuple[str, float, FrozenSet[str]]
+
+MIN_TEMPERATURE = 0.0
+MAX_TEMPERATURE = 2.0
+
+
+class BoundModelRegistry:
+    """Cache LRU de runnables model.bind_tools(...) por (model_name, temperature, tools)."""
+
+    def __init__(
+        self,
+        tools: List[Any],
+        model_factory: Callable[[str, float], Any],
+        default_model_name: str,
+        default_temperature: float,
+        allowed_models: Optional[Iterable[str]] = None,
+        max_entries: int = 32,
+    ) -> None:
+        self.tools = list(tools)
+        self._tools_by_name = {t.name: t for t in self.tools}
+        self._model_factory = model_factory
+        self.default_model_name = default_model_name
+        self.default_temperature = float(default_temperature)
+        self.allowed_models = frozenset(m.strip() for m in (allowed_models or ()) if m and m.strip()) | {default_model_name}
+        self.max_entries = max(1, int(max_entries))
+        self._models: "OrderedDict[Tuple[str, float], Any]" = OrderedDict()
+        self._bound: "OrderedDict[RegistryKey, Runnable]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enabled_tool_names(self, tools_enabled: Optional[Dict[str, Any]] = None) -> FrozenSet[str]:
+        """Nomes das tools habilitadas; tools que não aparecem em tools_enabled ficam ligadas."""
+        if not isinstance(tools_enabled, dict):
+            return frozenset(self._tools_by_name)
+        return frozenset(n for n in self._tools_by_name if tools_enabled.get(n, True) is not False)
+
+    def resolve_model_name(self, model_name: Optional[str] = None) -> str:
+        """model_name permitido ou o modelo padrão."""
+        if not model_name:
+            return self.default_model_name
+        if model_name not in self.allowed_models:
+            logger.warning("[ModelRegistry] Modelo %r fora da allowlist; usando %s", model_name, self.default_model_name)
+            return self.default_model_name
+        return model_name
+
+    def resolve_temperature(self, temperature: Any = None) -> float:
+        """Temperatura válida, limitada a [0, 2] e arredondada (chave de cache estável)."""
+        if temperature is None:
+            return self.default_temperature
+        try:
+            value = float(temperature)
+        except (TypeError, ValueError):
+            value = math.nan
+        if not math.isfinite(value):
+            logger.warning("[ModelRegistry] Temperatura inválida %r; usando %s", temperature, self.default_temperature)
+            return self.default_temperature
+        return round(min(MAX_TEMPERATURE, max(MIN_TEMPERATURE, value)), 2)
+
+    def key_for(
+        self,
+        model_name: Optional[str] = None,
+        temperature: Any = None,
+        tools_enabled: Optional[Dict[str, Any]] = None,
+    ) -> RegistryKey:
+        return (
+            self.resolve_model_name(model_name),
+            self.resolve_temperature(temperature),
+            self.enabled_tool_names(tools_enabled),
+        )
+
+    def _remember(self, cache: "OrderedDict[Any, Any]", key: Any, value: Any) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def register_model(self, model_name: str, temperature: float, model: Any) -> None:
+        """Reaproveita uma instância de modelo já criada (ex.: o `model` do módulo)."""
+        with self._lock:
+            self._remember(self._models, (model_name, float(temperature)), model)
+
+    def get(
+        self,
+        model_name: Optional[str] = None,
+        temperature: Any = None,
+        tools_enabled: Optional[Dict[str, Any]] = None,
+    ) -> Runnable:
+        """Retorna o runnable vinculado, criando-o no primeiro uso."""
+        key = self.key_for(model_name, temperature, tools_enabled)
+        with self._lock:
+            bound = self._bound.get(key)
+            if bound is not None:
+                self._bound.move_to_end(key)
+                return bound
+            name, temp, names = key
+            llm = self._models.get((name, temp))
+            if llm is None:
+                llm = self._model_factory(name, temp)
+            self._remember(self._models, (name, temp), llm)
+            selected = [t for t in self.tools if t.name in names]
+            bound = llm.bind_tools(selected) if selected else llm
+            self._remember(self._bound, key, bound)
+            logger.info("[ModelRegistry] Modelo vinculado: model=%s temperature=%s tools=%d", name, temp, len(selected))
+        return bound
+
+    def get_for_config(self, config: Optional[RunnableConfig] = None) -> Runnable:
+        """Resolve o runnable a partir de config.configurable (model_name, temperature, tools_enabled)."""
+        cfg = (config or {}).get("configurable", {}) or {}
+        return self.get(cfg.get("model_name"), cfg.get("temperature"), cfg.get("tools_enabled"))
+
+    def warmup(self, combos: Optional[Iterable[Dict[str, Any]]] = None) -> int:
+        """
+        Pré-vincula as combinações informadas (dicts com model_name/temperature/tools_enabled).
+        Sem argumentos, vincula a combinação padrão. Retorna o número de entradas no cache.
+        """
+        for combo in combos or [{}]:
+            self.get(combo.get("model_name"), combo.get("temperature"), combo.get("tools_enabled"))
+        return len(self._bound)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bound.clear()
+
+    def __len__(self) -> int:
+        return len(self._bound)
@@ -5,7 +5,7 @@ Usado pela API em app.routes.regulacoes e pela tool consultar_regulacao em langg
 import json
 import logging
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -33,8 +33,24 @@ def _list_regulacao_files() -> List[Path]:
     return sorted(f for f in d.iterdir() if f.suffix.lower() == ".json" and f.is_file())
 
 
+# path -> (mtime_ns do JSON, regulacao carregada); evita reler/parsear a cada consulta da tool
+_cache: Dict[str, Tuple[int, Optional[dict]]] = {}
+
+
 def _load_regulacao(path: Path) -> Optional[dict]:
-    """Carrega um arquivo JSON de regulacao. Retorna None se inválido."""
+    """Carrega um arquivo JSON de regulacao (cache pelo mtime do arquivo). Retorna None se inválido."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    cached = _cache.get(str(path))
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _read_regulacao(path))
+        _cache[str(path)] = cached
+    return dict(cached[1]) if cached[1] is not None else None
+
+
+def _read_regulacao(path: Path) -> Optional[dict]:
     try:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
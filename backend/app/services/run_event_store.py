@@ -0,0 +1,235 @@
+"""
+Armazenamento de eventos SSE por run (replay e streams resumíveis).
+
+Todo run do RunManager grava seus eventos (id numérico estável + texto SSE já
+formatado) num buffer circular em memória: é por ele que a resposta SSE acompanha
+o grafo executando no pool, e por ele que repetições com Idempotency-Key e
+reconexões acompanham o mesmo run. stream_resumable=true não muda o buffer: faz o
+run continuar quando o cliente cai (on_disconnect=continue) e anuncia o
+X-Stream-Resumable. Quem perdeu a conexão chama
+GET /threads/<thread_id>/runs/<run_id>/stream com o header Last-Event-ID: recebe de
+novo os eventos posteriores a esse id e, em seguida, os novos eventos ao vivo.
+
+- O buffer guarda os últimos LANGGRAPH_RUN_EVENTS_MAX eventos (padrão 1000). Com
+  LANGGRAPH_RUN_EVENTS_SPILL_DIR definido, os eventos que saem do buffer vão para um
+  arquivo local (JSON lines, um handle aberto por run até o fim) e o replay continua
+  completo.
+- Sem spill, nenhum evento sai da memória enquanto o run está executando ou
+  enquanto algum inscrito ainda não o leu (a resposta SSE ao vivo é um inscrito:
+  cliente lento não perde tokens nem deltas de values); o corte para
+  LANGGRAPH_RUN_EVENTS_MAX acontece depois de finish(). Quem pede replay a partir
+  de um evento já descartado recebe um evento error (events_lost) e o stream fecha,
+  em vez de pular eventos em silêncio.
+- Runs finalizados são removidos após LANGGRAPH_RUN_EVENTS_TTL segundos (padrão 600),
+  junto com o arquivo de spill.
+
+O armazenamento é por processo: com vários workers, o join precisa cair no mesmo
+worker do run (sticky sessions) ou recebe 404.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RunEventBuffer:
+    """Eventos de um run: buffer circular em memória com spill opcional para arquivo."""
+
+    def __init__(self, run_id: str, thread_id: Optional[str], max_events: int, spill_path: Optional[str] = None) -> None:
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.max_events = max(1, int(max_events))
+        self.spill_path = spill_path
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._events: "deque[Tuple[int, str]]" = deque()
+        self._spilled = 0
+        self._spill_file = None
+        self._last_id = -1
+        # Último id descartado sem spill (replay anterior a ele está incompleto)
+        self._dropped_through = -1
+        # Inscritos em tail() -> último id que cada um leu
+        self._readers: Dict[object, int] = {}
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_id
+
+    def append(self, event_id: int, text: str) -> None:
+        """Grava um evento; ids devem ser crescentes (o mesmo id usado no campo id: do SSE)."""
+        with self._cond:
+            self._events.append((event_id, text))
+            self._last_id = event_id
+            self._trim()
+            self._cond.notify_all()
+
+    def _trim(self) -> None:
+        """Tira da memória o excedente de max_events (com self._cond): para o spill ou, sem spill, só o que ninguém perde."""
+        while len(self._events) > self.max_events:
+            old_id, old_text = self._events[0]
+            if self.spill_path:
+                if self._spill_file is None:
+                    self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+                self._spill_file.write(json.dumps({"id": old_id, "text": old_text}) + "\n")
+                self._spilled += 1
+            elif not self.finished or any(cursor < old_id for cursor in self._readers.values()):
+                return
+            else:
+                self._dropped_through = old_id
+            self._events.popleft()
+
+    def finish(self) -> None:
+        with self._cond:
+            if self.finished_at is None:
+                self.finished_at = time.time()
+            self._trim()
+            self._close_spill()
+            self._cond.notify_all()
+
+    def _close_spill(self) -> None:
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _spilled_after(self, last_event_id: int) -> List[Tuple[int, str]]:
+        if not self.spill_path or not self._spilled or not os.path.exists(self.spill_path):
+            return []
+        with self._cond:
+            if self._spill_file is not None:
+                self._spill_file.flush()  # leitura por outro handle: grava o que está no buffer do arquivo
+        result = []
+        with open(self.spill_path, encoding="utf-8") as spill:
+            for line in spill:
+                item = json.loads(line)
+                if item["id"] > last_event_id:
+                    result.append((item["id"], item["text"]))
+        return result
+
+    def events_after(self, last_event_id: int) -> List[Tuple[int, str]]:
+        """Eventos com id > last_event_id ainda disponíveis (arquivo de spill + memória)."""
+        with self._cond:
+            in_memory = [event for event in self._events if event[0] > last_event_id]
+            first_in_memory = self._events[0][0] if self._events else None
+            spilled = self._spilled
+        if spilled and (first_in_memory is None or last_event_id < first_in_memory - 1):
+            return [event for event in self._spilled_after(last_event_id)
+                    if first_in_memory is None or event[0] < first_in_memory] + in_memory
+        return in_memory
+
+    def tail(self, last_event_id: int = -1, poll_seconds: float = 15.0) -> Iterator[str]:
+        """
+        Replay a partir de last_event_id e depois eventos ao vivo, até o run terminar.
+        Se eventos posteriores a last_event_id já foram descartados, emite um evento
+        error (events_lost) e termina.
+        """
+        cursor = last_event_id
+        reader = object()
+        with self._cond:
+            lost = self._events_lost_event(cursor) if cursor < self._dropped_through else None
+            if lost is None:
+                self._readers[reader] = cursor
+        if lost is not None:
+            yield lost
+            return
+        try:
+            while True:
+                events = self.events_after(cursor)
+                for event_id, text in events:
+                    cursor = event_id
+                    yield text
+                    with self._cond:
+                        self._readers[reader] = cursor
+                with self._cond:
+                    if self._last_id > cursor:
+                        continue
+                    if self.finished:
+                        return
+                    idle = not self._cond.wait(timeout=poll_seconds)
+                if idle:
+                    # Comentário SSE mantém a conexão viva em proxies durante passos longos
+                    yield ": keep-alive\n\n"
+        finally:
+            with self._cond:
+                self._readers.pop(reader, None)
+                self._trim()
+
+    def _events_lost_event(self, cursor: int) -> str:
+        logger.warning("[RunEventStore] Replay do run %s a partir de %d: eventos até %d já descartados",
+                       self.run_id, cursor, self._dropped_through)
+        data = {"event": "error", "data": {
+            "run_id": self.run_id,
+            "error": "events_lost",
+            "message": "Eventos do run já descartados; refaça a leitura pelo estado da thread",
+            "last_event_id": cursor,
+            "first_available_id": self._events[0][0] if self._events else self._last_id + 1,
+        }}
+        return f"event: error\ndata: {json.dumps(data)}\n\n"
+
+    def discard(self) -> None:
+        with self._cond:
+            self._close_spill()
+        if self.spill_path and os.path.exists(self.spill_path):
+            try:
+                os.remove(self.spill_path)
+            except OSError as e:
+                logger.warning("[RunEventStore] Erro ao remover spill %s: %s", self.spill_path, e)
+
+
+class RunEventStore:
+    """Registro dos buffers de eventos dos runs, com limpeza por TTL."""
+
+    def __init__(self, max_events: int = 1000, ttl_seconds: float = 600, spill_dir: Optional[str] = None) -> None:
+        self.max_events = max_events
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir
+        self._runs: Dict[str, RunEventBuffer] = {}
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "RunEventStore":
+        return cls(
+            max_events=int(os.getenv("LANGGRAPH_RUN_EVENTS_MAX", "1000")),
+            ttl_seconds=float(os.getenv("LANGGRAPH_RUN_EVENTS_TTL", "600")),
+            spill_dir=os.getenv("LANGGRAPH_RUN_EVENTS_SPILL_DIR") or None,
+        )
+
+    def create(self, run_id: str, thread_id: Optional[str] = None) -> RunEventBuffer:
+        self.cleanup()
+        spill_path = os.path.join(self.spill_dir, f"{run_id}.events.jsonl") if self.spill_dir else None
+        buffer = RunEventBuffer(run_id, thread_id, self.max_events, spill_path)
+        with self._lock:
+            self._runs[run_id] = buffer
+        return buffer
+
+    def get(self, run_id: str) -> Optional[RunEventBuffer]:
+        self.cleanup()
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Remove runs finalizados há mais de ttl_seconds; retorna quantos foram removidos."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                run_id for run_id, buffer in self._runs.items()
+                if buffer.finished_at is not None and now - buffer.finished_at > self.ttl_seconds
+            ]
+            removed = [self._runs.pop(run_id) for run_id in expired]
+        for buffer in removed:
+            buffer.discard()
+        return len(removed)
+
+    def __len__(self) -> int:
+        return len(self._runs)
@@ -0,0 +1,293 @@
+"""
+Executor de runs em background, desacoplado da thread da requisição HTTP.
+
+Os endpoints de stream não executam mais o grafo dentro do gerador SSE: criam um
+Run, entregam o gerador de eventos ao RunManager e apenas acompanham o buffer de
+eventos do run (RunEventBuffer). Os endpoints que respondem JSON (POST /threads
+com input, POST /threads/<id>, POST /runs/wait) também submetem o run e esperam
+run.done. O grafo
+roda num pool limitado de threads com fila por processo:
+
+- LANGGRAPH_RUN_WORKERS (padrão 8): runs executando ao mesmo tempo por processo;
+- LANGGRAPH_RUN_QUEUE_MAX (padrão 64): runs aguardando vaga; acima disso submit()
+  levanta RunQueueFull (o endpoint responde 503).
+
+Ciclo de vida: pending → running → success | error | interrupted.
+
+on_disconnect=cancel: quando o cliente que acompanha o run desconecta antes do fim,
+o run é marcado para cancelamento; o gerador do grafo é fechado no próximo evento
+(uma chamada de LLM já em andamento termina antes) e o run fica "interrupted".
+Com on_disconnect=continue o run segue até o fim e pode ser retomado em join_run_stream.
+
+Ouvintes registrados em add_listener(callback) recebem o Run a cada mudança de status.
+
+Admissão por thread (multitask_strategy, como no LangGraph Server): runs da mesma
+thread nunca executam ao mesmo tempo. Se já houver run não finalizado na thread:
+- reject: submit() levanta ThreadBusy (o endpoint responde 409);
+- enqueue: o novo run fica pendente e só entra no pool quando o anterior terminar;
+- interrupt: os runs anteriores são cancelados e o novo executa em seguida;
+- rollback: como interrupt; o endpoint também descarta o estado gravado pelos runs
+  cancelados (o novo run parte do checkpoint anterior a eles).
+Os conflitos por estratégia ficam em metrics()["conflicts"].
+A serialização vale dentro do processo (entre as threads do pool e das requisições).
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.services.run_event_store import RunEventBuffer, RunEventStore
+
+logger = logging.getLogger(__name__)
+
+RUN_STATUSES = ("pending", "running", "success", "error", "interrupted")
+MULTITASK_STRATEGIES = ("reject", "enqueue", "interrupt", "rollback")
+
+
+class RunQueueFull(Exception):
+    """Fila de runs do processo cheia."""
+
+
+class ThreadBusy(Exception):
+    """Thread já tem um run em andamento (multitask_strategy=reject)."""
+
+
+class Run:
+    """Estado de um run em background."""
+
+    def __init__(self, run_id: str, thread_id: Optional[str], assistant_id: Optional[str], buffer: RunEventBuffer) -> None:
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.assistant_id = assistant_id
+        self.buffer = buffer
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+        self.done = threading.Event()
+        self._cancel = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "thread_id": self.thread_id,
+            "assistant_id": self.assistant_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+        }
+
+
+class RunManager:
+    """Pool limitado de threads + fila por processo para executar runs do grafo."""
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 64, event_store: Optional[RunEventStore] = None) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.events = event_store or RunEventStore()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="langgraph-run")
+        self._runs: Dict[str, Run] = {}
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[Run], None]] = []
+        # thread_id -> runs não finalizados da thread, na ordem de execução (o primeiro é o atual)
+        self._threads: Dict[str, Deque[Run]] = {}
+        # run_id -> (eventos, event_id) dos runs aguardando o run anterior da mesma thread
+        self._held: Dict[str, Tuple[Iterator[str], Callable[[str], int]]] = {}
+        self.stats = {"submitted": 0, "rejected": 0, "cancelled": 0}
+        self.conflicts = {strategy: 0 for strategy in MULTITASK_STRATEGIES}
+
+    @classmethod
+    def from_env(cls) -> "RunManager":
+        return cls(
+            max_workers=int(os.getenv("LANGGRAPH_RUN_WORKERS", "8")),
+            max_queue=int(os.getenv("LANGGRAPH_RUN_QUEUE_MAX", "64")),
+            event_store=RunEventStore.from_env(),
+        )
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def add_listener(self, callback: Callable[[Run], None]) -> None:
+        """Registra um callback chamado a cada mudança de status de qualquer run."""
+        self._listeners.append(callback)
+
+    def _set_status(self, run: Run, status: str, error: Optional[str] = None) -> None:
+        run.status = status
+        if error is not None:
+            run.error = error
+        if status == "running":
+            run.started_at = time.time()
+        elif status in ("success", "error", "interrupted"):
+            run.ended_at = time.time()
+        for callback in self._listeners:
+            try:
+                callback(run)
+            except Exception as e:
+                logger.warning("[RunManager] Listener falhou para run %s: %s", run.run_id, e)
+
+    def submit(
+        self,
+        run_id: str,
+        events: Iterator[str],
+        thread_id: Optional[str] = None,
+        assistant_id: Optional[str] = None,
+        event_id: Optional[Callable[[str], int]] = None,
+        multitask_strategy: str = "reject",
+    ) -> Run:
+        """
+        Enfileira um run. `events` é o gerador de eventos SSE do grafo (executado no pool);
+        event_id(texto) extrai o id numérico de cada evento para o buffer.
+        multitask_strategy define o que fazer se a thread já tiver run em andamento.
+        """
+        if multitask_strategy not in MULTITASK_STRATEGIES:
+            raise ValueError(f"multitask_strategy inválido: {multitask_strategy!r}")
+        self._cleanup()
+        with self._lock:
+            active = self.active_runs(thread_id) if thread_id else []
+            if active:
+                self.conflicts[multitask_strategy] += 1
+                logger.info("[RunManager] Thread %s ocupada (%d run(s)); estratégia %s",
+                            thread_id, len(active), multitask_strategy)
+                if multitask_strategy == "reject":
+                    raise ThreadBusy(f"Thread {thread_id} já tem run em andamento ({active[0].run_id})")
+            pending = sum(1 for run in self._runs.values() if run.status == "pending")
+            if pending >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise RunQueueFull(f"Fila de runs cheia ({pending} aguardando, limite {self.max_queue})")
+            if multitask_strategy in ("interrupt", "rollback"):
+                for previous in active:
+                    previous.cancel()
+            run = Run(run_id, thread_id, assistant_id, self.events.create(run_id, thread_id))
+            self._runs[run_id] = run
+            self.stats["submitted"] += 1
+            get_event_id = event_id or (lambda text: run.buffer.last_event_id + 1)
+            start_now = True
+            if thread_id:
+                queue = self._threads.setdefault(thread_id, deque())
+                queue.append(run)
+                if len(queue) > 1:
+                    # Executa quando o run anterior da thread terminar (ver _finish)
+                    self._held[run_id] = (events, get_event_id)
+                    start_now = False
+        self._set_status(run, "pending")
+        if start_now:
+            self._executor.submit(self._execute, run, events, get_event_id)
+        return run
+
+    def active_runs(self, thread_id: str) -> List[Run]:
+        """Runs não finalizados da thread (em execução ou aguardando), do mais antigo ao mais novo."""
+        with self._lock:
+            return [run for run in self._threads.get(thread_id, ()) if not run.done.is_set()]
+
+    def _execute(self, run: Run, events: Iterator[str], event_id: Callable[[str], int]) -> None:
+        if run.cancel_requested:
+            self._finish(run, "interrupted", events)
+            return
+        self._set_status(run, "running")
+        try:
+            for text in events:
+                run.buffer.append(event_id(text), text)
+                if run.cancel_requested:
+                    self._finish(run, "interrupted", events)
+                    return
+            self._finish(run, "success", events)
+        except Exception as e:
+            logger.error("[RunManager] Run %s falhou: %s", run.run_id, e)
+            self._finish(run, "error", events, str(e))
+
+    def _finish(self, run: Run, status: str, events: Iterator[str], error: Optional[str] = None) -> None:
+        if status == "interrupted":
+            self.stats["cancelled"] += 1
+            close = getattr(events, "close", None)
+            if close is not None:
+                close()  # GeneratorExit dentro do graph.stream interrompe a execução
+            logger.info("[RunManager] Run %s cancelado", run.run_id)
+        self._set_status(run, status, error)
+        run.buffer.finish()
+        run.done.set()
+        self._start_next(run)
+
+    def _start_next(self, finished: Run) -> None:
+        """Libera o próximo run da mesma thread, se houver."""
+        if not finished.thread_id:
+            return
+        with self._lock:
+            queue = self._threads.get(finished.thread_id)
+            if not queue:
+                return
+            if finished in queue:
+                queue.remove(finished)
+            if not queue:
+                del self._threads[finished.thread_id]
+                return
+            following = queue[0]
+            held = self._held.pop(following.run_id, None)
+        if held is not None:
+            self._executor.submit(self._execute, following, *held)
+
+    # ------------------------------------------------------------------
+    # Consulta / inscrição
+    # ------------------------------------------------------------------
+
+    def get(self, run_id: str) -> Optional[Run]:
+        self._cleanup()
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def cancel(self, run_id: str) -> bool:
+        run = self.get(run_id)
+        if run is None or run.done.is_set():
+            return False
+        run.cancel()
+        return True
+
+    def subscribe(self, run: Run, last_event_id: int = -1, on_disconnect: str = "continue") -> Iterator[str]:
+        """
+        Eventos do run para uma resposta SSE (replay a partir de last_event_id + ao vivo).
+        Se o cliente desconectar antes do fim e on_disconnect == "cancel", o run é cancelado.
+        """
+        completed = False
+        try:
+            for text in run.buffer.tail(last_event_id):
+                yield text
+            completed = True
+        finally:
+            if not completed and on_disconnect == "cancel" and not run.done.is_set():
+                logger.info("[RunManager] Cliente desconectou do run %s (on_disconnect=cancel)", run.run_id)
+                run.cancel()
+
+    def _cleanup(self) -> None:
+        """Esquece runs finalizados cujo buffer de eventos já expirou."""
+        self.events.cleanup()
+        ttl = self.events.ttl_seconds
+        now = time.time()
+        with self._lock:
+            for run_id in [r.run_id for r in self._runs.values() if r.ended_at and now - r.ended_at > ttl]:
+                del self._runs[run_id]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {status: 0 for status in RUN_STATUSES}
+            for run in self._runs.values():
+                counts[run.status] += 1
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "runs": counts,
+            "conflicts": dict(self.conflicts),
+            **self.stats,
+        }
@@ -0,0 +1,263 @@
+"""
+Registro de runs em SQLite (list_thread_runs / get_thread_run).
+
+Antes os runs eram inferidos do histórico de checkpoints (ids fabricados, status
+"running" por heurística, horário atual quando faltava timestamp) carregando a
+thread inteira a cada listagem. Agora cada run é gravado quando é criado e
+atualizado a cada mudança de status (via listener do RunManager ou pelo próprio
+endpoint em /runs/wait):
+
+- run_id, thread_id, assistant_id, status, metadata, error;
+- created_at, started_at, ended_at, updated_at e duration_ms;
+- uso de tokens (input/output/total), somado por um UsageMetadataCallbackHandler
+  anexado aos callbacks do run;
+- pid do processo que executa o run.
+
+duration_ms é o tempo de execução (started_at → ended_at); o tempo na fila fica
+em created_at → started_at. Runs que nunca começaram não têm duração.
+
+Na inicialização do servidor, recover_stale() marca como interrupted os runs
+pending/running cujo processo não existe mais (reinício ou queda do worker), que
+de outra forma ficariam "running" para sempre na listagem.
+
+Índices em (thread_id, created_at) e (thread_id, status, created_at) deixam a
+listagem com filtro de status e paginação proporcional ao tamanho da página.
+
+Por padrão a tabela fica no mesmo arquivo SQLite dos checkpoints (compartilhado
+entre workers); LANGGRAPH_RUNS_SQLITE_PATH muda o arquivo. Com
+LANGGRAPH_CHECKPOINTER=memory o registro também fica em memória.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+
+from app.services.sqlite_checkpointer import default_db_path, reopen_after_fork
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("success", "error", "timeout", "interrupted")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    assistant_id TEXT,
+    status TEXT NOT NULL,
+    metadata TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    started_at TEXT,
+    ended_at TEXT,
+    duration_ms INTEGER,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    total_tokens INTEGER,
+    pid INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_runs_thread_created ON runs (thread_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_thread_status_created ON runs (thread_id, status, created_at DESC);
+"""
+
+_COLUMNS = (
+    "run_id, thread_id, assistant_id, status, metadata, error, created_at, updated_at, "
+    "started_at, ended_at, duration_ms, input_tokens, output_tokens, total_tokens"
+)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat() + "Z"
+
+
+class RunRegistry:
+    """Tabela `runs` com os runs criados pelo servidor e seu ciclo de vida."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = str(path or default_db_path())
+        # run_id -> contador de tokens dos runs em andamento neste processo
+        self._usage: Dict[str, UsageMetadataCallbackHandler] = {}
+        self._connect()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+            if "pid" not in columns:  # tabela criada antes da coluna pid
+                self._conn.execute("ALTER TABLE runs ADD COLUMN pid INTEGER")
+        if self.path != ":memory:":
+            # gunicorn --preload: cada worker reabre a conexão criada no master
+            reopen_after_fork(self)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.RLock()
+        with self._lock:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=30000")
+
+    @classmethod
+    def from_env(cls) -> "RunRegistry":
+        path = os.getenv("LANGGRAPH_RUNS_SQLITE_PATH")
+        if not path and os.getenv("LANGGRAPH_CHECKPOINTER", "sqlite").lower() == "memory":
+            path = ":memory:"
+        return cls(path)
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def create(
+        self,
+        run_id: str,
+        thread_id: Optional[str],
+        assistant_id: Optional[str],
+        metadata: Optional[Dict[str, Any]] = None,
+        status: str = "pending",
+    ) -> Dict[str, Any]:
+        now = _iso(_now())
+        self._execute(
+            "INSERT OR IGNORE INTO runs (run_id, thread_id, assistant_id, status, metadata, created_at, updated_at, pid) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, thread_id, assistant_id, status, json.dumps(metadata or {}, default=str), now, now, os.getpid()),
+        )
+        return self.get(run_id)
+
+    def track_usage(self, run_id: str) -> UsageMetadataCallbackHandler:
+        """Callback que soma o uso de tokens do run; deve ir em config["callbacks"]."""
+        handler = UsageMetadataCallbackHandler()
+        with self._lock:
+            self._usage[run_id] = handler
+        return handler
+
+    def update_status(self, run_id: str, status: str, error: Optional[str] = None) -> None:
+        """Atualiza o status; marca started_at em running e ended_at/duração/tokens ao terminar."""
+        now = _now()
+        sets, params = ["status = ?", "updated_at = ?"], [status, _iso(now)]
+        if error is not None:
+            sets.append("error = ?")
+            params.append(error)
+        if status == "running":
+            sets.append("started_at = COALESCE(started_at, ?)")
+            params.append(_iso(now))
+        elif status in TERMINAL_STATUSES:
+            rows = self._execute("SELECT started_at FROM runs WHERE run_id = ?", (run_id,))
+            sets.append("ended_at = ?")
+            params.append(_iso(now))
+            if rows and rows[0][0]:
+                started_at = datetime.fromisoformat(rows[0][0].rstrip("Z"))
+                sets.append("duration_ms = ?")
+                params.append(int((now - started_at).total_seconds() * 1000))
+            with self._lock:
+                handler = self._usage.pop(run_id, None)
+            if handler is not None and handler.usage_metadata:
+                usage = handler.usage_metadata.values()
+                sets.append("input_tokens = ?, output_tokens = ?, total_tokens = ?")
+                params.extend([
+                    sum(u.get("input_tokens", 0) for u in usage),
+                    sum(u.get("output_tokens", 0) for u in usage),
+                    sum(u.get("total_tokens", 0) for u in usage),
+                ])
+        self._execute(f"UPDATE runs SET {', '.join(sets)} WHERE run_id = ?", (*params, run_id))
+
+    def recover_stale(self) -> int:
+        """
+        Marca como interrupted os runs pending/running de processos que não existem mais.
+        Chamado na inicialização: runs com o pid do próprio processo também são órfãos
+        (pid reaproveitado após reinício, ex. pid 1 em containers).
+        Retorna quantos runs foram marcados.
+        """
+        current = os.getpid()
+        rows = self._execute("SELECT run_id, pid FROM runs WHERE status IN ('pending', 'running')")
+        stale = [run_id for run_id, pid in rows if not pid or pid == current or not _pid_alive(pid)]
+        for run_id in stale:
+            self.update_status(run_id, "interrupted", "Servidor reiniciado antes do fim do run")
+        if stale:
+            logger.warning("[RunRegistry] %d run(s) órfão(s) marcado(s) como interrupted", len(stale))
+        return len(stale)
+
+    def delete(self, run_id: str) -> None:
+        """Remove o run do registro (runs descartados por multitask_strategy=rollback)."""
+        with self._lock:
+            self._usage.pop(run_id, None)
+        self._execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def on_run_status(self, run: Any) -> None:
+        """Listener do RunManager: replica as mudanças de status do Run no registro."""
+        if run.status != "pending":
+            self.update_status(run.run_id, run.status, run.error)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def get(self, run_id: str, thread_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        sql, params = f"SELECT {_COLUMNS} FROM runs WHERE run_id = ?", (run_id,)
+        if thread_id is not None:
+            sql, params = sql + " AND thread_id = ?", (run_id, thread_id)
+        rows = self._execute(sql, params)
+        return self._row_to_dict(rows[0]) if rows else None
+
+    def list_thread_runs(
+        self,
+        thread_id: str,
+        status: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Runs da thread, mais recentes primeiro (usa os índices por thread/status)."""
+        where, params = ["thread_id = ?"], [thread_id]
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        rows = self._execute(
+            f"SELECT {_COLUMNS} FROM runs WHERE {' AND '.join(where)} "
+            "ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+            (*params, int(limit), int(offset)),
+        )
+        return [self._row_to_dict(row) for row in rows]
+
+    @staticmethod
+    def _row_to_dict(row: tuple) -> Dict[str, Any]:
+        (run_id, thread_id, assistant_id, status, metadata, error, created_at, updated_at,
+         started_at, ended_at, duration_ms, input_tokens, output_tokens, total_tokens) = row
+        return {
+            "run_id": run_id,
+            "thread_id": thread_id,
+            "assistant_id": assistant_id,
+            "status": status,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "duration_ms": duration_ms,
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": total_tokens,
+            } if total_tokens is not None else None,
+            "error": error,
+            "metadata": json.loads(metadata or "{}"),
+        }
@@ -0,0 +1,142 @@
+"""
+Coalescência (single-flight) de runs stateless idênticos em /runs/wait.
+
+Dashboards e o frontend às vezes disparam o mesmo POST /runs/wait (mesmas
+mensagens e config) com milissegundos de diferença; sem coalescência cada cópia
+executa o grafo e paga as chamadas de LLM de novo. Aqui a primeira requisição de
+uma chave vira "líder" e executa; as idênticas que chegam enquanto ela roda
+esperam e recebem o mesmo resultado (ou a mesma exceção).
+
+A chave é um hash canônico (JSON com chaves ordenadas) de assistant_id, input e
+da parte relevante da config (configurable, já com as regras de Autonomia
+injetadas); callbacks, metadata e ids de run ficam de fora.
+
+- LANGGRAPH_COALESCE_RUNS (padrão true): liga/desliga a coalescência;
+- LANGGRAPH_COALESCE_TTL (padrão 0): segundos em que o resultado de sucesso
+  continua sendo servido a requisições idênticas depois que o líder termina
+  (0 = só compartilha entre requisições simultâneas).
+
+O compartilhamento é por processo (entre as threads do worker).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Chaves de config que não mudam o resultado do grafo (ou são diferentes a cada run)
+_IGNORED_CONFIG_KEYS = ("callbacks", "metadata", "run_id", "run_name", "tags")
+
+
+def coalesce_key(assistant_id: Optional[str], input_data: Any, config: Optional[Dict[str, Any]]) -> str:
+    """Hash canônico de (assistant_id, input, config relevante)."""
+    relevant = {k: v for k, v in (config or {}).items() if k not in _IGNORED_CONFIG_KEYS}
+    payload = json.dumps(
+        [assistant_id, input_data, relevant],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """Execução em andamento (ou concluída) de uma chave."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.completed_at: Optional[float] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Compartilha uma única execução entre chamadas simultâneas com a mesma chave."""
+
+    def __init__(self, enabled: bool = True, result_ttl: float = 0, max_results: int = 1000) -> None:
+        self.enabled = enabled
+        self.result_ttl = max(0.0, float(result_ttl))
+        self.max_results = max(1, int(max_results))
+        self._calls: "OrderedDict[str, _Call]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "coalesced": 0, "cached": 0}
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        return cls(
+            enabled=os.getenv("LANGGRAPH_COALESCE_RUNS", "true").lower() not in ("0", "false", "no"),
+            result_ttl=float(os.getenv("LANGGRAPH_COALESCE_TTL", "0")),
+        )
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa fn() ou reaproveita a execução em andamento/recente da mesma chave.
+        Retorna (resultado, compartilhado); compartilhado=False para quem executou.
+        """
+        if not self.enabled:
+            return fn(), False
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            elif call.done.is_set():
+                self.stats["cached"] += 1
+            else:
+                call.followers += 1
+                self.stats["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        self.stats["executed"] += 1
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._forget(key, call)
+            raise
+        finally:
+            call.completed_at = time.time()
+            call.done.set()
+        with self._lock:
+            if self.result_ttl <= 0:
+                self._forget(key, call)
+            elif self._calls.get(key) is call:
+                self._calls.move_to_end(key)
+                self._evict()
+        return call.result, False
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _expire(self, now: float) -> None:
+        # Concluídas vão para o fim na ordem de conclusão: basta varrer até a primeira válida
+        expired = []
+        for key, call in self._calls.items():
+            if call.completed_at is None:
+                continue
+            if now - call.completed_at <= self.result_ttl:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._calls[key]
+
+    def _evict(self) -> None:
+        while len(self._calls) > self.max_results:
+            victim = next((k for k, c in self._calls.items() if c.done.is_set()), None)
+            if victim is None:
+                return
+            del self._calls[victim]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = sum(1 for call in self._calls.values() if not call.done.is_set())
+        return {"enabled": self.enabled, "result_ttl": self.result_ttl, "in_flight": in_flight, **self.stats}
@@ -0,0 +1,390 @@
+"""
+Tracing local em spans: requisição Flask → grafo → nós → tools/LLM, exportado em arquivo.
+
+O tracing do LangSmith (@traceable em agent_tools, check_langsmith_config) precisa
+de rede e API key; sem eles não havia como saber onde foi o tempo de uma
+requisição lenta. Aqui cada requisição amostrada vira uma árvore de spans em
+memória (trace_id, span_id, parent_span_id, início/fim em ns, atributos, status):
+
+- HTTP (init_app): span raiz por requisição, encerrado quando a resposta fecha
+  (inclui o tempo de streaming SSE/NDJSON); respeita o header W3C traceparent e
+  devolve X-Trace-ID;
+- grafo, nós, tools e LLM: SpanCallbackHandler, anexado aos callbacks de cada run
+  (ver _track_run em langgraph_server), com o span da requisição como pai — o run
+  pode executar em outra thread (pool do RunManager, /runs/batch).
+
+Quando todos os spans de um trace terminam, o trace é gravado como uma linha
+OTLP/JSON ({"resourceSpans": [...]}, o formato do file exporter do OpenTelemetry
+Collector) em LANGGRAPH_TRACE_DIR/spans-<pid>.jsonl, com rotação por tamanho
+(LANGGRAPH_TRACE_MAX_BYTES, LANGGRAPH_TRACE_BACKUPS). Relatório offline: trace_report.py.
+
+Amostragem:
+- LANGGRAPH_TRACE_SAMPLE_RATE: fração das requisições exportadas (padrão 0 = desligado);
+  com o tracing ligado, traceparent com flag sampled=01 sempre é exportado;
+- LANGGRAPH_TRACE_SLOW_MS: > 0 grava todas as requisições e exporta também as que
+  passarem desse tempo, mesmo fora da amostra (para achar os culpados do p99);
+- LANGGRAPH_TRACE_EXCLUDE: prefixos de rota sem tracing (padrão /metrics, /health, /ready).
+"""
+import contextvars
+import logging
+import logging.handlers
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.services.metrics import LLM_PURPOSES, llm_usage
+from app.services.stream_serializer import dumps
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "alphaadvisor-backend"
+SCOPE_NAME = "alphaadvisor.span_tracer"
+
+# SpanKind e StatusCode do OTLP
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+
+def _new_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Trace:
+    """Spans de uma requisição; exportado quando o último span aberto termina."""
+
+    def __init__(self, tracer: "SpanTracer", trace_id: str, sampled: bool) -> None:
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+        self.open_spans = 0
+        self.exported = 0
+        self.lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, parent_span_id: Optional[str] = None, kind: int = KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.trace = trace
+        self.span_id = _new_id(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        with trace.lock:
+            trace.spans.append(self)
+            trace.open_spans += 1
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> "Span":
+        return Span(self.trace, name, self.span_id, kind, attributes)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status, self.status_message = STATUS_ERROR, f"{type(error).__name__}: {error}"
+        elif self.status == STATUS_UNSET:
+            self.status = STATUS_OK
+        with self.trace.lock:
+            self.trace.open_spans -= 1
+            finished = self.trace.open_spans == 0
+        if finished:
+            self.trace.tracer.finish(self.trace)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.status_message} if self.status_message else {})},
+        }
+        if self.parent_span_id:
+            data["parentSpanId"] = self.parent_span_id
+        return data
+
+
+class SpanTracer:
+    """Amostragem, criação de traces e exportação OTLP/JSON em arquivo com rotação."""
+
+    def __init__(self, sample_rate: float = 0.0, slow_ms: float = 0.0, directory: Optional[str] = None,
+                 max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                 exclude: Tuple[str, ...] = ("/metrics", "/health", "/ready")) -> None:
+        self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        self.slow_ms = max(0.0, float(slow_ms))
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "alphaadvisor_traces")
+        self.max_bytes = int(max_bytes)
+        self.backups = int(backups)
+        self.exclude = tuple(exclude)
+        self.stats = {"traces_exported": 0, "traces_dropped": 0, "spans_exported": 0}
+        self._handler: Optional[logging.handlers.RotatingFileHandler] = None
+        self._handler_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SpanTracer":
+        exclude = os.getenv("LANGGRAPH_TRACE_EXCLUDE", "/metrics,/health,/ready")
+        return cls(
+            sample_rate=float(os.getenv("LANGGRAPH_TRACE_SAMPLE_RATE", "0")),
+            slow_ms=float(os.getenv("LANGGRAPH_TRACE_SLOW_MS", "0")),
+            directory=os.getenv("LANGGRAPH_TRACE_DIR") or None,
+            max_bytes=int(os.getenv("LANGGRAPH_TRACE_MAX_BYTES", str(10 * 1024 * 1024))),
+            backups=int(os.getenv("LANGGRAPH_TRACE_BACKUPS", "5")),
+            exclude=tuple(p.strip() for p in exclude.split(",") if p.strip()),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    def start_trace(self, name: str, kind: int = KIND_SERVER, attributes: Optional[Dict[str, Any]] = None,
+                    traceparent: Optional[str] = None) -> Optional[Span]:
+        """
+        Span raiz de um novo trace, ou None se a requisição não for gravada.
+        traceparent (W3C: 00-<trace_id>-<span_id>-<flags>) continua o trace de quem chamou.
+        """
+        trace_id, parent_span_id, parent_sampled = None, None, False
+        if traceparent:
+            parts = traceparent.strip().split("-")
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                trace_id, parent_span_id = parts[1], parts[2]
+                parent_sampled = parts[3] == "01"
+        sampled = parent_sampled or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        if not sampled and self.slow_ms <= 0:
+            return None
+        trace = Trace(self, trace_id or _new_id(16), sampled)
+        return Span(trace, name, parent_span_id, kind, attributes)
+
+    def finish(self, trace: Trace) -> None:
+        with trace.lock:
+            spans = trace.spans[trace.exported:]
+            trace.exported = len(trace.spans)
+        if not spans:
+            return
+        root = trace.spans[0]
+        if not trace.sampled and root.duration_ms < self.slow_ms:
+            self.stats["traces_dropped"] += 1
+            return
+        self.export(spans)
+
+    # ------------------------------------------------------------------
+    # Exportação
+    # ------------------------------------------------------------------
+
+    def _file_handler(self) -> logging.handlers.RotatingFileHandler:
+        # Um arquivo por processo: a rotação do RotatingFileHandler não é segura entre workers
+        pid = os.getpid()
+        if self._handler is None or self._handler_pid != pid:
+            os.makedirs(self.directory, exist_ok=True)
+            self._handler = logging.handlers.RotatingFileHandler(
+                os.path.join(self.directory, f"spans-{pid}.jsonl"),
+                maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8", delay=True,
+            )
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+            self._handler_pid = pid
+        return self._handler
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+                ]},
+                "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }
+        record = logging.LogRecord(__name__, logging.INFO, __file__, 0, dumps(payload), None, None)
+        try:
+            with self._lock:
+                self._file_handler().emit(record)
+        except Exception as e:
+            logger.warning("[SpanTracer] Falha ao exportar trace %s: %s", spans[0].trace_id, e)
+            return
+        self.stats["traces_exported"] += 1
+        self.stats["spans_exported"] += len(spans)
+
+
+tracer = SpanTracer.from_env()
+
+# Span da requisição atual (definido em before_request; None quando não gravada)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# ----------------------------------------------------------------------
+# Flask
+# ----------------------------------------------------------------------
+
+def init_app(app: Any) -> None:
+    """Span raiz por requisição, encerrado quando a resposta (inclusive streaming) fecha."""
+    from flask import request
+
+    @app.before_request
+    def _trace_start() -> None:
+        span = None
+        if tracer.enabled and not request.path.startswith(tracer.exclude):
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            span = tracer.start_trace(
+                f"{request.method} {route}",
+                attributes={"http.request.method": request.method, "http.route": route, "url.path": request.path},
+                traceparent=request.headers.get("traceparent"),
+            )
+        _current_span.set(span)
+
+    @app.after_request
+    def _trace_response(response: Any) -> Any:
+        span = _current_span.get()
+        if span is not None:
+            _current_span.set(None)
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.status = STATUS_ERROR
+            response.headers["X-Trace-ID"] = span.trace_id
+            response.call_on_close(span.end)
+        return response
+
+
+# ----------------------------------------------------------------------
+# Callbacks (grafo, nós, LLM, tools)
+# ----------------------------------------------------------------------
+
+class SpanCallbackHandler(BaseCallbackHandler):
+    """
+    Spans filhos do span da requisição a partir dos callbacks do LangChain.
+    Runnables internos (sem tag graph:step nem LLM/tool) não viram span: seus filhos
+    ficam pendurados no span mais próximo.
+    """
+
+    def __init__(self, parent: Span) -> None:
+        self.parent = parent
+        # run_id -> span que recebe os filhos desse run
+        self._spans: Dict[UUID, Span] = {}
+        # run_ids que abriram span próprio (para encerrar em *_end/*_error)
+        self._owned: Dict[UUID, Span] = {}
+
+    def _parent_for(self, parent_run_id: Optional[UUID]) -> Span:
+        return self._spans.get(parent_run_id, self.parent) if parent_run_id else self.parent
+
+    def _open(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: int,
+              attributes: Dict[str, Any]) -> None:
+        span = self._parent_for(parent_run_id).child(name, kind, {k: v for k, v in attributes.items() if v is not None})
+        self._spans[run_id] = self._owned[run_id] = span
+
+    def _close(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        self._spans.pop(run_id, None)
+        span = self._owned.pop(run_id, None)
+        if span is not None:
+            span.end(error)
+        return span
+
+    def on_chain_start(self, serialized: Any, inputs: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       tags: Optional[List[str]] = None, metadata: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> None:
+        metadata = metadata or {}
+        if parent_run_id is None:
+            self._open(run_id, None, f"graph {kwargs.get('name') or 'LangGraph'}", KIND_INTERNAL, {
+                "langgraph.run_id": metadata.get("run_id"),
+                "langgraph.thread_id": metadata.get("thread_id"),
+            })
+        elif metadata.get("langgraph_node") and any(tag.startswith("graph:step:") for tag in tags or ()):
+            self._open(run_id, parent_run_id, f"node {metadata['langgraph_node']}", KIND_INTERNAL, {
+                "langgraph.node": metadata["langgraph_node"],
+                "langgraph.step": metadata.get("langgraph_step"),
+            })
+        else:
+            self._spans[run_id] = self._parent_for(parent_run_id)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._close(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._close(run_id, error)
+
+    def _llm_start(self, run_id: UUID, parent_run_id: Optional[UUID], metadata: Optional[Dict[str, Any]],
+                   kwargs: Dict[str, Any]) -> None:
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        model = metadata.get("ls_model_name") or params.get("model_name") or params.get("model")
+        node = metadata.get("langgraph_node")
+        self._open(run_id, parent_run_id, f"llm {model or 'desconhecido'}", KIND_CLIENT, {
+            "gen_ai.request.model": model,
+            "gen_ai.system": metadata.get("ls_provider"),
+            "llm.purpose": LLM_PURPOSES.get(node, node or "other"),
+        })
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                            **kwargs: Any) -> None:
+        self._llm_start(run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._llm_start(run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._owned.get(run_id)
+        if span is not None:
+            input_tokens, output_tokens = llm_usage(response)
+            span.set_attribute("gen_ai.usage.input_tokens", input_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", output_tokens)
+        self._close(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._close(run_id, error)
+
+    def on_tool_start(self, serialized: Any, input_str: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                      **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "desconhecida"
+        self._open(run_id, parent_run_id, f"tool {name}", KIND_INTERNAL, {"tool.name": name})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._close(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._close(run_id, error)
+
+
+def callback_handler(parent: Optional[Span] = None) -> Optional[SpanCallbackHandler]:
+    """Handler para os callbacks de um run, filho de parent (padrão: span da requisição atual)."""
+    parent = parent if parent is not None else current_span()
+    return SpanCallbackHandler(parent) if parent is not None else None
@@ -0,0 +1,548 @@
+"""
+Checkpointer LangGraph persistente em SQLite (stdlib sqlite3, modo WAL) + catálogo de threads.
+
+O MemorySaver perdia as threads a cada restart, não era compartilhado entre os
+workers do gunicorn e não permitia listar threads. Este checkpointer grava os
+checkpoints em um arquivo SQLite local (WAL: leitores não bloqueiam o escritor,
+vários processos podem abrir o mesmo arquivo) e mantém uma tabela `threads`
+(thread_id, created_at, updated_at, metadata, prévia da última mensagem) usada
+por search_threads/list_threads com paginação e filtros de metadata indexados.
+
+Layout das tabelas (mesmo modelo do InMemorySaver):
+- checkpoints: checkpoint sem channel_values + metadata, por (thread, ns, checkpoint_id)
+- blobs: valor de cada canal por versão (canais que não mudaram não são regravados;
+  `messages` é gravado como delta do checkpoint pai, ver checkpoint_delta.py)
+- writes: pending writes de cada checkpoint
+- threads: catálogo de threads
+"""
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import weakref
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from app.services.checkpoint_delta import MessageDeltaCodec
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MAX_CHARS = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'idle',
+    last_message_role TEXT,
+    last_message_preview TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_threads_updated_at ON threads (updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_threads_assistant_id ON threads (json_extract(metadata, '$.assistant_id'), updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_threads_user_id ON threads (json_extract(metadata, '$.user_id'), updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_threads_checkpoint ON checkpoints (thread_id, checkpoint_ns, checkpoint_id DESC);
+"""
+
+# Chaves de metadata aceitas nos filtros (entram literalmente no SQL para casar com os índices de expressão)
+_METADATA_KEY_RE = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def default_db_path() -> Path:
+    """
+    Caminho do banco: LANGGRAPH_SQLITE_PATH ou backend/data/langgraph_checkpoints.sqlite.
+    No Elastic Beanstalk, usa /tmp se o diretório padrão não tiver permissão de escrita.
+    """
+    env_path = os.getenv("LANGGRAPH_SQLITE_PATH")
+    if env_path:
+        return Path(env_path)
+    data_dir = Path(__file__).parent.parent.parent / "data"
+    try:
+        data_dir.mkdir(parents=True, exist_ok=True)
+        test_file = data_dir / ".test_write"
+        test_file.write_text("test")
+        test_file.unlink()
+    except (PermissionError, OSError) as e:
+        logger.warning("[SqliteCheckpointer] Sem permissão em %s (%s), usando /tmp", data_dir, e)
+        data_dir = Path("/tmp") / "alphaadvisor_langgraph"
+        data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir / "langgraph_checkpoints.sqlite"
+
+
+def _message_preview(messages: Any) -> tuple:
+    """Retorna (role, prévia do texto) da última mensagem de uma lista de mensagens LangChain."""
+    if not isinstance(messages, list) or not messages:
+        return None, None
+    last = messages[-1]
+    class_name = last.__class__.__name__
+    if "Human" in class_name:
+        role = "user"
+    elif "AI" in class_name:
+        role = "assistant"
+    elif "Tool" in class_name:
+        role = "tool"
+    elif "System" in class_name:
+        role = "system"
+    else:
+        role = getattr(last, "type", None)
+    content = getattr(last, "content", last)
+    if isinstance(content, list):
+        content = " ".join(
+            item if isinstance(item, str) else str(item.get("text", ""))
+            for item in content
+            if isinstance(item, (str, dict))
+        )
+    return role, str(content)[:PREVIEW_MAX_CHARS]
+
+
+def reopen_after_fork(owner: Any) -> None:
+    """Reabre a conexão SQLite de `owner` (método _connect) nos processos filhos após fork."""
+    if not hasattr(os, "register_at_fork"):
+        return
+    ref = weakref.ref(owner)
+
+    def reopen() -> None:
+        instance = ref()
+        if instance is not None:
+            instance._connect()
+
+    os.register_at_fork(after_in_child=reopen)
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpointer síncrono sobre sqlite3 (WAL) com catálogo de threads."""
+
+    def __init__(self, path: Optional[str] = None, *, serde: Any = None, delta: Any = "env") -> None:
+        super().__init__(serde=serde)
+        self.path = str(path or default_db_path())
+        # Lista de mensagens gravada como delta do checkpoint pai (ver checkpoint_delta.py)
+        self._delta = MessageDeltaCodec.from_env(self.serde) if delta == "env" else delta
+        self._connect()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+        if self.path != ":memory:":
+            # gunicorn --preload: a conexão aberta no master não pode ser usada depois do fork
+            reopen_after_fork(self)
+        logger.info("[SqliteCheckpointer] Banco de checkpoints: %s", self.path)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=30000")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _fetch_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: Any) -> Optional[tuple]:
+        rows = self._execute(
+            "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            (thread_id, checkpoint_ns, channel, str(version)),
+        )
+        return rows[0] if rows else None
+
+    def _load_blobs(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        versions: ChannelVersions,
+        checkpoint_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Carrega os valores dos canais nas versões do checkpoint (blobs delta são reconstruídos).
+        Com checkpoint_id, registra o checkpoint como base para deltas do próximo put da thread.
+        """
+        if not versions:
+            return {}
+        result: Dict[str, Any] = {}
+        pairs = [(channel, str(version)) for channel, version in versions.items()]
+        rows = self._execute(
+            "SELECT channel, version, type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND ("
+            + " OR ".join(["(channel = ? AND version = ?)"] * len(pairs)) + ")",
+            (thread_id, checkpoint_ns, *[v for pair in pairs for v in pair]),
+        )
+        for channel, version, type_, blob in rows:
+            if type_ == "empty":
+                continue
+            if self._delta is None:
+                result[channel] = self.serde.loads_typed((type_, blob))
+                continue
+            result[channel] = self._delta.decode(
+                thread_id, checkpoint_ns, channel, version, (type_, blob),
+                lambda base, channel=channel: self._fetch_blob(thread_id, checkpoint_ns, channel, base),
+            )
+            if checkpoint_id is not None:
+                self._delta.observe(thread_id, checkpoint_ns, checkpoint_id, channel, version, result[channel])
+        return result
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[tuple]:
+        rows = self._execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _make_tuple(self, row: tuple, observe: bool = False) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(
+                    thread_id, checkpoint_ns, checkpoint["channel_versions"], checkpoint_id if observe else None
+                ),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_b)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver
+    # ------------------------------------------------------------------
+
+    _SELECT = (
+        "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+        "metadata_type, metadata FROM checkpoints "
+    )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            rows = self._execute(
+                self._SELECT + "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            rows = self._execute(
+                self._SELECT + "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+        return self._make_tuple(rows[0], observe=True) if rows else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        Lista checkpoints do mais recente para o mais antigo.
+        before/limit são aplicados no SQL; o filtro de metadata é aplicado ao ler,
+        buscando em páginas para não carregar a thread inteira.
+        """
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = self._SELECT + (f"WHERE {' AND '.join(where)} " if where else "")
+        sql += "ORDER BY checkpoint_id DESC LIMIT ? OFFSET ?"
+
+        page_size = limit if (limit and not filter) else 50
+        offset = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            rows = self._execute(sql, (*params, page_size, offset))
+            if not rows:
+                return
+            offset += len(rows)
+            for row in rows:
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                yield self._make_tuple(row)
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining <= 0:
+                        return
+            if len(rows) < page_size:
+                return
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        blob_rows = []
+        for channel, version in new_versions.items():
+            if channel not in values:
+                type_, blob = "empty", b""
+            elif self._delta is not None and channel in self._delta.channels:
+                type_, blob = self._delta.encode(
+                    thread_id, checkpoint_ns, parent_checkpoint_id, checkpoint["id"], channel, version, values[channel]
+                )
+            else:
+                type_, blob = self.serde.dumps_typed(values[channel])
+            blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+        if self._delta is not None and not any(channel in new_versions for channel in self._delta.channels):
+            self._delta.advance(thread_id, checkpoint_ns, parent_checkpoint_id, checkpoint["id"])
+        type_, checkpoint_b = self.serde.dumps_typed(c)
+        metadata_type, metadata_b = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        now = _now()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        parent_checkpoint_id,
+                        type_,
+                        checkpoint_b,
+                        metadata_type,
+                        metadata_b,
+                    ),
+                )
+                if checkpoint_ns == "":
+                    role, preview = _message_preview(values.get("messages"))
+                    self._conn.execute(
+                        "INSERT INTO threads (thread_id, created_at, updated_at, last_message_role, last_message_preview) "
+                        "VALUES (?, ?, ?, ?, ?) ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at, "
+                        "last_message_role = COALESCE(excluded.last_message_role, threads.last_message_role), "
+                        "last_message_preview = COALESCE(excluded.last_message_preview, threads.last_message_preview)",
+                        (thread_id, now, now, role, preview),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        replace_rows, insert_rows = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, type_, blob, task_path)
+            # Writes especiais (erro, interrupt) sobrescrevem; os normais não são regravados
+            (replace_rows if write_idx < 0 else insert_rows).append(row)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", replace_rows)
+                self._conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", insert_rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("checkpoints", "blobs", "writes", "threads"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ------------------------------------------------------------------
+    # Catálogo de threads
+    # ------------------------------------------------------------------
+
+    def upsert_thread(self, thread_id: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Registra a thread no catálogo (ou mescla metadata se já existir) e retorna o registro."""
+        now = _now()
+        with self._lock:
+            row = self._conn.execute("SELECT metadata FROM threads WHERE thread_id = ?", (thread_id,)).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO threads (thread_id, created_at, updated_at, metadata) VALUES (?, ?, ?, ?)",
+                    (thread_id, now, now, json.dumps(metadata or {}, default=str)),
+                )
+            elif metadata:
+                merged = {**json.loads(row[0] or "{}"), **metadata}
+                self._conn.execute(
+                    "UPDATE threads SET metadata = ?, updated_at = ? WHERE thread_id = ?",
+                    (json.dumps(merged, default=str), now, thread_id),
+                )
+        return self.get_thread(thread_id)
+
+    def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Registro da thread no catálogo, ou None."""
+        rows = self._execute(
+            "SELECT thread_id, created_at, updated_at, metadata, status, last_message_role, last_message_preview "
+            "FROM threads WHERE thread_id = ?",
+            (thread_id,),
+        )
+        return self._thread_row_to_dict(rows[0]) if rows else None
+
+    def search_threads(
+        self,
+        metadata: Optional[Dict[str, Any]] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Busca threads no catálogo (mais recentes primeiro) com filtros de metadata/status."""
+        where, params = [], []
+        for key, value in (metadata or {}).items():
+            if not _METADATA_KEY_RE.match(str(key)):
+                raise ValueError(f"Chave de metadata inválida para filtro: {key!r}")
+            where.append(f"json_extract(metadata, '$.{key}') = json_extract(?, '$')")
+            params.append(json.dumps(value))
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        sql = (
+            "SELECT thread_id, created_at, updated_at, metadata, status, last_message_role, last_message_preview "
+            "FROM threads " + (f"WHERE {' AND '.join(where)} " if where else "") +
+            "ORDER BY updated_at DESC LIMIT ? OFFSET ?"
+        )
+        rows = self._execute(sql, (*params, int(limit), int(offset)))
+        return [self._thread_row_to_dict(row) for row in rows]
+
+    @staticmethod
+    def _thread_row_to_dict(row: tuple) -> Dict[str, Any]:
+        thread_id, created_at, updated_at, metadata, status, role, preview = row
+        return {
+            "thread_id": thread_id,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "metadata": json.loads(metadata or "{}"),
+            "status": status,
+            "last_message": {"role": role, "content": preview} if preview is not None else None,
+        }
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """
+    Cria o checkpointer do grafo conforme LANGGRAPH_CHECKPOINTER:
+    - sqlite (padrão): SqliteCheckpointSaver em LANGGRAPH_SQLITE_PATH / data/
+    - memory: BoundedMemorySaver (estado some no restart; memória limitada por LRU/bytes)
+    """
+    kind = os.getenv("LANGGRAPH_CHECKPOINTER", "sqlite").lower()
+    if kind == "memory":
+        from app.services.bounded_memory_saver import BoundedMemorySaver
+        return BoundedMemorySaver.from_env()
+    return SqliteCheckpointSaver()
@@ -0,0 +1,135 @@
+"""
+Serializador de estado para o caminho quente do streaming (SSE).
+
+convert_state_to_json percorre o estado recursivamente e, para cada valor, faz
+checagens por substring do nome da classe e hasattr; depois json.dumps percorre
+tudo de novo. Em uma thread longa isso se repete a cada evento, para as mesmas
+mensagens.
+
+O StreamSerializer faz uma única passada:
+- despacho pelo tipo exato (type(obj)) numa tabela cacheada; a decisão
+  "é mensagem? qual role?" é tomada uma vez por classe, não por valor;
+- cada mensagem LangChain é convertida uma única vez por conexão (cache por
+  identidade do objeto; as mensagens do estado não são recriadas entre passos);
+- dumps() usa orjson quando instalado (fallback para json).
+
+O formato de saída é o mesmo de convert_state_to_json/convert_messages_to_json.
+"""
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:  # encoder rápido opcional
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+_PRIMITIVES = (str, int, float, bool, type(None))
+_IDENTITY = "identity"
+_DICT = "dict"
+_SEQUENCE = "sequence"
+_MESSAGE = "message"
+
+# type -> (tipo de conversão, role da mensagem)
+_DISPATCH: Dict[type, Tuple[str, Optional[str]]] = {t: (_IDENTITY, None) for t in _PRIMITIVES}
+_DISPATCH.update({dict: (_DICT, None), list: (_SEQUENCE, None), tuple: (_SEQUENCE, None)})
+
+
+def _message_role(cls: type) -> str:
+    """Role da mensagem pelo nome da classe (mesma regra de convert_messages_to_json)."""
+    class_name = cls.__name__
+    if "Human" in class_name:
+        return "user"
+    if "AI" in class_name or "Assistant" in class_name:
+        return "assistant"
+    if "System" in class_name:
+        return "system"
+    if "Tool" in class_name:
+        return "tool"
+    return "user"
+
+
+def _resolve(cls: type) -> Tuple[str, Optional[str]]:
+    """Classifica um tipo ainda não visto e guarda a decisão na tabela de despacho."""
+    if issubclass(cls, dict):
+        entry = (_DICT, None)
+    elif issubclass(cls, (list, tuple)):
+        entry = (_SEQUENCE, None)
+    elif issubclass(cls, _PRIMITIVES):
+        entry = (_IDENTITY, None)
+    elif "Message" in cls.__name__ or hasattr(cls, "content") or "content" in getattr(cls, "model_fields", {}):
+        entry = (_MESSAGE, _message_role(cls))
+    else:
+        entry = (_IDENTITY, None)  # dumps() cai em str(), como json.dumps(default=str)
+    _DISPATCH[cls] = entry
+    return entry
+
+
+class StreamSerializer:
+    """Converte valores do estado para JSON; uma instância por conexão/run (cache de mensagens)."""
+
+    def __init__(self, cache_messages: bool = True) -> None:
+        self.cache_messages = cache_messages
+        # id(mensagem) -> (mensagem, json); a referência à mensagem impede reuso do id
+        self._messages: Dict[int, Tuple[Any, Dict[str, Any]]] = {}
+        self.stats = {"messages_converted": 0, "messages_cached": 0}
+
+    def message(self, msg: Any, role: Optional[str] = None) -> Dict[str, Any]:
+        """Converte uma mensagem LangChain para {"role", "content", "id"}."""
+        key = id(msg)
+        if self.cache_messages:
+            cached = self._messages.get(key)
+            if cached is not None and cached[0] is msg:
+                self.stats["messages_cached"] += 1
+                return cached[1]
+        content = getattr(msg, "content", None)
+        converted = {
+            "role": role or _message_role(type(msg)),
+            "content": content if content is not None else str(msg),
+        }
+        msg_id = getattr(msg, "id", None)
+        if msg_id:
+            converted["id"] = msg_id
+        self.stats["messages_converted"] += 1
+        # Chunks de token são objetos novos a cada evento: não vale a pena guardar
+        if self.cache_messages and not type(msg).__name__.endswith("Chunk"):
+            self._messages[key] = (msg, converted)
+        return converted
+
+    def to_jsonable(self, value: Any) -> Any:
+        """Converte o valor (estado, update de nó, metadata) numa estrutura serializável."""
+        kind, role = _DISPATCH.get(type(value)) or _resolve(type(value))
+        if kind is _IDENTITY:
+            return value
+        if kind is _DICT:
+            convert = self.to_jsonable
+            return {key: convert(item) for key, item in value.items()}
+        if kind is _SEQUENCE:
+            convert = self.to_jsonable
+            return [convert(item) for item in value]
+        return self.message(value, role)
+
+    def dumps(self, data: Any) -> str:
+        return dumps(data)
+
+
+def _default(obj: Any) -> str:
+    return str(obj)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(data: Any) -> str:
+        """Serializa para texto JSON (orjson; fallback para json em inteiros fora de 64 bits etc.)."""
+        try:
+            return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            return json.dumps(data, default=_default)
+else:  # pragma: no cover - depende do ambiente
+    def dumps(data: Any) -> str:
+        """Serializa para texto JSON."""
+        return json.dumps(data, default=_default)
+
+
+_shared = StreamSerializer(cache_messages=False)
+to_jsonable: Callable[[Any], Any] = _shared.to_jsonable
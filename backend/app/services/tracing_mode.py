@@ -0,0 +1,203 @@
+"""
+Modo de tracing do LangSmith: off, sampled ou full (LANGGRAPH_TRACING_MODE).
+
+traceable_tool (agent_tools) embrulhava toda função de análise em
+langsmith.traceable mesmo sem LANGSMITH_API_KEY, e o LangChain montava o
+LangChainTracer nos callbacks de cada chamada de LLM/tool quando o tracing do
+ambiente estava ligado. Com tracing desligado o wrapper ainda custa dezenas de
+microssegundos por chamada (ver bench_tracing_overhead.py).
+
+- off: traceable_tool devolve a função original (sem wrapper) e o tracing do
+  LangSmith é desligado globalmente (langsmith.configure(enabled=False)): o
+  LangChain não monta o tracer nos callbacks e nenhum payload de trace é criado;
+- full: comportamento anterior (toda chamada passa pelo traceable);
+- sampled: cada requisição é sorteada na entrada (init_app) com a taxa da rota
+  (LANGGRAPH_TRACING_ROUTE_RATES, ex. "POST /runs/wait=0.5,/threads/<thread_id>/runs/stream=0.1")
+  ou LANGGRAPH_TRACING_SAMPLE_RATE (padrão 0.1). Requisições fora da amostra
+  rodam com o tracing do LangSmith desligado (tracing_context(enabled=False)) e
+  chamam a função original das tools.
+
+Padrão: full se o tracing do LangSmith estiver ligado no ambiente
+(LANGSMITH_TRACING/LANGCHAIN_TRACING_V2=true), senão off. O modo é lido no
+import: trocar exige reiniciar o processo.
+
+Runs executados fora da thread da requisição (pool do RunManager, /runs/batch)
+levam a decisão com bind_events/bind_call.
+"""
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import random
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACING_MODES = ("off", "sampled", "full")
+
+# Decisão da requisição/run atual (None = fora de requisição: vale o modo)
+_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("tracing_sampled", default=None)
+
+
+def _langsmith_env_enabled() -> bool:
+    for var in ("LANGSMITH_TRACING_V2", "LANGCHAIN_TRACING_V2", "LANGSMITH_TRACING", "LANGCHAIN_TRACING"):
+        if os.getenv(var):
+            return os.getenv(var, "").lower() == "true"
+    return False
+
+
+def _parse_route_rates(value: str) -> Dict[str, float]:
+    """'POST /runs/wait=0.5,/threads/<thread_id>/runs/stream=0.1' -> {rota: taxa}."""
+    rates = {}
+    for item in value.split(","):
+        route, sep, rate = item.strip().rpartition("=")
+        if not sep or not route.strip():
+            continue
+        try:
+            rates[route.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            logger.warning("[TracingMode] Taxa inválida em LANGGRAPH_TRACING_ROUTE_RATES: %s", item)
+    return rates
+
+
+class TracingMode:
+    """Modo de tracing e amostragem por rota."""
+
+    def __init__(self, mode: str = "off", sample_rate: float = 0.1,
+                 route_rates: Optional[Dict[str, float]] = None) -> None:
+        if mode not in TRACING_MODES:
+            raise ValueError(f"Modo de tracing inválido: {mode} (use {', '.join(TRACING_MODES)})")
+        self.mode = mode
+        self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        self.route_rates = dict(route_rates or {})
+
+    @classmethod
+    def from_env(cls) -> "TracingMode":
+        mode = os.getenv("LANGGRAPH_TRACING_MODE") or ("full" if _langsmith_env_enabled() else "off")
+        if mode not in TRACING_MODES:
+            logger.warning("[TracingMode] LANGGRAPH_TRACING_MODE=%s inválido, usando off", mode)
+            mode = "off"
+        return cls(
+            mode=mode,
+            sample_rate=float(os.getenv("LANGGRAPH_TRACING_SAMPLE_RATE", "0.1")),
+            route_rates=_parse_route_rates(os.getenv("LANGGRAPH_TRACING_ROUTE_RATES", "")),
+        )
+
+    def rate_for(self, method: str, route: str) -> float:
+        """Taxa da rota: 'MÉTODO /regra' tem prioridade sobre '/regra', que tem sobre a taxa padrão."""
+        return self.route_rates.get(f"{method} {route}", self.route_rates.get(route, self.sample_rate))
+
+    def decide(self, method: str, route: str) -> bool:
+        if self.mode == "off":
+            return False
+        if self.mode == "full":
+            return True
+        rate = self.rate_for(method, route)
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+    def is_sampled(self) -> bool:
+        if self.mode != "sampled":
+            return self.mode == "full"
+        return bool(_sampled.get())
+
+    # ------------------------------------------------------------------
+    # Decorator das tools
+    # ------------------------------------------------------------------
+
+    def traceable(self, name: str, project_name: Optional[str] = None) -> Callable[[Callable], Callable]:
+        """Decorator equivalente a langsmith.traceable conforme o modo (off = função original)."""
+        if self.mode == "off":
+            return lambda fn: fn
+        from langsmith import traceable
+
+        decorator = traceable(name=name, project_name=project_name)
+        if self.mode == "full":
+            return decorator
+
+        def wrap(fn: Callable) -> Callable:
+            traced = decorator(fn)
+
+            @functools.wraps(fn)
+            def dispatch(*args: Any, **kwargs: Any) -> Any:
+                return traced(*args, **kwargs) if _sampled.get() else fn(*args, **kwargs)
+
+            return dispatch
+
+        return wrap
+
+    # ------------------------------------------------------------------
+    # Escopo da requisição/run
+    # ------------------------------------------------------------------
+
+    @contextlib.contextmanager
+    def scope(self, sampled: bool) -> Iterator[None]:
+        """Executa o bloco com a decisão de amostragem (fora da amostra: LangSmith desligado)."""
+        # set/restore em vez de token: o gerador do run pode ser fechado por outra thread
+        previous = _sampled.get()
+        _sampled.set(sampled)
+        try:
+            if self.mode == "sampled" and not sampled:
+                from langsmith.run_helpers import tracing_context
+
+                with tracing_context(enabled=False):
+                    yield
+            else:
+                yield
+        finally:
+            _sampled.set(previous)
+
+    def bind_events(self, events: Iterable[Any]) -> Iterator[Any]:
+        """Gerador de eventos que roda com a decisão da requisição atual (para o pool de runs)."""
+        if self.mode != "sampled":
+            return iter(events)
+        sampled = self.is_sampled()
+
+        def run() -> Iterator[Any]:
+            with self.scope(sampled):
+                yield from events
+
+        return run()
+
+    def bind_call(self, fn: Callable) -> Callable:
+        """fn executada com a decisão da requisição atual (para threads de lote)."""
+        if self.mode != "sampled":
+            return fn
+        sampled = self.is_sampled()
+
+        @functools.wraps(fn)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            with self.scope(sampled):
+                return fn(*args, **kwargs)
+
+        return call
+
+
+tracing = TracingMode.from_env()
+
+if tracing.mode == "off":
+    try:
+        import langsmith
+
+        langsmith.configure(enabled=False)
+    except Exception as e:  # langsmith antigo sem configure(): o traceable já some das tools
+        logger.debug("[TracingMode] langsmith.configure indisponível: %s", e)
+
+
+def init_app(app: Any) -> None:
+    """Sorteia cada requisição (modo sampled) e a executa com o tracing correspondente."""
+    if tracing.mode != "sampled":
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _tracing_start() -> None:
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        g._tracing_scope = tracing.scope(tracing.decide(request.method, route))
+        g._tracing_scope.__enter__()
+
+    @app.teardown_request
+    def _tracing_end(exc: Optional[BaseException]) -> None:
+        scope = g.pop("_tracing_scope", None)
+        if scope is not None:
+            scope.__exit__(None, None, None)
@@ -0,0 +1,54 @@
+"""
+Modo delta (opt-in) para payloads de "values" no SSE e no histórico de threads.
+
+No modo padrão (compatível com o Studio) cada evento state_update e cada item de
+histórico carrega o array `messages` inteiro, o que soma O(N²) bytes numa thread
+longa. No modo delta o servidor guarda, por conexão, o que já foi enviado e cada
+payload leva apenas as mensagens a partir da primeira nova ou alterada:
+
+    "messages_delta": {"offset": k, "total": n, "messages": [...]}
+
+O cliente reconstrói com `mensagens = mensagens[:offset] + delta.messages`
+(`total` permite conferir o tamanho final). Mensagens são comparadas pelo id
+estável (message.id) e pelo conteúdo já convertido para JSON.
+
+Ativação: query param `values_mode=delta` ou header `X-Values-Mode: delta`.
+"""
+from typing import Any, Dict, List
+
+VALUES_MODE_PARAM = "values_mode"
+VALUES_MODE_HEADER = "X-Values-Mode"
+
+
+def values_delta_requested(request: Any) -> bool:
+    """Indica se a requisição pediu o modo delta (query param ou header)."""
+    mode = request.args.get(VALUES_MODE_PARAM) or request.headers.get(VALUES_MODE_HEADER) or ""
+    return mode.lower() == "delta"
+
+
+class MessagesDeltaEncoder:
+    """Rastreia as mensagens já enviadas em uma conexão e gera o delta do próximo payload."""
+
+    def __init__(self) -> None:
+        self._sent: List[Dict[str, Any]] = []
+
+    @property
+    def last_sent_index(self) -> int:
+        return len(self._sent)
+
+    def encode(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Retorna o delta de `messages` (já convertidas para JSON) em relação ao último envio."""
+        offset = 0
+        limit = min(len(messages), len(self._sent))
+        while offset < limit:
+            sent, current = self._sent[offset], messages[offset]
+            if sent.get("id") != current.get("id") or sent != current:
+                break
+            offset += 1
+        self._sent = list(messages)
+        return {"offset": offset, "total": len(messages), "messages": messages[offset:]}
+
+    def encode_values(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Payload de values no modo delta: demais chaves inteiras, `messages` como delta."""
+        payload = {key: value for key, value in values.items() if key != "messages"}
+        return {"values": payload, "messages_delta": self.encode(values.get("messages") or [])}
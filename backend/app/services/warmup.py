@@ -0,0 +1,115 @@
+"""
+Aquecimento (warmup) do backend no startup e estado de prontidão (readiness).
+
+O grafo era importado na primeira requisição (ChatOpenAI, ToolNode, compile), e
+uma falha nesse import ficava guardada para sempre: o primeiro usuário de cada
+deploy/reciclagem de worker pagava o custo todo e um erro transitório (ex.: rede
+ao criar o cliente) deixava o worker inutilizável até reiniciar.
+
+- WarmupState executa as fases do aquecimento (carregar grafo, compilar variante
+  stateless, schemas, bind das tools, regulações), guarda status e duração de
+  cada uma e responde ao endpoint de readiness;
+- RetryBackoff controla novas tentativas após falha: a primeira falha espera
+  LANGGRAPH_GRAPH_RETRY_BASE segundos (padrão 1), dobrando a cada falha até
+  LANGGRAPH_GRAPH_RETRY_MAX (padrão 60); um sucesso zera o contador.
+
+Com gunicorn --preload o aquecimento roda uma vez no processo master, antes do
+fork, e os workers herdam o grafo já construído (copy-on-write).
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBackoff:
+    """Backoff exponencial entre tentativas de uma operação que falhou."""
+
+    def __init__(self, base_seconds: float = 1.0, max_seconds: float = 60.0) -> None:
+        self.base_seconds = max(0.0, float(base_seconds))
+        self.max_seconds = max(self.base_seconds, float(max_seconds))
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @classmethod
+    def from_env(cls) -> "RetryBackoff":
+        return cls(
+            base_seconds=float(os.getenv("LANGGRAPH_GRAPH_RETRY_BASE", "1")),
+            max_seconds=float(os.getenv("LANGGRAPH_GRAPH_RETRY_MAX", "60")),
+        )
+
+    def ready(self, now: Optional[float] = None) -> bool:
+        """True quando já pode tentar de novo."""
+        return (time.monotonic() if now is None else now) >= self.retry_at
+
+    def failure(self, now: Optional[float] = None) -> float:
+        """Registra uma falha; retorna os segundos até a próxima tentativa."""
+        self.failures += 1
+        delay = min(self.max_seconds, self.base_seconds * (2 ** (self.failures - 1)))
+        self.retry_at = (time.monotonic() if now is None else now) + delay
+        return delay
+
+    def success(self) -> None:
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class WarmupState:
+    """Fases do aquecimento com status e duração, para o endpoint de readiness."""
+
+    def __init__(self) -> None:
+        self._phases: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.pid = os.getpid()
+
+    def run_phase(self, name: str, fn: Callable[[], Any], required: bool = True) -> bool:
+        """Executa uma fase; falha em fase não obrigatória não impede a prontidão."""
+        if self.started_at is None:
+            self.started_at = datetime.utcnow().isoformat() + "Z"
+        started = time.monotonic()
+        phase: Dict[str, Any] = {"status": "running", "required": required}
+        with self._lock:
+            self._phases[name] = phase
+        try:
+            detail = fn()
+            phase["status"] = "ok"
+            if isinstance(detail, dict):  # fases podem devolver contagens/versões para o /ready
+                phase["detail"] = detail
+        except Exception as e:
+            phase["status"] = "error"
+            phase["error"] = f"{type(e).__name__}: {e}"
+            log = logger.error if required else logger.warning
+            log("[Warmup] Fase %s falhou: %s", name, e)
+        phase["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        logger.info("[Warmup] Fase %s: %s em %.1f ms", name, phase["status"], phase["duration_ms"])
+        return phase["status"] == "ok"
+
+    def finish(self) -> None:
+        self.finished_at = datetime.utcnow().isoformat() + "Z"
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            phases = list(self._phases.values())
+        return bool(phases) and all(p["status"] == "ok" for p in phases if p["required"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = [{"name": name, **phase} for name, phase in self._phases.items()]
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            # pid diferente do atual: aquecimento herdado do master (gunicorn --preload)
+            "warmed_in_pid": self.pid,
+            "pid": os.getpid(),
+            "total_ms": round(sum(p.get("duration_ms", 0) for p in phases), 1),
+            "phases": phases,
+        }
@@ -1,6 +1,7 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from app.routes import chat, oportunidades, alertas, assessor, cliente, configuracoes, conexoes, health, trace_visualization, painel_agente, agent_builder, auth, langgraph_server, regulacoes
+from app.routes import chat, oportunidades, alertas, assessor, cliente, configuracoes, conexoes, health, trace_visualization, painel_agente, agent_builder, auth, langgraph_server, regulacoes, metrics
+from app.services import metrics as metrics_service, span_tracer, tracing_mode
 import os
 import sys
 
@@ -37,6 +38,7 @@ def check_langsmith_config():
 
 # Executar verificação no import
 check_langsmith_config()
+logger.info(f"[Startup] Modo de tracing: {tracing_mode.tracing.mode} (LANGGRAPH_TRACING_MODE)")
 
 # Configurar CORS para permitir requisições do frontend Vercel e LangSmith Studio
 frontend_url = os.getenv('FRONTEND_URL', 'https://alphaadvisor.vercel.app')
@@ -155,6 +157,11 @@ try:
     logger.info("[Startup] Blueprint 'langgraph_server' registrado")
     app.register_blueprint(regulacoes.regulacoes_bp)
     logger.info("[Startup] Blueprint 'regulacoes' registrado")
+    app.register_blueprint(metrics.metrics_bp)
+    metrics_service.init_app(app)
+    span_tracer.init_app(app)
+    tracing_mode.init_app(app)
+    logger.info("[Startup] Blueprint 'metrics' registrado")
 
     # Listar todas as rotas registradas para debug
     logger.info("[Startup] Rotas registradas:")
@@ -168,6 +175,10 @@ except Exception as e:
     logger.error(f"[Startup] Traceback:\n{traceback.format_exc()}")
     raise
 
+# Aquecimento do grafo no startup (com gunicorn --preload roda uma vez no master, antes do fork)
+if os.getenv('LANGGRAPH_WARMUP', 'true').lower() not in ('0', 'false', 'no'):
+    langgraph_server.warmup_graph()
+
 @app.route('/')
 def index():
     return jsonify({'message': 'AlphaAdvisor API', 'status': 'running'}), 200
@@ -0,0 +1,200 @@
+"""
+Teste de carga de streams SSE: centenas de streams simultâneos + latência das demais chamadas.
+
+Abre N streams POST /threads/<id>/runs/stream ao mesmo tempo e, enquanto eles
+estão abertos, mede a latência de GET /health (as "outras chamadas da API"). Com
+workers síncronos os streams ocupam todos os workers e o /health espera; com
+gthread/gevent (gunicorn.conf.py) o /health continua respondendo.
+
+Sem --url, sobe um gunicorn local com gunicorn.conf.py servindo o blueprint do
+LangGraph com um grafo fake (sem LLM): cada run emite --eventos atualizações com
+--intervalo segundos entre elas, imitando um agente esperando o modelo.
+
+Uso:
+    python bench_sse_load.py --streams 300
+    python bench_sse_load.py --streams 300 --worker-class sync   # comparação
+    python bench_sse_load.py --url http://localhost:8000 --streams 50
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def criar_app_fake():
+    """App Flask com o blueprint do LangGraph e um grafo fake (alvo do gunicorn local)."""
+    from flask import Flask
+    from langchain_core.messages import AIMessage
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.graph import MessagesState, StateGraph, START, END
+
+    from app.routes import langgraph_server
+
+    eventos = int(os.getenv("BENCH_EVENTOS", "10"))
+    intervalo = float(os.getenv("BENCH_INTERVALO", "0.2"))
+
+    def agent(state):
+        time.sleep(intervalo)  # espera de rede do LLM
+        return {"messages": [AIMessage(content=f"parte {len(state['messages'])}")]}
+
+    def continuar(state):
+        return "agent" if len(state["messages"]) <= eventos else END
+
+    langgraph_server._graph = (
+        StateGraph(MessagesState).add_node("agent", agent).add_edge(START, "agent")
+        .add_conditional_edges("agent", continuar, ["agent", END])
+        .compile(checkpointer=InMemorySaver())
+    )
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    return app
+
+
+def _porta_livre():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def subir_servidor(args):
+    porta = _porta_livre()
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f"127.0.0.1:{porta}",
+        GUNICORN_WORKER_CLASS=args.worker_class,
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_PRELOAD="false",
+        BENCH_EVENTOS=str(args.eventos),
+        BENCH_INTERVALO=str(args.intervalo),
+        # Runs esperam o "LLM": o pool de runs precisa acompanhar o número de streams
+        LANGGRAPH_RUN_WORKERS=str(args.streams),
+        LANGGRAPH_RUN_QUEUE_MAX=str(args.streams * 2),
+        LANGGRAPH_RUNS_SQLITE_PATH=os.path.join(tempfile.mkdtemp(), "runs.sqlite"),
+        LANGGRAPH_SQLITE_PATH=os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"),
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-fake"),
+    )
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "bench_sse_load:criar_app_fake()"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    for _ in range(150):
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            return processo, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    processo.kill()
+    raise RuntimeError("gunicorn local não subiu")
+
+
+def abrir_stream(url, resultados, inicio_comum):
+    thread_id = str(uuid.uuid4())
+    body = {
+        "input": {"messages": [{"role": "user", "content": "oi"}]},
+        "stream_mode": "updates",
+        "config": {"recursion_limit": 1000},
+    }
+    inicio_comum.wait()
+    inicio = time.perf_counter()
+    resultado = {"ok": False, "eventos": 0, "ttfb": None}
+    try:
+        with requests.post(f"{url}/threads/{thread_id}/runs/stream", json=body, stream=True, timeout=300) as resposta:
+            resultado["status"] = resposta.status_code
+            for linha in resposta.iter_lines():
+                if linha.startswith(b"event:"):
+                    if resultado["ttfb"] is None:
+                        resultado["ttfb"] = time.perf_counter() - inicio
+                    resultado["eventos"] += 1
+            resultado["ok"] = resposta.status_code == 200
+    except requests.RequestException as e:
+        resultado["erro"] = str(e)
+    resultado["duracao"] = time.perf_counter() - inicio
+    resultados.append(resultado)
+
+
+def sondar_health(url, latencias, parar):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        try:
+            requests.get(f"{url}/health", timeout=60)
+            latencias.append(time.perf_counter() - inicio)
+        except requests.RequestException:
+            latencias.append(float("inf"))
+        time.sleep(0.2)
+
+
+def _ms(valores, q):
+    valores = sorted(v for v in valores if v is not None)
+    if not valores:
+        return "-"
+    if q == "max":
+        return f"{valores[-1] * 1000:.0f}"
+    return f"{valores[min(len(valores) - 1, int(q * len(valores)))] * 1000:.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de streams SSE simultâneos")
+    parser.add_argument("--url", help="Servidor já rodando (padrão: sobe gunicorn local com grafo fake)")
+    parser.add_argument("--streams", type=int, default=300)
+    parser.add_argument("--eventos", type=int, default=10)
+    parser.add_argument("--intervalo", type=float, default=0.2)
+    parser.add_argument("--worker-class", default="gthread", choices=["gthread", "gevent", "sync"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=256)
+    args = parser.parse_args()
+
+    processo = None
+    url = args.url
+    if url is None:
+        processo, url = subir_servidor(args)
+    try:
+        resultados, latencias = [], []
+        inicio_comum, parar = threading.Event(), threading.Event()
+        clientes = [threading.Thread(target=abrir_stream, args=(url, resultados, inicio_comum), daemon=True)
+                    for _ in range(args.streams)]
+        for cliente in clientes:
+            cliente.start()
+        sonda = threading.Thread(target=sondar_health, args=(url, latencias, parar), daemon=True)
+        inicio = time.perf_counter()
+        inicio_comum.set()
+        sonda.start()
+        for cliente in clientes:
+            cliente.join()
+        parar.set()
+        sonda.join()
+        total = time.perf_counter() - inicio
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    ok = [r for r in resultados if r["ok"]]
+    print(f"\nStreams: {args.streams} simultâneos | servidor: {args.url or args.worker_class} "
+          f"({args.workers} workers{', %d threads' % args.threads if args.worker_class == 'gthread' else ''})")
+    print(f"  concluídos: {len(ok)}  falhas: {len(resultados) - len(ok)}  tempo total: {total:.1f}s")
+    if ok:
+        print(f"  eventos por stream (mediana): {statistics.median(r['eventos'] for r in ok):.0f}")
+    print(f"  1º evento (ms)   p50 {_ms([r['ttfb'] for r in ok], 0.5)}  p95 {_ms([r['ttfb'] for r in ok], 0.95)}  "
+          f"máx {_ms([r['ttfb'] for r in ok], 'max')}")
+    print(f"  duração (ms)     p50 {_ms([r['duracao'] for r in ok], 0.5)}  p95 {_ms([r['duracao'] for r in ok], 0.95)}")
+    print(f"  GET /health (ms) p50 {_ms(latencias, 0.5)}  p95 {_ms(latencias, 0.95)}  máx {_ms(latencias, 'max')} "
+          f"({len(latencias)} sondagens durante a carga)")
+
+
+if __name__ == "__main__":
+    main()
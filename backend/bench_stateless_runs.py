@@ -0,0 +1,103 @@
+"""
+Benchmark de runs stateless: overhead por run com e sem checkpointer.
+
+Executa o mesmo grafo (init → context → agent ⇄ tools → end, modelo local sem
+rede) compilado com o checkpointer do servidor e compilado sem checkpointer
+(variante usada por /runs/wait e /runs/stream), com o histórico de N turnos
+enviado no input como num run stateless.
+
+Uso:
+    python bench_stateless_runs.py
+    python bench_stateless_runs.py --turnos 0 10 40 --runs 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.services.sqlite_checkpointer import SqliteCheckpointSaver
+
+CARTEIRA = '{"ativo": "CDB Banco Inter", "valor": 15000.0, "percentual": 12.5}, ' * 20
+
+
+def construir(checkpointer):
+    """Mesma topologia do grafo do agente, com nós locais (sem LLM)."""
+
+    def agent(state):
+        ultima = state["messages"][-1]
+        if isinstance(ultima, HumanMessage):
+            return {"messages": [AIMessage(content="", tool_calls=[{"name": "obter_carteira", "args": {}, "id": "c1"}])]}
+        return {"messages": [AIMessage(content="Sua carteira está concentrada em renda fixa.")]}
+
+    def tools(state):
+        return {"messages": [ToolMessage(content=CARTEIRA, tool_call_id="c1", name="obter_carteira")]}
+
+    def continuar(state):
+        return "tools" if state["messages"][-1].tool_calls else "end"
+
+    builder = (
+        StateGraph(MessagesState)
+        .add_node("init", lambda state: {})
+        .add_node("context", lambda state: {})
+        .add_node("agent", agent)
+        .add_node("tools", tools)
+        .add_node("end", lambda state: {})
+        .add_edge(START, "init")
+        .add_edge("init", "context")
+        .add_edge("context", "agent")
+        .add_conditional_edges("agent", continuar, {"tools": "tools", "end": "end"})
+        .add_edge("tools", "context")
+        .add_edge("end", END)
+    )
+    return builder.compile(checkpointer=checkpointer) if checkpointer is not None else builder.compile()
+
+
+def historico(turnos):
+    msgs = []
+    for i in range(turnos):
+        msgs += [HumanMessage(content=f"pergunta {i}"), AIMessage(content="resposta " * 30)]
+    return msgs + [HumanMessage(content="Como está minha carteira?")]
+
+
+def medir(graph, turnos, runs):
+    entrada = historico(turnos)
+    inicio = time.perf_counter()
+    for _ in range(runs):
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        graph.invoke({"messages": list(entrada)}, config)
+    return (time.perf_counter() - inicio) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead de runs stateless com e sem checkpointer")
+    parser.add_argument("--turnos", type=int, nargs="+", default=[0, 10, 40])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        variantes = {
+            "sem checkpointer": construir(None),
+            "memória": construir(InMemorySaver()),
+            "sqlite": construir(SqliteCheckpointSaver(os.path.join(tmp, "bench.sqlite"))),
+        }
+        print("=" * 72)
+        print("Runs stateless: ms por run (média)")
+        print("=" * 72)
+        print(f"{'turnos':>7}" + "".join(f"{nome:>18}" for nome in variantes))
+        for turnos in args.turnos:
+            linha = f"{turnos:>7}"
+            for graph in variantes.values():
+                linha += f"{medir(graph, turnos, args.runs):>18.2f}"
+            print(linha)
+
+
+if __name__ == "__main__":
+    main()
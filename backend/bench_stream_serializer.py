@@ -0,0 +1,93 @@
+"""
+Benchmark do serializador de eventos SSE: CPU por evento de values x tamanho da thread.
+
+Compara o caminho antigo (convert_state_to_json + json.dumps) com o StreamSerializer
+(despacho por tipo exato, mensagens convertidas uma vez por conexão, orjson quando
+instalado), reproduzindo os eventos de values de um run sobre uma thread com N turnos.
+
+Uso:
+    python bench_stream_serializer.py
+    python bench_stream_serializer.py --turnos 10 40 160 --repeticoes 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.routes.langgraph_server import convert_state_to_json
+from app.services import stream_serializer
+from app.services.stream_serializer import StreamSerializer
+
+CARTEIRA = '{"ativo": "CDB Banco Inter", "valor": 15000.0, "percentual": 12.5, "liquidez": "diaria"}, ' * 10
+
+
+def gerar_thread(turnos):
+    msgs = []
+    for i in range(turnos):
+        call_id = f"call_{i}"
+        msgs += [
+            HumanMessage(content=f"Como está minha carteira hoje? (pergunta {i})", id=f"h{i}"),
+            AIMessage(content="", tool_calls=[{"name": "obter_carteira", "args": {}, "id": call_id}], id=f"a{i}"),
+            ToolMessage(content=CARTEIRA, tool_call_id=call_id, name="obter_carteira", id=f"t{i}"),
+            AIMessage(content="Sua carteira está concentrada em renda fixa; sugiro diversificar. " * 3, id=f"r{i}"),
+        ]
+    return msgs
+
+
+def eventos_do_run(turnos):
+    """Estados emitidos em stream_mode=values num run (context → agent → tools → context → agent)."""
+    historico = gerar_thread(turnos)
+    estados = []
+    novas = [
+        HumanMessage(content="E agora, o que você recomenda?", id="hx"),
+        AIMessage(content="", tool_calls=[{"name": "obter_carteira", "args": {}, "id": "cx"}], id="ax"),
+        ToolMessage(content=CARTEIRA, tool_call_id="cx", name="obter_carteira", id="tx"),
+        AIMessage(content="Recomendo rebalancear para 60% renda fixa e 40% variável.", id="rx"),
+    ]
+    for n in range(1, len(novas) + 1):
+        estados.append({"messages": historico + novas[:n], "context_summary": "", "context_start": 0})
+    return estados
+
+
+def antigo(estados):
+    for estado in estados:
+        json.dumps({"run_id": "r", "node": None, "values": convert_state_to_json(estado)}, default=str)
+
+
+def novo(estados):
+    serializer = StreamSerializer()
+    for estado in estados:
+        serializer.dumps({"run_id": "r", "node": None, "values": serializer.to_jsonable(estado)})
+
+
+def medir(funcao, estados, repeticoes):
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        funcao(estados)
+    return (time.process_time() - inicio) * 1000 / (repeticoes * len(estados))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do serializador de eventos SSE")
+    parser.add_argument("--turnos", type=int, nargs="+", default=[5, 20, 80, 160])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Serializador SSE (orjson: {'sim' if stream_serializer.orjson is not None else 'não'})")
+    print("=" * 72)
+    print(f"{'turnos':>7} {'mensagens':>10} {'antigo ms/evento':>17} {'novo ms/evento':>15} {'ganho':>7}")
+    for turnos in args.turnos:
+        estados = eventos_do_run(turnos)
+        t_antigo = medir(antigo, estados, args.repeticoes)
+        t_novo = medir(novo, estados, args.repeticoes)
+        print(f"{turnos:>7} {len(estados[-1]['messages']):>10} {t_antigo:>17.3f} {t_novo:>15.3f} {t_antigo / t_novo:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark do custo de tracing por chamada de tool em cada LANGGRAPH_TRACING_MODE.
+
+Mede, por modo:
+- função de análise decorada com traceable_tool (como em agent_tools): custo do
+  wrapper + montagem do payload do trace;
+- tool do LangChain (tool.invoke): callbacks com/sem o LangChainTracer.
+
+Modos: off (função original), sampled fora da amostra (função original via
+despacho + LangSmith desligado no escopo), sampled na amostra e full (trace
+completo). Nada sai para a rede: os traces vão para um cliente LangSmith local
+que só conta as chamadas.
+
+Uso:
+    python bench_tracing_overhead.py
+    python bench_tracing_overhead.py --chamadas 5000
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.tools import tool
+from langsmith import Client
+from langsmith.run_helpers import tracing_context
+
+from app.services.tracing_mode import TracingMode
+
+
+class ClienteLocal(Client):
+    """Cliente LangSmith que não envia nada: só conta os runs criados/atualizados."""
+
+    def __init__(self):
+        super().__init__(api_url="http://127.0.0.1:9", api_key="bench", auto_batch_tracing=False)
+        self.runs_enviados = 0
+
+    def create_run(self, *args, **kwargs):
+        self.runs_enviados += 1
+
+    def update_run(self, *args, **kwargs):
+        self.runs_enviados += 1
+
+
+def analisar(carteira):
+    return {"ativos": len(carteira), "total": sum(carteira.values())}
+
+
+@tool
+def consultar_carteira(cliente: str) -> str:
+    """Consulta a carteira do cliente."""
+    return f"carteira de {cliente}"
+
+
+def _medir_us(fn, chamadas):
+    for _ in range(min(200, chamadas)):  # aquecimento
+        fn()
+    inicio = time.perf_counter()
+    for _ in range(chamadas):
+        fn()
+    return (time.perf_counter() - inicio) / chamadas * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de tracing por chamada de tool")
+    parser.add_argument("--chamadas", type=int, default=2000)
+    args = parser.parse_args()
+
+    carteira = {"PETR4": 1000.0, "VALE3": 2500.0, "TESOURO": 5000.0}
+    cliente = ClienteLocal()
+    cenarios = [
+        ("off", "off", None),
+        ("sampled (fora da amostra)", "sampled", False),
+        ("sampled (na amostra)", "sampled", True),
+        ("full", "full", None),
+    ]
+    base = _medir_us(lambda: analisar(carteira), args.chamadas)
+    print(f"\nChamadas por medição: {args.chamadas} | função sem decorator: {base:.2f} µs")
+    print(f"  {'modo':<28} {'traceable_tool (µs)':>20} {'overhead':>10} {'tool.invoke (µs)':>18}")
+    for nome, modo, amostrado in cenarios:
+        tracing = TracingMode(mode=modo)
+        funcao = tracing.traceable("analisar", "bench")(analisar)
+        rastreado = modo == "full" or amostrado
+        escopo = tracing.scope(amostrado) if amostrado is not None else contextlib.nullcontext()
+        with tracing_context(enabled=rastreado, client=cliente), escopo:
+            decorada = _medir_us(lambda: funcao(carteira), args.chamadas)
+            invoke = _medir_us(lambda: consultar_carteira.invoke({"cliente": "ana"}), max(1, args.chamadas // 4))
+        print(f"  {nome:<28} {decorada:>20.2f} {decorada - base:>+10.2f} {invoke:>18.1f}")
+    print(f"\n  runs de trace montados (cliente local, sem rede): {cliente.runs_enviados}")
+
+
+if __name__ == "__main__":
+    main()
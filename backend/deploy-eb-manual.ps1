@@ -26,6 +26,7 @@ $zipFile = "deploy-eb-$(Get-Date -Format 'yyyyMMdd-HHmmss').zip"
 $filesToInclude = @(
     "application.py",
     "Procfile",
+    "gunicorn.conf.py",
     "requirements.txt",
     "app",
     ".ebextensions"
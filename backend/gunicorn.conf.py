@@ -0,0 +1,71 @@
+"""
+Configuração do gunicorn para o backend (Procfile: gunicorn -c gunicorn.conf.py application:application).
+
+Com workers síncronos cada stream SSE aberto (create_run_stream, stream_thread,
+/runs/stream, join) ocupava um worker inteiro até o fim do run: dois streams do
+Studio bloqueavam todas as outras chamadas da API. Os streams passam quase todo o
+tempo esperando eventos do RunManager (o grafo roda no pool de runs), então o
+modo padrão agora é gthread: cada worker atende GUNICORN_THREADS requisições ao
+mesmo tempo e um stream ocupa só uma thread ociosa.
+
+Variáveis:
+- GUNICORN_WORKER_CLASS: gthread (padrão), gevent (green threads, requer
+  `pip install gevent`; monkey patch aplicado aqui, antes do --preload) ou sync;
+- GUNICORN_WORKERS (padrão 2), GUNICORN_THREADS (padrão 128, gthread),
+  GUNICORN_WORKER_CONNECTIONS (padrão 1000, gevent);
+- GUNICORN_TIMEOUT (padrão 120), GUNICORN_KEEPALIVE (padrão 75);
+- GUNICORN_PRELOAD (padrão true): app e grafo carregados uma vez no master
+  (warmup, ver app/services/warmup.py).
+
+Com muitos streams simultâneos, LANGGRAPH_RUN_WORKERS/LANGGRAPH_RUN_QUEUE_MAX
+limitam quantos runs executam/aguardam por worker; ajuste junto com as threads.
+Teste de carga: bench_sse_load.py.
+
+Métricas (GET /metrics): cada worker grava seu snapshot em LANGGRAPH_METRICS_DIR
+e on_starting limpa os snapshots da execução anterior. worker_exit grava o
+snapshot final do worker e child_exit (no master) o arquiva em metrics-dead.json,
+removendo o arquivo do pid morto.
+"""
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+# threads > 1 com sync faria o gunicorn trocar silenciosamente para gthread
+threads = int(os.getenv("GUNICORN_THREADS", "128")) if worker_class == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() not in ("0", "false", "no")
+
+if worker_class == "gevent":
+    # Precisa acontecer antes de importar a app (preload) para threading/socket virarem cooperativos
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def on_starting(server):
+    from app.services.metrics import MetricsRegistry
+
+    MetricsRegistry.from_env().clear_directory()
+
+
+def worker_exit(server, worker):
+    from app.services import metrics
+
+    metrics.registry.flush()
+
+
+def child_exit(server, worker):
+    from app.services.metrics import MetricsRegistry
+
+    MetricsRegistry.from_env().mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    if worker_class == "sync":
+        server.log.warning("[Gunicorn] Workers síncronos: cada stream SSE ocupa um worker inteiro")
+    server.log.info(f"[Gunicorn] {workers} worker(s) {worker_class}"
+                    + (f" x {threads} threads" if worker_class == "gthread" else ""))
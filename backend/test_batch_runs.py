@@ -0,0 +1,152 @@
+"""
+Script para testar POST /runs/batch (NDJSON, paralelismo limitado, falhas parciais).
+Não depende de OpenAI: registra o blueprint num Flask local com um grafo fake.
+
+Uso: python test_batch_runs.py  (ou pytest test_batch_runs.py)
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+
+from flask import Flask
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+from app.services.batch_runner import run_batch
+
+
+def _client():
+    estado = {"ativos": 0, "max_ativos": 0}
+    lock = threading.Lock()
+
+    def agent(state):
+        pergunta = state["messages"][-1].content
+        if pergunta == "falha":
+            raise RuntimeError("erro no agente")
+        with lock:
+            estado["ativos"] += 1
+            estado["max_ativos"] = max(estado["max_ativos"], estado["ativos"])
+        time.sleep(0.1)
+        with lock:
+            estado["ativos"] -= 1
+        return {"messages": [AIMessage(content=f"eco: {pergunta}")]}
+
+    langgraph_server._graph = (
+        StateGraph(MessagesState).add_node("agent", agent).add_edge(START, "agent").add_edge("agent", END)
+        .compile(checkpointer=InMemorySaver())
+    )
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    return app, estado
+
+
+def _item(content, thread_id=None):
+    item = {"input": {"messages": [{"role": "user", "content": content}]}}
+    if thread_id:
+        item["thread_id"] = thread_id
+    return item
+
+
+def test_run_batch_groups_items_sequentially():
+    ordem = []
+
+    def execute(index, item):
+        ordem.append(index)
+        time.sleep(0.02)
+        return {"item": item}
+
+    items = ["a", "b", "a", "c", "a"]
+    resultados = list(run_batch(items, execute, max_concurrency=3, group_key=lambda item: item))
+    assert sorted(r["index"] for r in resultados) == list(range(5))
+    assert [i for i in ordem if items[i] == "a"] == [0, 2, 4]
+    assert all(r["status"] == "success" and r["duration_ms"] >= 0 for r in resultados)
+    print("✅ Itens do mesmo grupo executam em sequência, na ordem do lote")
+
+
+def test_batch_endpoint_streams_ndjson_with_partial_failures():
+    app, estado = _client()
+    body = {
+        "inputs": [
+            _item("um"),
+            _item("falha"),
+            {"input": {"messages": []}},
+            _item("dois", thread_id="t-1"),
+            _item("três", thread_id="t-1"),
+            _item("quatro"),
+        ],
+        "max_concurrency": 2,
+    }
+    with app.test_client() as client:
+        resposta = client.post("/runs/batch", json=body)
+        linhas = [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+    assert resposta.status_code == 200 and resposta.headers["Content-Type"] == "application/x-ndjson"
+
+    itens = {linha["index"]: linha for linha in linhas if linha["type"] == "item"}
+    resumo = linhas[-1]
+    assert resumo["type"] == "summary" and resumo["total"] == 6
+    assert resumo["succeeded"] == 4 and resumo["failed"] == 2
+    assert itens[1]["status"] == "error" and "erro no agente" in itens[1]["error"] and itens[1]["run_id"]
+    assert itens[2]["status"] == "error"
+    assert itens[0]["values"]["messages"][-1]["content"] == "eco: um"
+    # Segundo item da thread t-1 vê o histórico do primeiro
+    assert [m["content"] for m in itens[4]["values"]["messages"]] == ["dois", "eco: dois", "três", "eco: três"]
+    assert estado["max_ativos"] <= 2
+    assert langgraph_server._run_registry.get(itens[4]["run_id"], "t-1")["status"] == "success"
+    print("✅ /runs/batch transmite NDJSON por item, com falhas parciais e resumo")
+
+
+def test_thread_busy_goes_through_run_manager_admission():
+    app, _ = _client()
+    liberar = threading.Event()
+
+    def run_lento():
+        liberar.wait(5)
+        yield "id: 0\nevent: end\ndata: {}\n\n"
+
+    ocupante = langgraph_server._run_manager.submit("run-lento", run_lento(), thread_id="t-ocupada")
+    try:
+        with app.test_client() as client:
+            resposta = client.post("/runs/batch", json={"inputs": [_item("x", thread_id="t-ocupada")]})
+            item = json.loads(resposta.get_data(as_text=True).splitlines()[0])
+            assert item["status"] == "error" and "t-ocupada" in item["error"]
+            assert client.post("/threads/t-ocupada", json=_item("y")).status_code == 409
+            assert client.post("/threads/t-ocupada", json={**_item("y"), "multitask_strategy": "x"}).status_code == 400
+            enfileirado = {}
+            fila = threading.Thread(target=lambda: enfileirado.update(resposta=app.test_client().post(
+                "/runs/batch", json={"inputs": [_item("z", thread_id="t-ocupada")], "multitask_strategy": "enqueue"})))
+            fila.start()
+            time.sleep(0.2)
+            assert fila.is_alive()  # aguarda o run em andamento na thread
+            liberar.set()
+            fila.join(5)
+            item = json.loads(enfileirado["resposta"].get_data(as_text=True).splitlines()[0])
+            assert item["status"] == "success"
+    finally:
+        liberar.set()
+        ocupante.done.wait(5)
+    print("✅ Itens do lote e POST /threads/<id> respeitam a admissão por thread do RunManager")
+
+
+def test_batch_endpoint_rejects_invalid_body():
+    app, _ = _client()
+    with app.test_client() as client:
+        assert client.post("/runs/batch", json={"inputs": []}).status_code == 400
+        assert client.post("/runs/batch", json={"inputs": [_item("x")], "max_concurrency": "x"}).status_code == 400
+    print("✅ Lote vazio ou max_concurrency inválido responde 400")
+
+
+if __name__ == "__main__":
+    test_run_batch_groups_items_sequentially()
+    test_batch_endpoint_streams_ndjson_with_partial_failures()
+    test_thread_busy_goes_through_run_manager_admission()
+    test_batch_endpoint_rejects_invalid_body()
+    print("\nTodos os testes de /runs/batch passaram.")
@@ -0,0 +1,72 @@
+"""
+Script para testar os limites do checkpointer em memória (LRU, checkpoints por thread, bytes).
+Não depende de servidor nem de OpenAI: usa um grafo local com modelo fake.
+
+Uso: python test_bounded_memory_saver.py  (ou pytest test_bounded_memory_saver.py)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.services.bounded_memory_saver import BoundedMemorySaver
+
+
+def _build_graph(checkpointer):
+    def agent(state):
+        return {"messages": [AIMessage(content="x" * 200)]}
+
+    return (
+        StateGraph(MessagesState)
+        .add_node("agent", agent)
+        .add_edge(START, "agent")
+        .add_edge("agent", END)
+        .compile(checkpointer=checkpointer)
+    )
+
+
+def test_checkpoint_cap_keeps_first_and_latest():
+    saver = BoundedMemorySaver(max_threads=10, max_checkpoints_per_thread=4)
+    graph = _build_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(10):
+        graph.invoke({"messages": [HumanMessage(content=f"pergunta {i}")]}, config)
+
+    checkpoints = saver.storage["t1"][""]
+    assert len(checkpoints) == 5
+    history = list(graph.get_state_history(config))
+    assert history[-1].config["configurable"]["checkpoint_id"] == min(checkpoints)
+    # Estado mais recente continua completo (blobs ainda referenciados não são removidos)
+    assert len(graph.get_state(config).values["messages"]) == 20
+    assert saver.metrics()["checkpoints_pruned"] > 0
+    print("✅ Limite de checkpoints por thread")
+
+
+def test_lru_and_byte_budget_evict_idle_threads():
+    saver = BoundedMemorySaver(max_threads=3, max_checkpoints_per_thread=4)
+    graph = _build_graph(saver)
+    for i in range(5):
+        graph.invoke({"messages": [HumanMessage(content="oi")]}, {"configurable": {"thread_id": f"t{i}"}})
+    assert set(saver.storage) == {"t2", "t3", "t4"}
+    assert saver.metrics()["threads_evicted_lru"] == 2
+
+    per_thread = saver.metrics()["bytes"] // 3
+    saver.max_bytes = per_thread * 2
+    graph.get_state({"configurable": {"thread_id": "t2"}})  # t2 passa a ser a mais recente entre as lidas
+    graph.invoke({"messages": [HumanMessage(content="oi")]}, {"configurable": {"thread_id": "t5"}})
+    metrics = saver.metrics()
+    assert metrics["bytes"] <= saver.max_bytes
+    assert "t5" in saver.storage and "t3" not in saver.storage
+    assert metrics["threads_evicted_bytes"] >= 1
+
+    saver.delete_thread("t5")
+    assert saver.metrics()["bytes"] == sum(saver._thread_bytes.values())
+    print("✅ Evicção por LRU e por orçamento de bytes")
+
+
+if __name__ == "__main__":
+    test_checkpoint_cap_keeps_first_and_latest()
+    test_lru_and_byte_budget_evict_idle_threads()
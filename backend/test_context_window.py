@@ -0,0 +1,84 @@
+"""
+Script para testar a janela de contexto do backend (resumo incremental e
+corte da janela em context_start). Não depende de servidor nem de OpenAI.
+
+Uso: python test_context_window.py  (ou pytest test_context_window.py)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app.services.context_window import (
+    ContextWindowSettings,
+    build_prompt_messages,
+    update_context,
+)
+
+
+def _thread(turnos, tool_chars=4000):
+    msgs = []
+    for i in range(turnos):
+        call_id = f"call_{i}"
+        msgs += [
+            HumanMessage(content=f"pergunta {i}"),
+            AIMessage(content="", tool_calls=[{"name": "obter_carteira", "args": {}, "id": call_id}]),
+            ToolMessage(content="x" * tool_chars, tool_call_id=call_id, name="obter_carteira"),
+            AIMessage(content=f"resposta {i}"),
+        ]
+    return msgs + [HumanMessage(content="pergunta atual")]
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append(str(messages[-1].content))
+        return AIMessage(content=f"resumo {len(self.prompts)}")
+
+
+def test_summary_accumulates_and_window_is_trimmed():
+    """Ao estourar o orçamento o início anda, as mensagens que saíram viram resumo e o prompt começa em context_start."""
+    settings = ContextWindowSettings(max_tokens=1000, tool_output_max_chars=200)
+    model = FakeSummarizer()
+    state = {"messages": _thread(20)}
+
+    update = update_context(state, model, settings)
+    start = update["context_start"]
+    assert start > 0 and isinstance(state["messages"][start], HumanMessage)
+    assert update["context_summary"] == "resumo 1"
+    assert "pergunta 0" in model.prompts[0]
+    state.update(update)
+
+    prompt = build_prompt_messages("SYSTEM", state, settings)
+    assert isinstance(prompt[0], SystemMessage) and "resumo 1" in prompt[0].content
+    assert prompt[1].content == state["messages"][start].content
+    assert len(prompt) == 1 + len(state["messages"]) - start
+    print("✅ Resumo gerado e janela cortada em context_start")
+
+    # Janela ainda cabe: nem o início nem o resumo mudam
+    assert update_context(state, model, settings) == {}
+    assert len(model.prompts) == 1
+
+    # Thread cresce de novo: o resumo anterior entra no prompt do novo resumo
+    state["messages"] = state["messages"] + _thread(20)[:-1]
+    update = update_context(state, model, settings)
+    assert update["context_start"] > start and update["context_summary"] == "resumo 2"
+    assert "resumo 1" in model.prompts[1]
+    print("✅ Resumo incremental só é refeito quando a janela enche de novo")
+
+
+def test_disabled_settings_send_full_history():
+    settings = ContextWindowSettings(max_tokens=0)
+    msgs = _thread(2)
+    assert build_prompt_messages("S", {"messages": msgs}, settings)[1:] == msgs
+    assert update_context({"messages": msgs}, FakeSummarizer(), settings) == {}
+    print("✅ CONTEXT_MAX_TOKENS=0 envia o histórico completo")
+
+
+if __name__ == "__main__":
+    test_summary_accumulates_and_window_is_trimmed()
+    test_disabled_settings_send_full_history()
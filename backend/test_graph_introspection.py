@@ -0,0 +1,105 @@
+"""
+Script para testar a introspecção do grafo (GET /assistants/agent/graph, /schemas, /subgraphs).
+Não depende de OpenAI: registra o blueprint num Flask local com grafos fake.
+
+Uso: python test_graph_introspection.py  (ou pytest test_graph_introspection.py)
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+
+from flask import Flask
+from langchain_core.messages import AIMessage
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+
+
+def _grafo(com_handoff=True):
+    def agent(state):
+        return {"messages": [AIMessage(content="ok")]}
+
+    revisor = StateGraph(MessagesState).add_node("revisar", agent).add_edge(START, "revisar").compile()
+    builder = StateGraph(MessagesState).add_node("agent", agent).add_node("revisor", revisor)
+    builder.add_edge(START, "agent").add_edge("revisor", END)
+    if com_handoff:
+        builder.add_node("handoff", agent).add_edge("handoff", END)
+        builder.add_conditional_edges("agent", lambda state: "revisor", ["revisor", "handoff"])
+    else:
+        builder.add_edge("agent", "revisor")
+    return builder.compile()
+
+
+def _client(graph):
+    langgraph_server._graph = graph
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    return app.test_client()
+
+
+def test_graph_is_derived_from_compiled_graph_with_etag():
+    client = _client(_grafo())
+    resposta = client.get("/assistants/agent/graph")
+    assert resposta.status_code == 200
+    nos = {no["id"] for no in resposta.json["nodes"]}
+    assert {"agent", "revisor", "handoff"} <= nos and "init" not in nos
+    assert any(aresta.get("conditional") for aresta in resposta.json["edges"])
+
+    etag = resposta.headers["ETag"]
+    assert client.get("/assistants/agent/graph", headers={"If-None-Match": etag}).status_code == 304
+
+    xray = client.get("/assistants/agent/graph?xray=true").json
+    assert any("revisar" in no["id"] for no in xray["nodes"])
+    mermaid = client.get("/assistants/agent/graph?format=mermaid")
+    assert mermaid.mimetype == "text/plain" and "handoff" in mermaid.get_data(as_text=True)
+    print("✅ Grafo derivado do grafo compilado, com ETag/304, xray e mermaid")
+
+
+def test_schemas_and_subgraphs():
+    client = _client(_grafo())
+    schemas = client.get("/assistants/agent/schemas")
+    assert schemas.status_code == 200 and "messages" in schemas.json["input_schema"]["properties"]
+    assert "messages" in schemas.json["state_schema"]["properties"]
+    assert client.get("/assistants/agent/schemas", headers={"If-None-Match": schemas.headers["ETag"]}).status_code == 304
+
+    subgrafos = client.get("/assistants/agent/subgraphs").json
+    assert list(subgrafos) == ["revisor"] and subgrafos["revisor"]["graph_id"] == "agent"
+    assert client.get("/assistants/outro/subgraphs").status_code == 404
+    print("✅ Schemas e subgrafos derivados do grafo compilado")
+
+
+def test_reload_invalidates_cache():
+    client = _client(_grafo())
+    etag_antes = client.get("/assistants/agent/graph").headers["ETag"]
+    assert langgraph_server.get_graph_introspection() is langgraph_server.get_graph_introspection()
+
+    langgraph_server._graph = _grafo(com_handoff=False)
+    resposta = client.get("/assistants/agent/graph", headers={"If-None-Match": etag_antes})
+    assert resposta.status_code == 200 and resposta.headers["ETag"] != etag_antes
+    assert "handoff" not in {no["id"] for no in resposta.json["nodes"]}
+    print("✅ Recarregar o grafo invalida o cache e muda o ETag")
+
+
+def test_query_params_do_not_grow_cache():
+    client = _client(_grafo())
+    completo = client.get("/assistants/agent/graph?xray=true").headers["ETag"]
+    for valor in ["999999", "123456789", "-3", "8", "50"]:
+        assert client.get(f"/assistants/agent/graph?xray={valor}").status_code == 200
+    for i in range(20):
+        client.get(f"/assistants/agent/subgraphs/ns-{i}")
+    introspection = langgraph_server.get_graph_introspection()
+    # xray >= MAX_XRAY_DEPTH equivale a true; negativo a false; namespaces inexistentes não são guardados
+    assert client.get("/assistants/agent/graph?xray=999999").headers["ETag"] == completo
+    assert len(introspection._cache) <= 5
+    print("✅ xray é normalizado e namespaces inexistentes não crescem o cache")
+
+
+if __name__ == "__main__":
+    test_graph_is_derived_from_compiled_graph_with_etag()
+    test_schemas_and_subgraphs()
+    test_reload_invalidates_cache()
+    test_query_params_do_not_grow_cache()
+    print("\nTodos os testes de introspecção do grafo passaram.")
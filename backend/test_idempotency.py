@@ -0,0 +1,131 @@
+"""
+Script para testar o header Idempotency-Key (POST /runs/wait e /threads/<id>/runs/stream).
+Não depende de OpenAI: registra o blueprint num Flask local com um grafo fake.
+
+Uso: python test_idempotency.py  (ou pytest test_idempotency.py)
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+
+from flask import Flask
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+from app.services.idempotency import IdempotencyConflict, IdempotencyStore
+
+
+def _client(checkpointer=None):
+    chamadas = []
+    lock = threading.Lock()
+
+    def agent(state):
+        with lock:
+            chamadas.append(1)
+        time.sleep(0.2)
+        return {"messages": [AIMessage(content=f"resposta {len(chamadas)}")]}
+
+    langgraph_server._graph = (
+        StateGraph(MessagesState).add_node("agent", agent).add_edge(START, "agent").add_edge("agent", END)
+        .compile(checkpointer=checkpointer)
+    )
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    return app, chamadas
+
+
+def test_store_conflict_and_release():
+    store = IdempotencyStore(ttl_seconds=60, max_keys=2)
+    entry, owner = store.begin("k", "a")
+    assert owner and store.begin("k", "a") == (entry, False)
+    try:
+        store.begin("k", "b")
+        assert False, "corpo diferente deveria dar conflito"
+    except IdempotencyConflict:
+        pass
+    store.release("k", entry)
+    assert store.begin("k", "a")[1] is True
+    print("✅ Conflito de corpo e liberação da chave")
+
+
+def test_concurrent_duplicate_waits_execute_graph_once():
+    app, chamadas = _client()
+    body = {"input": {"messages": [{"role": "user", "content": "oi"}]}}
+
+    def chamar(_):
+        with app.test_client() as client:
+            return client.post("/runs/wait", json=body, headers={"Idempotency-Key": "wait-1"})
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        respostas = list(pool.map(chamar, range(5)))
+    assert len(chamadas) == 1
+    assert len({r.json["run_id"] for r in respostas}) == 1 and all(r.status_code == 200 for r in respostas)
+    assert sum(r.headers.get("Idempotent-Replayed") == "true" for r in respostas) == 4
+    print("✅ /runs/wait concorrente com a mesma chave executa o grafo uma vez")
+
+
+def test_concurrent_duplicate_streams_attach_to_same_run():
+    app, chamadas = _client(InMemorySaver())
+    body = {"input": {"messages": [{"role": "user", "content": "oi"}]}, "stream_mode": "updates"}
+
+    def chamar(_):
+        with app.test_client() as client:
+            resposta = client.post("/threads/t-idem/runs/stream", json=body, headers={"Idempotency-Key": "stream-1"})
+            return resposta.headers["X-Run-ID"], resposta.get_data(as_text=True)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        resultados = list(pool.map(chamar, range(4)))
+    assert len(chamadas) == 1
+    assert len({run_id for run_id, _ in resultados}) == 1
+    assert len({texto for _, texto in resultados}) == 1 and "run_end" in resultados[0][1]
+    print("✅ Streams repetidos acompanham o mesmo run")
+
+
+def test_errors_release_key_and_callers_are_isolated():
+    app, chamadas = _client(InMemorySaver())
+    liberar = threading.Event()
+
+    def run_lento():
+        liberar.wait(5)
+        yield "id: 0\nevent: end\ndata: {}\n\n"
+
+    body = {"input": {"messages": [{"role": "user", "content": "oi"}]}}
+    ocupante = langgraph_server._run_manager.submit("run-ocupante", run_lento(), thread_id="t-idem-409")
+    with app.test_client() as client:
+        try:
+            ocupada = client.post("/threads", json={**body, "thread_id": "t-idem-409"}, headers={"Idempotency-Key": "k-409"})
+            assert ocupada.status_code == 409
+        finally:
+            liberar.set()
+            ocupante.done.wait(5)
+        # O 409 não foi guardado: a repetição executa de verdade
+        repetida = client.post("/threads", json={**body, "thread_id": "t-idem-409"}, headers={"Idempotency-Key": "k-409"})
+        assert repetida.status_code == 200 and "Idempotent-Replayed" not in repetida.headers
+        assert len(chamadas) == 1
+
+        # Mesma chave e corpo de outro usuário: executa de novo em vez de devolver a resposta alheia
+        def corpo(user_id):
+            return {**body, "config": {"configurable": {"user_id": user_id}}}
+
+        ana = client.post("/runs/wait", json=corpo("ana"), headers={"Idempotency-Key": "k-user"})
+        bia = client.post("/runs/wait", json=corpo("bia"), headers={"Idempotency-Key": "k-user"})
+        ana_de_novo = client.post("/runs/wait", json=corpo("ana"), headers={"Idempotency-Key": "k-user"})
+    assert "Idempotent-Replayed" not in bia.headers and bia.json["run_id"] != ana.json["run_id"]
+    assert ana_de_novo.headers["Idempotent-Replayed"] == "true" and ana_de_novo.json["run_id"] == ana.json["run_id"]
+    print("✅ Erros liberam a chave e cada chamador tem suas próprias chaves")
+
+
+if __name__ == "__main__":
+    test_store_conflict_and_release()
+    test_concurrent_duplicate_waits_execute_graph_once()
+    test_concurrent_duplicate_streams_attach_to_same_run()
+    test_errors_release_key_and_callers_are_isolated()
@@ -0,0 +1,163 @@
+"""
+Script para testar o GET /metrics: latência por rota, duração dos nós, LLM (latência e tokens),
+tools, runs em andamento e a soma dos snapshots de vários workers.
+Não depende de OpenAI: usa um modelo fake num grafo registrado num Flask local.
+
+Uso: python test_metrics.py  (ou pytest test_metrics.py)
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from flask import Flask
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+from app.routes.metrics import metrics_bp
+from app.services import metrics
+from app.services.metrics import MetricsRegistry
+
+
+@tool
+def consultar_carteira(cliente: str) -> str:
+    """Consulta a carteira do cliente."""
+    return f"carteira de {cliente}"
+
+
+def _grafo():
+    modelo = GenericFakeChatModel(messages=iter([
+        AIMessage(content="resposta", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+    ] * 10))
+
+    def agent(state):
+        return {"messages": [modelo.invoke(state["messages"])]}
+
+    def tools(state):
+        consultar_carteira.invoke({"cliente": "ana"})
+        return {}
+
+    return (
+        StateGraph(MessagesState).add_node("agent", agent).add_node("tools", tools)
+        .add_edge(START, "agent").add_edge("agent", "tools").add_edge("tools", END)
+        .compile(checkpointer=InMemorySaver())
+    )
+
+
+def _app():
+    langgraph_server._graph = _grafo()
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    app.register_blueprint(metrics_bp)
+    metrics.init_app(app)
+    return app
+
+
+def _valor(texto, prefixo):
+    linhas = [linha for linha in texto.splitlines() if linha.startswith(prefixo)]
+    assert linhas, f"métrica ausente: {prefixo}"
+    return float(linhas[0].rsplit(" ", 1)[1])
+
+
+def test_metrics_endpoint_exposes_run_metrics():
+    app = _app()
+    with app.test_client() as client:
+        resposta = client.post("/runs/wait", json={"input": {"messages": [{"role": "user", "content": "oi"}]}})
+        assert resposta.status_code == 200
+        texto = client.get("/metrics").get_data(as_text=True)
+    assert _valor(texto, 'http_request_duration_seconds_count{method="POST",route="/runs/wait",status="200"}') >= 1
+    assert _valor(texto, 'langgraph_node_duration_seconds_count{node="agent",status="success"}') >= 1
+    assert _valor(texto, 'langgraph_node_duration_seconds_count{node="tools",status="success"}') >= 1
+    assert _valor(texto, 'llm_request_duration_seconds_count{model=') >= 1
+    assert 'purpose="agent"' in texto
+    assert _valor(texto, 'llm_tokens_total{model=') > 0
+    assert _valor(texto, 'tool_duration_seconds_count{status="success",tool="consultar_carteira"}') >= 1
+    assert "# TYPE langgraph_runs_in_flight gauge" in texto and "# TYPE sse_connections gauge" in texto
+    print("✅ /metrics expõe latência por rota, nós, LLM, tokens e tools")
+
+
+def test_thread_endpoints_produce_run_metrics():
+    app = _app()
+    mensagem = {"input": {"messages": [{"role": "user", "content": "oi"}]}}
+    with app.test_client() as client:
+        antes = client.get("/metrics").get_data(as_text=True)
+        assert client.post("/threads/t-metricas", json=mensagem).status_code == 200
+        texto = client.get("/metrics").get_data(as_text=True)
+
+    def contagem(texto, prefixo):
+        return _valor(texto, prefixo) if prefixo in texto else 0
+
+    for prefixo in ('langgraph_node_duration_seconds_count{node="agent",status="success"}',
+                    'tool_duration_seconds_count{status="success",tool="consultar_carteira"}',
+                    'llm_request_duration_seconds_count{model='):
+        assert contagem(texto, prefixo) == contagem(antes, prefixo) + 1, prefixo
+    print("✅ POST /threads/<id> também gera métricas de nós, LLM e tools")
+
+
+def test_histogram_buckets_are_cumulative():
+    registro = MetricsRegistry(directory=None)
+    registro.describe("latencia", "histogram", "teste", buckets=(0.1, 1.0))
+    for valor in (0.05, 0.5, 0.5, 3.0):
+        registro.observe("latencia", valor, {"rota": "/x"})
+    texto = registro.render()
+    assert 'latencia_bucket{rota="/x",le="0.1"} 1' in texto
+    assert 'latencia_bucket{rota="/x",le="1.0"} 3' in texto
+    assert 'latencia_bucket{rota="/x",le="+Inf"} 4' in texto
+    assert 'latencia_count{rota="/x"} 4' in texto
+    print("✅ Buckets acumulados no formato do Prometheus")
+
+
+def test_snapshots_from_other_workers_are_summed():
+    diretorio = tempfile.mkdtemp()
+    registro = MetricsRegistry(directory=diretorio)
+    registro.describe("pedidos_total", "counter", "teste")
+    registro.describe("abertos", "gauge", "teste")
+    registro.inc("pedidos_total", {"rota": "/x"}, 2)
+    registro.gauge_add("abertos", 1)
+    # Worker vivo (pid 1 sempre existe) e worker morto: contadores somam, gauge só do vivo
+    for pid in (1, 999999999):
+        with open(os.path.join(diretorio, f"metrics-{pid}.json"), "w") as f:
+            json.dump({"pid": pid, "counters": [["pedidos_total", [["rota", "/x"]], 3]],
+                       "histograms": [], "gauges": [["abertos", [], 5]]}, f)
+    texto = registro.render()
+    assert 'pedidos_total{rota="/x"} 8.0' in texto
+    assert "abertos 6.0" in texto
+    registro.clear_directory()
+    assert os.listdir(diretorio) == []
+    print("✅ /metrics soma os snapshots dos workers (gauges só de processos vivos)")
+
+
+def test_dead_worker_snapshot_is_archived():
+    diretorio = tempfile.mkdtemp()
+    registro = MetricsRegistry(directory=diretorio)
+    registro.describe("pedidos_total", "counter", "teste")
+    registro.describe("latencia", "histogram", "teste", buckets=(1.0,))
+    for pid in (4242, 4243):
+        with open(os.path.join(diretorio, f"metrics-{pid}.json"), "w") as f:
+            json.dump({"pid": pid, "counters": [["pedidos_total", [], 2]],
+                       "histograms": [["latencia", [], [1, 0], 0.5, 1]], "gauges": [["abertos", [], 5]]}, f)
+        registro.mark_process_dead(pid)  # child_exit do gunicorn
+    assert sorted(os.listdir(diretorio)) == ["metrics-dead.json"]
+    texto = registro.render()
+    assert "pedidos_total 4.0" in texto and "latencia_count 2" in texto and "abertos" not in texto
+    registro.mark_process_dead(4244)  # sem snapshot: nada muda
+    assert "pedidos_total 4.0" in registro.render()
+    print("✅ Snapshot de worker encerrado vai para metrics-dead.json (contadores preservados, sem gauges)")
+
+
+if __name__ == "__main__":
+    test_metrics_endpoint_exposes_run_metrics()
+    test_histogram_buckets_are_cumulative()
+    test_snapshots_from_other_workers_are_summed()
+    test_dead_worker_snapshot_is_archived()
+    test_thread_endpoints_produce_run_metrics()
+    print("\nTodos os testes de métricas passaram.")
@@ -0,0 +1,88 @@
+"""
+Script para testar o armazenamento de eventos de runs resumíveis (replay com Last-Event-ID).
+Não depende de servidor nem de OpenAI.
+
+Uso: python test_run_event_store.py  (ou pytest test_run_event_store.py)
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.run_event_store import RunEventStore
+
+
+def _event(i):
+    return f"id: {i}\nevent: state_update\ndata: {{\"n\": {i}}}\n\n"
+
+
+def test_replay_from_last_event_id_then_tail():
+    """Replay a partir do Last-Event-ID (inclusive o que foi para o spill) e depois eventos ao vivo."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunEventStore(max_events=3, ttl_seconds=60, spill_dir=tmp)
+        buffer = store.create("run-1", "thread-1")
+        for i in range(4):
+            buffer.append(i, _event(i))
+        spill = buffer._spill_file
+        buffer.append(4, _event(4))
+        assert buffer._spill_file is spill and not spill.closed  # um handle por run, não um open por evento
+        assert [e[0] for e in buffer.events_after(0)] == [1, 2, 3, 4]
+
+        def produzir():
+            for i in range(5, 8):
+                time.sleep(0.01)
+                buffer.append(i, _event(i))
+            buffer.finish()
+
+        threading.Thread(target=produzir).start()
+        recebidos = list(store.get("run-1").tail(last_event_id=2, poll_seconds=1))
+        assert recebidos == [_event(i) for i in range(3, 8)]
+        assert list(buffer.tail(last_event_id=7)) == []
+        assert buffer._spill_file is None and spill.closed  # fechado no fim do run
+        print("✅ Replay com Last-Event-ID seguido dos eventos ao vivo")
+
+
+def test_slow_subscriber_without_spill_loses_nothing():
+    """Sem spill, o buffer não descarta o que um inscrito ao vivo ainda não leu; o corte fica para depois do fim."""
+    store = RunEventStore(max_events=1000, ttl_seconds=60)
+    buffer = store.create("run-lento")
+    buffer.append(0, _event(0))
+    inscrito = buffer.tail(-1, poll_seconds=1)
+    assert next(inscrito) == _event(0)
+    for i in range(1, 2500):
+        buffer.append(i, _event(i))
+    buffer.finish()
+    assert len(buffer._events) == 2500  # o inscrito ainda está no evento 0
+    assert list(inscrito) == [_event(i) for i in range(1, 2500)]
+    assert [e[0] for e in buffer.events_after(-1)] == list(range(1500, 2500))  # cortado ao sair o último inscrito
+
+    # Replay anterior ao que sobrou: erro explícito em vez de pular eventos
+    perdido = list(buffer.tail(-1))
+    assert len(perdido) == 1 and perdido[0].startswith("event: error\n") and '"events_lost"' in perdido[0]
+    assert '"first_available_id": 1500' in perdido[0]
+    assert list(buffer.tail(2497)) == [_event(2498), _event(2499)]
+    print("✅ Inscrito lento recebe todos os eventos; replay de eventos descartados avisa a perda")
+
+def test_finished_runs_expire_after_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunEventStore(max_events=1, ttl_seconds=10, spill_dir=tmp)
+        ativo, finalizado = store.create("ativo"), store.create("finalizado")
+        for i in range(3):
+            finalizado.append(i, _event(i))
+        finalizado.finish()
+        assert os.path.exists(finalizado.spill_path)
+
+        assert store.cleanup(now=time.time() + 5) == 0
+        assert store.cleanup(now=time.time() + 20) == 1
+        assert store.get("finalizado") is None and store.get("ativo") is ativo
+        assert not os.path.exists(finalizado.spill_path)
+        print("✅ Runs finalizados expiram pelo TTL")
+
+
+if __name__ == "__main__":
+    test_replay_from_last_event_id_then_tail()
+    test_slow_subscriber_without_spill_loses_nothing()
+    test_finished_runs_expire_after_ttl()
@@ -0,0 +1,100 @@
+"""
+Script para testar o executor de runs em background (RunManager).
+Não depende de servidor nem de OpenAI.
+
+Uso: python test_run_manager.py  (ou pytest test_run_manager.py)
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.run_manager import RunManager, RunQueueFull, ThreadBusy
+
+
+def _eventos(n, pausa=0.0, falhar=False):
+    for i in range(n):
+        time.sleep(pausa)
+        yield f"id: {i}\nevent: state_update\ndata: {{}}\n\n"
+    if falhar:
+        raise RuntimeError("falhou")
+
+
+def _event_id(text):
+    return int(text.split("\n", 1)[0][4:])
+
+
+def test_lifecycle_success_and_error():
+    manager = RunManager(max_workers=2, max_queue=4)
+    historico = []
+    manager.add_listener(lambda run: historico.append((run.run_id, run.status)))
+
+    ok = manager.submit("ok", _eventos(3), thread_id="t1", event_id=_event_id)
+    erro = manager.submit("erro", _eventos(1, falhar=True), event_id=_event_id)
+    assert len(list(manager.subscribe(ok))) == 3
+    assert ok.done.wait(5) and erro.done.wait(5)
+
+    assert [s for r, s in historico if r == "ok"] == ["pending", "running", "success"]
+    assert erro.status == "error" and erro.error == "falhou"
+    assert manager.get("ok").thread_id == "t1"
+    print("✅ Ciclo de vida pending → running → success/error")
+
+
+def test_cancel_on_disconnect_and_queue_limit():
+    manager = RunManager(max_workers=1, max_queue=1)
+    run = manager.submit("longo", _eventos(50, pausa=0.02), event_id=_event_id)
+    manager.submit("na-fila", _eventos(1), event_id=_event_id)
+    try:
+        manager.submit("rejeitado", _eventos(1), event_id=_event_id)
+        assert False, "deveria rejeitar com a fila cheia"
+    except RunQueueFull:
+        pass
+
+    stream = manager.subscribe(run, on_disconnect="cancel")
+    next(stream)
+    stream.close()  # cliente desconectou
+    assert run.done.wait(5)
+    assert run.status == "interrupted" and run.buffer.last_event_id < 49
+    assert manager.get("na-fila").done.wait(5)
+    assert manager.metrics()["rejected"] == 1
+    print("✅ Cancelamento ao desconectar e limite da fila")
+
+
+def test_multitask_strategies_serialize_runs_per_thread():
+    """reject/enqueue/interrupt: nunca dois runs da mesma thread executando ao mesmo tempo."""
+    manager = RunManager(max_workers=4, max_queue=10)
+    ativos, maximo = [], []
+
+    def eventos(n):
+        ativos.append(1)
+        maximo.append(len(ativos))
+        try:
+            yield from _eventos(n, pausa=0.01)
+        finally:
+            ativos.pop()
+
+    primeiro = manager.submit("r1", eventos(10), thread_id="t1", event_id=_event_id)
+    try:
+        manager.submit("r2", eventos(1), thread_id="t1", event_id=_event_id)
+        assert False, "reject deveria recusar o segundo run"
+    except ThreadBusy:
+        pass
+    enfileirado = manager.submit("r3", eventos(2), thread_id="t1", event_id=_event_id, multitask_strategy="enqueue")
+    outra_thread = manager.submit("r4", eventos(1), thread_id="t2", event_id=_event_id)
+    assert enfileirado.status == "pending"
+    assert outra_thread.done.wait(5) and not primeiro.done.is_set()
+
+    novo = manager.submit("r5", eventos(1), thread_id="t1", event_id=_event_id, multitask_strategy="interrupt")
+    assert novo.done.wait(5)
+    assert primeiro.status == "interrupted" and enfileirado.status == "interrupted"
+    assert novo.status == "success" and max(maximo) <= 2  # t1 e t2 em paralelo, nunca dois de t1
+    assert manager.active_runs("t1") == []
+    assert manager.metrics()["conflicts"] == {"reject": 1, "enqueue": 1, "interrupt": 1, "rollback": 0}
+    print("✅ multitask_strategy reject/enqueue/interrupt por thread")
+
+
+if __name__ == "__main__":
+    test_lifecycle_success_and_error()
+    test_cancel_on_disconnect_and_queue_limit()
+    test_multitask_strategies_serialize_runs_per_thread()
@@ -0,0 +1,117 @@
+"""
+Script para testar o registro de runs (list_thread_runs / get_thread_run).
+Não depende de servidor nem de OpenAI.
+
+Uso: python test_run_registry.py  (ou pytest test_run_registry.py)
+"""
+import os
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+
+from flask import Flask
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.services.run_registry import RunRegistry
+
+
+def test_lifecycle_usage_and_pagination():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = RunRegistry(os.path.join(tmp, "runs.sqlite"))
+        for i in range(5):
+            registry.create(f"r{i}", "t1", "agent", {"n": i})
+        registry.create("outra", "t2", "agent")
+
+        handler = registry.track_usage("r4")
+        message = AIMessage(content="ok", usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15},
+                            response_metadata={"model_name": "fake"})
+        handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=uuid4())
+        registry.update_status("r4", "running")
+        registry.update_status("r4", "success")
+        registry.update_status("r3", "error", "falhou")
+
+        run = registry.get("r4", thread_id="t1")
+        assert run["status"] == "success" and run["started_at"] and run["ended_at"]
+        assert run["duration_ms"] >= 0 and run["usage"]["total_tokens"] == 15
+        assert registry.get("r4", thread_id="t2") is None
+        assert registry.get("r3")["error"] == "falhou" and registry.get("r3")["usage"] is None
+
+        assert [r["run_id"] for r in registry.list_thread_runs("t1", limit=2)] == ["r4", "r3"]
+        assert [r["run_id"] for r in registry.list_thread_runs("t1", limit=2, offset=2)] == ["r2", "r1"]
+        assert [r["run_id"] for r in registry.list_thread_runs("t1", status="pending")] == ["r2", "r1", "r0"]
+        assert registry.list_thread_runs("t1")[0]["metadata"] == {"n": 4}
+
+        plano = registry._execute(
+            "EXPLAIN QUERY PLAN SELECT run_id FROM runs WHERE thread_id = ? AND status = ? "
+            "ORDER BY created_at DESC LIMIT 10", ("t1", "pending"))
+        assert "idx_runs_thread_status_created" in str(plano)
+        print("✅ Registro de runs com status, tokens e paginação indexada")
+
+
+def test_duration_from_start_and_stale_recovery():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "runs.sqlite")
+        registry = RunRegistry(path)
+        registry.create("fila", "t1", "agent")
+        time.sleep(0.3)  # tempo na fila não entra na duração
+        registry.update_status("fila", "running")
+        registry.update_status("fila", "success")
+        assert registry.get("fila")["duration_ms"] < 300
+        registry.create("nunca", "t1", "agent")
+        registry.update_status("nunca", "error", "fila cheia")
+        assert registry.get("nunca")["duration_ms"] is None
+
+        registry.create("orfao", "t1", "agent")
+        registry.update_status("orfao", "running")
+        registry._execute("UPDATE runs SET pid = ? WHERE run_id = ?", (2 ** 22 + 12345, "orfao"))
+        registry.create("vivo", "t1", "agent")
+        registry._execute("UPDATE runs SET pid = ? WHERE run_id = ?", (os.getppid(), "vivo"))
+
+        reiniciado = RunRegistry(path)
+        assert reiniciado.recover_stale() == 1
+        orfao = reiniciado.get("orfao")
+        assert orfao["status"] == "interrupted" and orfao["ended_at"] and orfao["error"]
+        assert reiniciado.get("vivo")["status"] == "pending"  # processo (outro worker) ainda existe
+        print("✅ duration_ms a partir de started_at e runs órfãos marcados como interrupted")
+
+
+def test_thread_endpoints_register_runs():
+    from app.routes import langgraph_server
+
+    langgraph_server._graph = (
+        StateGraph(MessagesState)
+        .add_node("agent", lambda state: {"messages": [AIMessage(content=f"eco: {state['messages'][-1].content}")]})
+        .add_edge(START, "agent").add_edge("agent", END)
+        .compile(checkpointer=InMemorySaver())
+    )
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    thread_id = str(uuid4())
+    mensagem = {"input": {"messages": [{"role": "user", "content": "oi"}]}}
+    with app.test_client() as client:
+        criada = client.post("/threads", json={"thread_id": thread_id, **mensagem})
+        atualizada = client.post(f"/threads/{thread_id}", json=mensagem)
+        stream = client.post(f"/threads/{thread_id}/stream", json=mensagem)
+        assert "[DONE]" in stream.get_data(as_text=True)
+        run_ids = [criada.headers["X-Run-ID"], atualizada.headers["X-Run-ID"], stream.headers["X-Run-ID"]]
+        langgraph_server._run_manager.get(run_ids[-1]).done.wait(5)
+        runs = client.get(f"/threads/{thread_id}/runs").get_json()
+    assert [run["run_id"] for run in runs] == run_ids[::-1]
+    assert {run["status"] for run in runs} == {"success"}
+    assert all(run["started_at"] and run["duration_ms"] is not None for run in runs)
+    print("✅ POST /threads, POST /threads/<id> e /threads/<id>/stream registram seus runs")
+
+
+if __name__ == "__main__":
+    test_lifecycle_usage_and_pagination()
+    test_duration_from_start_and_stale_recovery()
+    test_thread_endpoints_register_runs()
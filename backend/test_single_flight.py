@@ -0,0 +1,138 @@
+"""
+Script para testar a coalescência (single-flight) de POST /runs/wait idênticos.
+Não depende de OpenAI: registra o blueprint num Flask local com um grafo fake.
+
+Uso: python test_single_flight.py  (ou pytest test_single_flight.py)
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+
+from flask import Flask
+from langchain_core.messages import AIMessage
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+from app.services.run_manager import RunManager
+from app.services.single_flight import SingleFlight, coalesce_key
+
+
+def _client():
+    chamadas = []
+    lock = threading.Lock()
+
+    def agent(state):
+        with lock:
+            chamadas.append(1)
+        time.sleep(0.2)
+        return {"messages": [AIMessage(content=f"resposta {len(chamadas)}")]}
+
+    langgraph_server._graph = (
+        StateGraph(MessagesState).add_node("agent", agent).add_edge(START, "agent").add_edge("agent", END).compile()
+    )
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    return app, chamadas
+
+
+def test_coalesce_key_is_canonical():
+    a = coalesce_key("agent", {"messages": [{"role": "user", "content": "oi"}]},
+                     {"configurable": {"x": 1, "y": 2}, "callbacks": ["a"]})
+    b = coalesce_key("agent", {"messages": [{"content": "oi", "role": "user"}]},
+                     {"configurable": {"y": 2, "x": 1}, "metadata": {"run_id": "r"}})
+    assert a == b
+    assert a != coalesce_key("agent", {"messages": [{"role": "user", "content": "olá"}]}, {"configurable": {"x": 1, "y": 2}})
+    print("✅ Chave canônica ignora ordem de chaves, callbacks e metadata")
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight(result_ttl=60)
+    started = threading.Event()
+
+    def falha():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "k", falha)
+        started.wait()
+        follower = pool.submit(flight.do, "k", lambda: "não executa")
+        for future in (leader, follower):
+            try:
+                future.result()
+                assert False, "exceção deveria ser propagada"
+            except RuntimeError:
+                pass
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+    assert flight.do("k", lambda: "outro") == ("ok", True)
+    print("✅ Erros são compartilhados com quem espera e não ficam em cache")
+
+
+def test_concurrent_identical_waits_execute_graph_once():
+    app, chamadas = _client()
+    langgraph_server._single_flight = SingleFlight(result_ttl=0)
+    body = {"input": {"messages": [{"role": "user", "content": "oi"}]}}
+
+    def chamar(_):
+        with app.test_client() as client:
+            return client.post("/runs/wait", json=body)
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        respostas = list(pool.map(chamar, range(5)))
+    assert len(chamadas) == 1
+    assert all(r.status_code == 200 for r in respostas)
+    assert len({r.json["run_id"] for r in respostas}) == 1
+    assert sum(r.headers.get("X-Coalesced") == "true" for r in respostas) == 4
+
+    # Sem TTL, uma requisição posterior executa de novo
+    assert chamar(0).headers.get("X-Coalesced") is None and len(chamadas) == 2
+    print("✅ /runs/wait idênticos simultâneos executam o grafo uma vez")
+
+
+
+def test_wait_runs_in_pool_and_returns_503_when_full():
+    """/runs/wait passa pelo pool do RunManager: pool e fila cheios -> 503; depois o run aparece nas métricas."""
+    app, chamadas = _client()
+    langgraph_server._single_flight = SingleFlight(result_ttl=0)
+    original = langgraph_server._run_manager
+    langgraph_server._run_manager = manager = RunManager(max_workers=1, max_queue=1)
+    manager.add_listener(langgraph_server._run_registry.on_run_status)
+    liberar = threading.Event()
+
+    def run_lento():
+        liberar.wait(5)
+        yield "id: 0\nevent: end\ndata: {}\n\n"
+
+    try:
+        ocupantes = [manager.submit(f"run-lento-{i}", run_lento()) for i in range(2)]  # 1 executando + 1 na fila
+        body = {"input": {"messages": [{"role": "user", "content": "oi"}]}}
+        resposta = app.test_client().post("/runs/wait", json=body)
+        assert resposta.status_code == 503 and resposta.headers["Retry-After"] == "5"
+        assert chamadas == []
+        liberar.set()
+        for ocupante in ocupantes:
+            ocupante.done.wait(5)
+        resposta = app.test_client().post("/runs/wait", json=body)
+        assert resposta.status_code == 200 and len(chamadas) == 1
+        assert manager.get(resposta.json["run_id"]).status == "success"
+        assert manager.metrics()["runs"]["success"] == 3
+        assert langgraph_server._run_registry.get(resposta.json["run_id"])["status"] == "success"
+    finally:
+        liberar.set()
+        langgraph_server._run_manager = original
+    print("✅ /runs/wait executa no pool do RunManager e responde 503 com pool e fila cheios")
+
+if __name__ == "__main__":
+    test_coalesce_key_is_canonical()
+    test_errors_are_shared_and_not_cached()
+    test_concurrent_identical_waits_execute_graph_once()
+    test_wait_runs_in_pool_and_returns_503_when_full()
+    print("\nTodos os testes de coalescência passaram.")
@@ -0,0 +1,153 @@
+"""
+Script para testar o tracing local em spans: árvore requisição → grafo → nós → LLM/tool,
+exportação OTLP/JSON em arquivo com rotação e amostragem (taxa, requisições lentas, traceparent).
+Não depende de OpenAI: usa um modelo fake num grafo registrado num Flask local.
+
+Uso: python test_span_tracer.py  (ou pytest test_span_tracer.py)
+"""
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from flask import Flask
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+from app.services import span_tracer
+from app.services.span_tracer import SpanTracer
+
+
+@tool
+def consultar_carteira(cliente: str) -> str:
+    """Consulta a carteira do cliente."""
+    return f"carteira de {cliente}"
+
+
+def _app(tracer):
+    modelo = GenericFakeChatModel(messages=iter([
+        AIMessage(content="resposta", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+    ] * 10))
+
+    def agent(state):
+        return {"messages": [modelo.invoke(state["messages"])]}
+
+    def tools(state):
+        consultar_carteira.invoke({"cliente": "ana"})
+        return {}
+
+    langgraph_server._graph = (
+        StateGraph(MessagesState).add_node("agent", agent).add_node("tools", tools)
+        .add_edge(START, "agent").add_edge("agent", "tools").add_edge("tools", END)
+        .compile(checkpointer=InMemorySaver())
+    )
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    span_tracer.tracer = tracer
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    span_tracer.init_app(app)
+    return app
+
+
+def _ler_traces(diretorio):
+    linhas = []
+    for caminho in glob.glob(os.path.join(diretorio, "spans-*.jsonl*")):
+        with open(caminho) as arquivo:
+            linhas += [json.loads(linha) for linha in arquivo]
+    return [span for linha in linhas for span in linha["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+
+
+def test_request_span_tree_exported():
+    diretorio = tempfile.mkdtemp()
+    app = _app(SpanTracer(sample_rate=1.0, directory=diretorio))
+    with app.test_client() as client:
+        resposta = client.post("/runs/wait", json={"input": {"messages": [{"role": "user", "content": "oi"}]}})
+        assert resposta.status_code == 200
+        trace_id = resposta.headers["X-Trace-ID"]
+        resposta.close()  # span da requisição termina quando o servidor fecha a resposta
+    spans = {span["name"]: span for span in _ler_traces(diretorio)}
+    assert {span["traceId"] for span in spans.values()} == {trace_id}
+    raiz = spans["POST /runs/wait"]
+    assert "parentSpanId" not in raiz and raiz["kind"] == 2
+    grafo = next(span for nome, span in spans.items() if nome.startswith("graph "))
+    assert grafo["parentSpanId"] == raiz["spanId"]
+    assert spans["node agent"]["parentSpanId"] == grafo["spanId"]
+    llm = next(span for nome, span in spans.items() if nome.startswith("llm "))
+    assert llm["parentSpanId"] == spans["node agent"]["spanId"]
+    atributos = {a["key"]: a["value"] for a in llm["attributes"]}
+    assert atributos["gen_ai.usage.input_tokens"] == {"intValue": "12"}
+    assert atributos["llm.purpose"] == {"stringValue": "agent"}
+    assert spans["tool consultar_carteira"]["parentSpanId"] == spans["node tools"]["spanId"]
+    assert all(int(s["endTimeUnixNano"]) >= int(s["startTimeUnixNano"]) for s in spans.values())
+    print("✅ Árvore HTTP → grafo → nós → LLM/tool exportada em OTLP/JSON")
+
+
+def test_thread_endpoints_span_tree_exported():
+    """POST /threads/<id> e /threads/<id>/stream executam no pool e geram os mesmos spans de grafo/nós/LLM/tool."""
+    for metodo, rota in (("POST", "/threads/t-span"), ("POST", "/threads/t-span/stream")):
+        diretorio = tempfile.mkdtemp()
+        app = _app(SpanTracer(sample_rate=1.0, directory=diretorio))
+        client = app.test_client()
+        resposta = client.open(rota, method=metodo, json={"input": {"messages": [{"role": "user", "content": "oi"}]}})
+        assert resposta.status_code == 200, resposta.get_data(as_text=True)
+        trace_id = resposta.headers["X-Trace-ID"]
+        resposta.get_data()
+        resposta.close()
+        spans = {span["name"]: span for span in _ler_traces(diretorio)}
+        assert {span["traceId"] for span in spans.values()} == {trace_id}, rota
+        raiz = spans[f"{metodo} {rota.replace('t-span', '<thread_id>')}"]
+        grafo = next(span for nome, span in spans.items() if nome.startswith("graph "))
+        assert grafo["parentSpanId"] == raiz["spanId"]
+        assert spans["node agent"]["parentSpanId"] == grafo["spanId"]
+        llm = next(span for nome, span in spans.items() if nome.startswith("llm "))
+        assert llm["parentSpanId"] == spans["node agent"]["spanId"]
+        assert spans["tool consultar_carteira"]["parentSpanId"] == spans["node tools"]["spanId"]
+    print("✅ Endpoints de thread exportam a árvore grafo → nós → LLM/tool")
+
+
+def test_sampling_controls():
+    diretorio = tempfile.mkdtemp()
+    tracer = SpanTracer(sample_rate=0.0, slow_ms=50, directory=diretorio)
+    # Fora da amostra e rápido: descartado; lento: exportado
+    tracer.start_trace("rapida").end()
+    lenta = tracer.start_trace("lenta")
+    time.sleep(0.06)
+    lenta.end()
+    assert [span["name"] for span in _ler_traces(diretorio)] == ["lenta"]
+    assert tracer.stats["traces_dropped"] == 1
+    # Desligado: não grava, a não ser que quem chamou já tenha amostrado (traceparent)
+    desligado = SpanTracer(sample_rate=0.0, directory=diretorio)
+    assert desligado.start_trace("x") is None
+    traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    span = SpanTracer(sample_rate=0.0001, directory=diretorio).start_trace("filho", traceparent=traceparent)
+    assert span.trace_id == "a" * 32 and span.parent_span_id == "b" * 16 and span.trace.sampled
+    print("✅ Amostragem por taxa, por lentidão e pelo traceparent de quem chamou")
+
+
+def test_export_file_rotates():
+    diretorio = tempfile.mkdtemp()
+    tracer = SpanTracer(sample_rate=1.0, directory=diretorio, max_bytes=2000, backups=2)
+    for _ in range(30):
+        tracer.start_trace("requisicao", attributes={"payload": "x" * 200}).end()
+    arquivos = glob.glob(os.path.join(diretorio, "spans-*.jsonl*"))
+    assert 1 < len(arquivos) <= 3
+    assert all(os.path.getsize(caminho) <= 2000 for caminho in arquivos)
+    print("✅ Arquivo de spans rotacionado por tamanho")
+
+
+if __name__ == "__main__":
+    test_request_span_tree_exported()
+    test_thread_endpoints_span_tree_exported()
+    test_sampling_controls()
+    test_export_file_rotates()
+    print("\nTodos os testes de tracing passaram.")
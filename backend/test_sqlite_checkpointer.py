@@ -0,0 +1,100 @@
+"""
+Script para testar o checkpointer SQLite (persistência de threads e catálogo).
+Não depende de servidor nem de OpenAI: usa um grafo local com modelo fake.
+
+Uso: python test_sqlite_checkpointer.py  (ou pytest test_sqlite_checkpointer.py)
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.services.sqlite_checkpointer import SqliteCheckpointSaver
+
+
+def _build_graph(checkpointer):
+    def agent(state):
+        return {"messages": [AIMessage(content=f"resposta {len(state['messages'])}")]}
+
+    return (
+        StateGraph(MessagesState)
+        .add_node("agent", agent)
+        .add_edge(START, "agent")
+        .add_edge("agent", END)
+        .compile(checkpointer=checkpointer)
+    )
+
+
+def test_threads_survive_restart():
+    """Estado e histórico continuam disponíveis ao reabrir o banco (restart / outro worker)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        config = {"configurable": {"thread_id": "t1"}}
+        graph = _build_graph(SqliteCheckpointSaver(path))
+        graph.invoke({"messages": [HumanMessage(content="oi")]}, config)
+        graph.invoke({"messages": [HumanMessage(content="tudo bem?")]}, config)
+
+        reopened = _build_graph(SqliteCheckpointSaver(path))
+        state = reopened.get_state(config)
+        assert [m.content for m in state.values["messages"]] == ["oi", "resposta 1", "tudo bem?", "resposta 3"]
+        history = list(reopened.get_state_history(config))
+        assert len(history) == len(list(graph.get_state_history(config)))
+        assert list(reopened.checkpointer.list(config, limit=2))[0].config == history[0].config
+        print("✅ Threads persistem entre instâncias do checkpointer")
+
+
+def test_thread_catalog_search():
+    """Catálogo de threads: prévia da última mensagem, filtros de metadata e paginação."""
+    with tempfile.TemporaryDirectory() as tmp:
+        saver = SqliteCheckpointSaver(os.path.join(tmp, "checkpoints.sqlite"))
+        graph = _build_graph(saver)
+        for i in range(5):
+            saver.upsert_thread(f"t{i}", {"assistant_id": "agent", "user_id": f"u{i % 2}"})
+            graph.invoke({"messages": [HumanMessage(content=f"pergunta {i}")]}, {"configurable": {"thread_id": f"t{i}"}})
+
+        todas = saver.search_threads(limit=10)
+        assert [t["thread_id"] for t in todas] == ["t4", "t3", "t2", "t1", "t0"]
+        assert todas[0]["last_message"] == {"role": "assistant", "content": "resposta 1"}
+        assert [t["thread_id"] for t in saver.search_threads(metadata={"user_id": "u1"})] == ["t3", "t1"]
+        assert [t["thread_id"] for t in saver.search_threads(limit=2, offset=2)] == ["t2", "t1"]
+
+        saver.delete_thread("t4")
+        assert saver.get_thread("t4") is None
+        assert saver.get_tuple({"configurable": {"thread_id": "t4"}}) is None
+        print("✅ Catálogo de threads com filtros e paginação")
+
+
+def test_message_deltas_reconstruct_full_history():
+    """Mensagens gravadas como delta: histórico idêntico ao armazenamento completo, com menos bytes."""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome, delta in (("delta", "env"), ("completo", None)):
+            path = os.path.join(tmp, f"{nome}.sqlite")
+            config = {"configurable": {"thread_id": "t1"}}
+            graph = _build_graph(SqliteCheckpointSaver(path, delta=delta))
+            for i in range(25):
+                graph.invoke({"messages": [HumanMessage(content=f"pergunta {i}")]}, config)
+            # Outro processo/worker continua a thread a partir do banco
+            reopened = _build_graph(SqliteCheckpointSaver(path, delta=delta))
+            reopened.invoke({"messages": [HumanMessage(content="fim")]}, config)
+            historico = [[m.content for m in s.values.get("messages", [])] for s in reopened.get_state_history(config)]
+            conn = sqlite3.connect(path)
+            total_bytes, deltas = conn.execute("SELECT SUM(LENGTH(blob)), SUM(type LIKE 'delta+%') FROM blobs").fetchone()
+            conn.close()
+            resultados[nome] = (historico, total_bytes, deltas)
+
+    assert resultados["delta"][0] == resultados["completo"][0]
+    assert resultados["delta"][2] > 0 and resultados["completo"][2] == 0
+    assert resultados["delta"][1] < resultados["completo"][1]
+    print(f"✅ Deltas de mensagens: {resultados['delta'][1]} bytes vs {resultados['completo'][1]} bytes")
+
+
+if __name__ == "__main__":
+    test_threads_survive_restart()
+    test_thread_catalog_search()
+    test_message_deltas_reconstruct_full_history()
@@ -0,0 +1,114 @@
+"""
+Script para testar os stream_mode de POST /threads/<id>/runs/stream:
+- messages: um evento por token do LLM do nó agent, antes da atualização do nó;
+  tokens de LLMs de outros nós (classificadores) não são enviados;
+- values: estado completo após cada passo;
+- updates: só a atualização de cada nó, com o nome do nó.
+Não depende de OpenAI: usa um modelo fake com streaming num grafo registrado num Flask local.
+
+Uso: python test_stream_modes.py  (ou pytest test_stream_modes.py)
+"""
+import json
+import os
+import sys
+import tempfile
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+
+from flask import Flask
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+
+RESPOSTA = "Sua carteira está bem diversificada"
+
+
+def _app():
+    # GenericFakeChatModel quebra a resposta em tokens (por espaço) quando chamado em streaming
+    modelo = GenericFakeChatModel(messages=iter([AIMessage(content=RESPOSTA) for _ in range(10)]))
+    classificador = GenericFakeChatModel(messages=iter([AIMessage(content="NENHUMA regra aplicável") for _ in range(10)]))
+
+    def init(state):
+        classificador.invoke(state["messages"])  # LLM fora de _TOKEN_STREAM_NODES
+        return {"messages": []}
+
+    def agent(state):
+        return {"messages": [modelo.invoke(state["messages"])]}
+
+    def tools(state):
+        return {"messages": [ToolMessage(content="ok", tool_call_id="call-1")]}
+
+    langgraph_server._graph = (
+        StateGraph(MessagesState).add_node("init", init).add_node("agent", agent).add_node("tools", tools)
+        .add_edge(START, "init").add_edge("init", "agent").add_edge("agent", "tools").add_edge("tools", END)
+        .compile(checkpointer=InMemorySaver())
+    )
+    langgraph_server._inject_regras_redirecionamento = lambda config: None
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    return app
+
+
+def _eventos(app, stream_mode):
+    """Eventos SSE do run como (id, event, data)."""
+    with app.test_client() as client:
+        resposta = client.post(f"/threads/{uuid4()}/runs/stream", json={
+            "input": {"messages": [{"role": "user", "content": "Como está minha carteira?"}]},
+            "stream_mode": stream_mode,
+        })
+        assert resposta.status_code == 200
+        texto = resposta.get_data(as_text=True)
+    eventos = []
+    for bloco in texto.split("\n\n"):
+        campos = dict(linha.split(": ", 1) for linha in bloco.splitlines() if not linha.startswith(":"))
+        if "event" in campos:
+            eventos.append((int(campos["id"]), campos["event"], json.loads(campos["data"])))
+    assert [e[0] for e in eventos] == list(range(len(eventos)))  # ids sequenciais (Last-Event-ID)
+    assert eventos[0][1] == "run_start" and eventos[-1][1] == "run_end"
+    return eventos[1:-1]
+
+
+def test_messages_mode_streams_agent_tokens_before_node_update():
+    eventos = _eventos(_app(), ["messages", "updates"])
+    tipos = [evento for _, evento, _ in eventos]
+    tokens = [data for _, evento, data in eventos if evento == "messages"]
+    assert len(tokens) > 1  # um evento por token, não a resposta inteira
+    chunk, meta = tokens[0]
+    assert chunk["type"] == "AIMessageChunk" and chunk["id"] and meta["langgraph_node"] == "agent"
+    assert all(meta["langgraph_node"] == "agent" for _, meta in tokens)
+    assert "".join(chunk["content"] for chunk, _ in tokens) == RESPOSTA
+    assert len({chunk["id"] for chunk, _ in tokens}) == 1  # todos os tokens da mesma mensagem
+    # Tokens chegam antes da atualização do nó agent; o classificador do init não gera tokens
+    atualizacao_agent = next(i for i, (_, evento, data) in enumerate(eventos)
+                             if evento == "state_update" and data["node"] == "agent")
+    assert max(i for i, tipo in enumerate(tipos) if tipo == "messages") < atualizacao_agent
+    assert "NENHUMA" not in json.dumps(tokens)
+    print("✅ stream_mode=messages envia os tokens do agent assim que chegam")
+
+
+def test_values_is_full_state_and_updates_is_per_node():
+    values = _eventos(_app(), "values")
+    assert all(evento == "state_update" and data["node"] is None for _, evento, data in values)
+    tamanhos = [len(data["values"]["messages"]) for _, _, data in values]
+    # Estado completo a cada passo: entrada, init (sem mensagens novas), agent, tools
+    assert tamanhos == [1, 1, 2, 3]
+    assert values[-1][2]["values"]["messages"][1]["content"] == RESPOSTA
+
+    updates = _eventos(_app(), "updates")
+    assert [data["node"] for _, _, data in updates] == ["init", "agent", "tools"]
+    por_no = {data["node"]: data["update"] for _, _, data in updates}
+    assert por_no["init"]["messages"] == []
+    assert [m["content"] for m in por_no["agent"]["messages"]] == [RESPOSTA]  # só o que o nó devolveu
+    assert [m["content"] for m in por_no["tools"]["messages"]] == ["ok"]
+    print("✅ values traz o estado completo a cada passo; updates, só a atualização de cada nó")
+
+
+if __name__ == "__main__":
+    test_messages_mode_streams_agent_tokens_before_node_update()
+    test_values_is_full_state_and_updates_is_per_node()
+    print("\nTodos os testes de stream_mode passaram.")
@@ -0,0 +1,48 @@
+"""
+Script para testar o serializador de eventos SSE (StreamSerializer).
+Não depende de servidor nem de OpenAI.
+
+Uso: python test_stream_serializer.py  (ou pytest test_stream_serializer.py)
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+
+from app.routes.langgraph_server import convert_state_to_json
+from app.services.stream_serializer import StreamSerializer, dumps
+
+
+def test_same_output_as_convert_state_to_json():
+    """Mesmo JSON do caminho antigo; mensagens repetidas entre eventos são convertidas uma vez."""
+    messages = [
+        SystemMessage(content="sistema", id="s"),
+        HumanMessage(content="oi", id="h"),
+        AIMessage(content="", tool_calls=[{"name": "t", "args": {}, "id": "c"}], id="a"),
+        ToolMessage(content="ok", tool_call_id="c", id="t"),
+    ]
+    state = {
+        "messages": messages,
+        "context_summary": "resumo",
+        "context_start": 1,
+        "extra": {"ultima": messages[-1], "lista": [1, 2.5, None, [messages[1]]]},
+    }
+    serializer = StreamSerializer()
+    first = serializer.to_jsonable(state)
+    assert json.loads(dumps(first)) == json.loads(json.dumps(convert_state_to_json(state), default=str))
+
+    serializer.to_jsonable({"messages": messages + [AIMessage(content="fim", id="f")]})
+    assert serializer.stats["messages_converted"] == 5
+    assert serializer.stats["messages_cached"] >= 4
+
+    chunk = serializer.to_jsonable(AIMessageChunk(content="to", id="k"))
+    assert chunk == {"role": "assistant", "content": "to", "id": "k"}
+    assert json.loads(dumps({1: object.__new__(object), "acento": "ação"}))["acento"] == "ação"
+    print("✅ StreamSerializer equivalente a convert_state_to_json")
+
+
+if __name__ == "__main__":
+    test_same_output_as_convert_state_to_json()
@@ -0,0 +1,105 @@
+"""
+Script para testar LANGGRAPH_TRACING_MODE (off/sampled/full): função original sem wrapper
+no modo off, despacho por amostra no modo sampled, taxas por rota e a decisão levada
+para runs em outra thread. Nada é enviado ao LangSmith (cliente local que só conta runs).
+
+Uso: python test_tracing_mode.py  (ou pytest test_tracing_mode.py)
+"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+from langsmith import Client
+from langsmith.run_helpers import tracing_context
+
+from app.services import tracing_mode
+from app.services.tracing_mode import TracingMode
+
+
+class ClienteLocal(Client):
+    def __init__(self):
+        super().__init__(api_url="http://127.0.0.1:9", api_key="teste", auto_batch_tracing=False)
+        self.runs_enviados = 0
+
+    def create_run(self, *args, **kwargs):
+        self.runs_enviados += 1
+
+    def update_run(self, *args, **kwargs):
+        pass
+
+
+def analisar(valor):
+    return valor * 2
+
+
+def test_off_returns_original_function():
+    assert TracingMode(mode="off").traceable("analisar")(analisar) is analisar
+    assert TracingMode(mode="full").traceable("analisar")(analisar) is not analisar
+    print("✅ Modo off devolve a função original, sem wrapper")
+
+
+def test_sampled_dispatches_by_decision():
+    tracing = TracingMode(mode="sampled")
+    funcao = tracing.traceable("analisar")(analisar)
+    cliente = ClienteLocal()
+    with tracing_context(enabled=True, client=cliente):
+        with tracing.scope(False):
+            assert funcao(2) == 4
+        assert cliente.runs_enviados == 0
+        with tracing.scope(True):
+            assert funcao(2) == 4
+        assert cliente.runs_enviados == 1
+    print("✅ Modo sampled só monta trace nas chamadas amostradas")
+
+
+def test_route_rates():
+    rates = tracing_mode._parse_route_rates("POST /runs/wait=1, /runs/wait=0.5,/threads/<thread_id>/runs/stream=0,x")
+    tracing = TracingMode(mode="sampled", sample_rate=0.25, route_rates=rates)
+    assert tracing.rate_for("POST", "/runs/wait") == 1.0
+    assert tracing.rate_for("GET", "/runs/wait") == 0.5
+    assert tracing.rate_for("GET", "/outra") == 0.25
+    assert all(tracing.decide("POST", "/runs/wait") for _ in range(50))
+    assert not any(tracing.decide("POST", "/threads/<thread_id>/runs/stream") for _ in range(50))
+    print("✅ Taxas por rota (método + regra, regra, padrão)")
+
+
+def test_request_decision_reaches_run_threads():
+    anterior = tracing_mode.tracing
+    tracing_mode.tracing = TracingMode(mode="sampled", route_rates={"/sempre": 1.0, "/nunca": 0.0})
+    try:
+        app = Flask(__name__)
+        tracing_mode.init_app(app)
+
+        def no_pool(eventos):
+            resultado = []
+            worker = threading.Thread(target=lambda: resultado.extend(eventos))
+            worker.start()
+            worker.join()
+            return resultado
+
+        def eventos():
+            yield tracing_mode.tracing.is_sampled()
+
+        @app.route("/sempre")
+        @app.route("/nunca")
+        def view():
+            return jsonify(requisicao=tracing_mode.tracing.is_sampled(),
+                           run=no_pool(tracing_mode.tracing.bind_events(eventos()))[0])
+
+        with app.test_client() as client:
+            assert client.get("/sempre").json == {"requisicao": True, "run": True}
+            assert client.get("/nunca").json == {"requisicao": False, "run": False}
+    finally:
+        tracing_mode.tracing = anterior
+    print("✅ Decisão da requisição vale para o run executado em outra thread")
+
+
+if __name__ == "__main__":
+    test_off_returns_original_function()
+    test_sampled_dispatches_by_decision()
+    test_route_rates()
+    test_request_decision_reaches_run_threads()
+    print("\nTodos os testes de modo de tracing passaram.")
@@ -0,0 +1,43 @@
+"""
+Script para testar o modo delta de values (SSE e histórico de threads).
+Não depende de servidor nem de OpenAI.
+
+Uso: python test_values_delta.py  (ou pytest test_values_delta.py)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.values_delta import MessagesDeltaEncoder
+
+
+def _msg(i, content=None):
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": content or f"m{i}", "id": f"id-{i}"}
+
+
+def test_delta_reconstructs_full_messages():
+    """Cliente que aplica os deltas chega sempre à mesma lista do modo completo."""
+    encoder = MessagesDeltaEncoder()
+    estados = [
+        [_msg(0)],
+        [_msg(0), _msg(1)],
+        [_msg(0), _msg(1), _msg(2), _msg(3)],
+        [_msg(0), _msg(1, "editada"), _msg(2)],  # edição + remoção
+        [_msg(5)],  # lista substituída
+    ]
+    cliente = []
+    for estado in estados:
+        payload = encoder.encode_values({"messages": estado, "context_summary": "s"})
+        delta = payload["messages_delta"]
+        assert payload["values"] == {"context_summary": "s"}
+        cliente = cliente[:delta["offset"]] + delta["messages"]
+        assert cliente == estado and delta["total"] == len(estado)
+        assert encoder.last_sent_index == len(estado)
+
+    assert encoder.encode([_msg(5)])["messages"] == []
+    print("✅ Deltas de values reconstroem a lista completa")
+
+
+if __name__ == "__main__":
+    test_delta_reconstructs_full_messages()
@@ -0,0 +1,109 @@
+"""
+Script para testar o warmup do grafo, o endpoint GET /ready e o retry com backoff de get_graph().
+Não depende de OpenAI: usa um grafo fake registrado num Flask local.
+
+Uso: python test_warmup.py  (ou pytest test_warmup.py)
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LANGGRAPH_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from flask import Flask
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from app.routes import langgraph_server
+from app.services.sqlite_checkpointer import SqliteCheckpointSaver
+from app.services.warmup import RetryBackoff
+
+
+def _grafo():
+    def agent(state):
+        return {"messages": [AIMessage(content="ok")]}
+
+    return (
+        StateGraph(MessagesState).add_node("agent", agent).add_edge(START, "agent").add_edge("agent", END)
+        .compile(checkpointer=InMemorySaver())
+    )
+
+
+def test_backoff_doubles_until_max():
+    backoff = RetryBackoff(base_seconds=1, max_seconds=5)
+    assert [backoff.failure(now=0) for _ in range(4)] == [1, 2, 4, 5]
+    assert not backoff.ready(now=4) and backoff.ready(now=5)
+    backoff.success()
+    assert backoff.failures == 0 and backoff.ready(now=0)
+    print("✅ Backoff exponencial limitado e zerado após sucesso")
+
+
+def test_get_graph_retries_after_backoff():
+    langgraph_server._graph = None
+    langgraph_server._graph_error = None
+    langgraph_server._graph_backoff = RetryBackoff(base_seconds=0.2, max_seconds=1)
+    modulo = sys.modules.get("app.services.langgraph_graph")
+    sys.modules["app.services.langgraph_graph"] = None  # import falha com ImportError
+    try:
+        for _ in range(2):
+            try:
+                langgraph_server.get_graph()
+                assert False, "get_graph deveria falhar"
+            except ImportError:
+                pass
+        # Segunda chamada ficou dentro do backoff: não tentou de novo
+        assert langgraph_server._graph_backoff.failures == 1
+    finally:
+        if modulo is None:
+            del sys.modules["app.services.langgraph_graph"]
+        else:
+            sys.modules["app.services.langgraph_graph"] = modulo
+    time.sleep(0.25)
+    assert langgraph_server.get_graph() is not None and langgraph_server._graph_error is None
+    print("✅ get_graph tenta de novo após o backoff em vez de guardar o erro para sempre")
+
+
+def test_ready_reports_phase_timings():
+    langgraph_server._graph = _grafo()
+    langgraph_server._warmup = langgraph_server.WarmupState()
+    app = Flask(__name__)
+    app.register_blueprint(langgraph_server.langgraph_server_bp)
+    with app.test_client() as client:
+        resposta = client.get("/ready")
+    assert resposta.status_code == 200 and resposta.json["ready"] is True
+    fases = {fase["name"]: fase for fase in resposta.json["phases"]}
+    assert list(fases) == ["graph", "stateless_graph", "schemas", "tools", "regulacoes"]
+    assert all(fase["status"] == "ok" and "duration_ms" in fase for fase in fases.values())
+    print("✅ GET /ready responde 200 com as fases do warmup e suas durações")
+
+
+def test_sqlite_connection_reopened_after_fork():
+    if not hasattr(os, "fork"):
+        return
+    saver = SqliteCheckpointSaver(os.path.join(tempfile.mkdtemp(), "fork.sqlite"))
+    saver.upsert_thread("antes-do-fork")
+    conexao_master = saver._conn
+    pid = os.fork()
+    if pid == 0:  # processo filho (worker)
+        ok = False
+        try:
+            ok = saver._conn is not conexao_master and saver.get_thread("antes-do-fork") is not None
+            saver.upsert_thread("no-worker")
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert saver.get_thread("no-worker") is not None
+    print("✅ Conexão SQLite reaberta no processo filho (gunicorn --preload)")
+
+
+if __name__ == "__main__":
+    test_backoff_doubles_until_max()
+    test_get_graph_retries_after_backoff()
+    test_ready_reports_phase_timings()
+    test_sqlite_connection_reopened_after_fork()
+    print("\nTodos os testes de warmup passaram.")
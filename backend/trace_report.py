@@ -0,0 +1,102 @@
+"""
+Relatório dos traces exportados pelo tracing local (app/services/span_tracer.py).
+
+Lê os arquivos spans-*.jsonl (OTLP/JSON) e mostra:
+- latência por nome de span (p50/p95/p99/máx), para ver onde o tempo vai;
+- os traces mais lentos com a árvore de spans e a duração de cada um.
+
+Uso:
+    python trace_report.py                       # LANGGRAPH_TRACE_DIR ou /tmp/alphaadvisor_traces
+    python trace_report.py --dir ./traces --top 5
+    python trace_report.py --rota "POST /runs/wait"
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def carregar_spans(diretorio):
+    """Spans agrupados por trace_id (arquivos rotacionados incluídos)."""
+    traces = defaultdict(list)
+    for caminho in sorted(glob.glob(os.path.join(diretorio, "spans-*.jsonl*"))):
+        with open(caminho, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                try:
+                    dados = json.loads(linha)
+                except ValueError:
+                    continue
+                for resource in dados.get("resourceSpans", []):
+                    for scope in resource.get("scopeSpans", []):
+                        for span in scope.get("spans", []):
+                            span["duracao_ms"] = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                            traces[span["traceId"]].append(span)
+    return traces
+
+
+def _percentil(valores, q):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(q * len(valores)))]
+
+
+def _raiz(spans):
+    ids = {span["spanId"] for span in spans}
+    raizes = [span for span in spans if span.get("parentSpanId") not in ids]
+    return min(raizes, key=lambda span: int(span["startTimeUnixNano"])) if raizes else None
+
+
+def imprimir_arvore(spans):
+    filhos = defaultdict(list)
+    ids = {span["spanId"] for span in spans}
+    for span in sorted(spans, key=lambda span: int(span["startTimeUnixNano"])):
+        filhos[span.get("parentSpanId") if span.get("parentSpanId") in ids else None].append(span)
+
+    def imprimir(span, nivel):
+        erro = " [erro]" if span.get("status", {}).get("code") == 2 else ""
+        print(f"    {'  ' * nivel}{span['name']}: {span['duracao_ms']:.1f} ms{erro}")
+        for filho in filhos[span["spanId"]]:
+            imprimir(filho, nivel + 1)
+
+    for raiz in filhos[None]:
+        imprimir(raiz, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório dos traces locais (spans OTLP/JSON)")
+    parser.add_argument("--dir", default=os.getenv("LANGGRAPH_TRACE_DIR")
+                        or os.path.join(tempfile.gettempdir(), "alphaadvisor_traces"))
+    parser.add_argument("--top", type=int, default=3, help="Quantos traces mais lentos detalhar")
+    parser.add_argument("--rota", help="Só traces cuja raiz tem este nome (ex.: 'POST /runs/wait')")
+    args = parser.parse_args()
+
+    traces = carregar_spans(args.dir)
+    if args.rota:
+        traces = {tid: spans for tid, spans in traces.items() if (_raiz(spans) or {}).get("name") == args.rota}
+    if not traces:
+        print(f"Nenhum trace em {args.dir}")
+        return
+
+    por_nome = defaultdict(list)
+    for spans in traces.values():
+        for span in spans:
+            por_nome[span["name"]].append(span["duracao_ms"])
+    print(f"\nTraces: {len(traces)} ({args.dir})")
+    print(f"  {'span':<40} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}")
+    for nome, duracoes in sorted(por_nome.items(), key=lambda item: -_percentil(item[1], 0.99)):
+        print(f"  {nome[:40]:<40} {len(duracoes):>6} {_percentil(duracoes, 0.5):>9.1f} "
+              f"{_percentil(duracoes, 0.95):>9.1f} {_percentil(duracoes, 0.99):>9.1f} {max(duracoes):>9.1f}")
+
+    lentos = sorted(traces.items(), key=lambda item: -((_raiz(item[1]) or {}).get("duracao_ms") or 0))[:args.top]
+    for trace_id, spans in lentos:
+        raiz = _raiz(spans)
+        print(f"\n  trace {trace_id} ({raiz['name'] if raiz else '?'}, {raiz['duracao_ms'] if raiz else 0:.1f} ms)")
+        imprimir_arvore(spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -110,6 +110,21 @@ async def create_thread(request: Request):
             content={"error": str(e)}
         )
 
+@app.post("/cache/regras_redirecionamento/invalidate")
+async def invalidate_regras_cache(request: Request):
+    """Descarta as regras de handoff em cache (o backend chama ao salvar a página Autonomia)"""
+    token = os.getenv("REGRAS_CACHE_INVALIDATE_TOKEN")
+    if token and request.headers.get("X-Invalidate-Token") != token:
+        return JSONResponse(status_code=401, content={"error": "Token de invalidação inválido"})
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    body = body if isinstance(body, dict) else {}
+    from agent.config_tools import invalidate_regras_redirecionamento
+    removidas = invalidate_regras_redirecionamento(body.get("user_id"), body.get("backend_url"))
+    return {"invalidated": removidas}
+
 # Exportar app para gunicorn/uvicorn (necessário para EB)
 application = app
 
@@ -0,0 +1,115 @@
+"""
+Benchmark da janela de contexto: tokens de prompt e latência x tamanho da thread.
+
+Compara o envio do histórico completo (comportamento antigo) com a janela
+gerenciada (orçamento de tokens + truncamento de tools + resumo).
+
+Uso:
+    python bench_context_window.py                 # só contagem de tokens / tempo de montagem
+    python bench_context_window.py --live          # também mede latência real do modelo (usa OPENAI_API_KEY)
+    python bench_context_window.py --turnos 10 20 40 80
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Adicionar o diretório src ao path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agent.context_window import (
+    ContextWindowSettings,
+    build_prompt_messages,
+    count_tokens,
+    update_context,
+)
+
+SYSTEM = "Você é o AlphaAdvisor, assessor virtual de investimentos do Banco Inter."
+CARTEIRA = '{"ativo": "CDB Banco Inter", "valor": 15000.0, "percentual": 12.5, "liquidez": "diaria"}, ' * 40
+
+
+class ResumoFixo:
+    """Resumidor local (sem LLM) para o benchmark offline."""
+
+    def invoke(self, messages):
+        return AIMessage(content="Cliente moderado, carteira concentrada em renda fixa; pediu rebalanceamento.")
+
+
+def gerar_thread(turnos):
+    msgs = []
+    for i in range(turnos):
+        call_id = f"call_{i}"
+        msgs += [
+            HumanMessage(content=f"Como está minha carteira hoje? (pergunta {i})"),
+            AIMessage(content="", tool_calls=[{"name": "obter_carteira", "args": {}, "id": call_id}]),
+            ToolMessage(content=CARTEIRA, tool_call_id=call_id, name="obter_carteira"),
+            AIMessage(content="Sua carteira está concentrada em renda fixa; sugiro diversificar. " * 3),
+        ]
+    return msgs + [HumanMessage(content="E agora, o que você recomenda?")]
+
+
+def simular_thread(turnos, settings, summarizer):
+    """Reproduz a thread turno a turno, como o grafo faria, e devolve o estado final."""
+    state = {"messages": []}
+    for msg in gerar_thread(turnos):
+        state["messages"].append(msg)
+        if isinstance(msg, HumanMessage):
+            state.update(update_context(state, summarizer, settings))
+    return state
+
+
+def medir(turnos, settings, model=None):
+    state = simular_thread(turnos, settings, ResumoFixo())
+    completo = [SystemMessage(content=SYSTEM)] + state["messages"]
+
+    inicio = time.perf_counter()
+    janela = build_prompt_messages(SYSTEM, state, settings)
+    montagem_ms = (time.perf_counter() - inicio) * 1000
+
+    resultado = {
+        "turnos": turnos,
+        "tokens_completo": count_tokens(completo),
+        "tokens_janela": count_tokens(janela),
+        "montagem_ms": montagem_ms,
+    }
+    if model is not None:
+        for chave, msgs in (("latencia_completo_ms", completo), ("latencia_janela_ms", janela)):
+            inicio = time.perf_counter()
+            model.invoke(msgs)
+            resultado[chave] = (time.perf_counter() - inicio) * 1000
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da janela de contexto")
+    parser.add_argument("--turnos", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    parser.add_argument("--live", action="store_true", help="mede latência real do modelo (max_tokens=1)")
+    args = parser.parse_args()
+
+    settings = ContextWindowSettings.from_env()
+    model = None
+    if args.live:
+        import os
+        from langchain_openai import ChatOpenAI
+        model = ChatOpenAI(model=os.getenv("AI_MODEL", "gpt-4o"), temperature=0, max_tokens=1)
+
+    print("=" * 80)
+    print(f"Janela de contexto: max_tokens={settings.max_tokens} target_ratio={settings.target_ratio} "
+          f"tool_output_max_chars={settings.tool_output_max_chars}")
+    print("=" * 80)
+    cabecalho = f"{'turnos':>7} {'tokens completo':>16} {'tokens janela':>14} {'montagem ms':>12}"
+    if model is not None:
+        cabecalho += f" {'lat. completo ms':>17} {'lat. janela ms':>15}"
+    print(cabecalho)
+    for turnos in args.turnos:
+        r = medir(turnos, settings, model)
+        linha = f"{r['turnos']:>7} {r['tokens_completo']:>16} {r['tokens_janela']:>14} {r['montagem_ms']:>12.2f}"
+        if model is not None:
+            linha += f" {r['latencia_completo_ms']:>17.0f} {r['latencia_janela_ms']:>15.0f}"
+        print(linha)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Micro-batching opcional das classificações de roteamento (handoff).
+
+Sob carga, cada turno de chat faz chamadas pequenas ao mesmo modelo para
+classificar a última mensagem do usuário (regras de redirecionamento e
+respostas não permitidas). O ClassifierBatcher segura as requisições por
+alguns milissegundos, junta até N mensagens em um único prompt de
+classificação com saída estruturada e devolve o veredito de cada mensagem para
+o grafo que está esperando.
+
+As instruções passadas a classify() descrevem só o critério e as respostas
+válidas (ex.: "a regra exata ou NENHUMA"); o formato da saída é definido aqui,
+conforme o caminho:
+- mensagem isolada: build_single_prompt pede UMA ÚNICA LINHA com a resposta;
+- lote: model.with_structured_output(VereditosLote) (tool calling/JSON schema do
+  provedor). Modelos sem saída estruturada recebem o prompt que pede um objeto
+  JSON, lido por parse_batch_response; resposta inválida cai na classificação
+  uma a uma.
+
+Ativação via .env (desligado por padrão):
+- ROUTER_BATCH_ENABLED=true
+- ROUTER_BATCH_MAX_SIZE (padrão 8 mensagens por chamada)
+- ROUTER_BATCH_MAX_WAIT_MS (padrão 5 ms de espera pelo lote)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, Field
+
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+def _content_to_text(resp: Any) -> str:
+    content = getattr(resp, "content", None)
+    if content is None:
+        return str(resp)
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if isinstance(item, str):
+                parts.append(item)
+            elif isinstance(item, dict) and "text" in item:
+                parts.append(item["text"])
+        return " ".join(parts)
+    return str(content)
+
+
+class VereditoMensagem(BaseModel):
+    """Resposta para uma mensagem do lote."""
+
+    mensagem: int = Field(description="Número da mensagem no lote (1, 2, ...)")
+    resposta: str = Field(description="Resposta para a mensagem, exatamente como pedido nas instruções")
+
+
+class VereditosLote(BaseModel):
+    """Respostas de todas as mensagens do lote."""
+
+    respostas: List[VereditoMensagem] = Field(description="Uma resposta por mensagem")
+
+
+def build_single_prompt(instrucoes: str, texto: str) -> str:
+    """Prompt de uma mensagem isolada (resposta em uma linha)."""
+    return (
+        f"{instrucoes}\n\n"
+        f"Mensagem do cliente:\n\"\"\"\n{texto}\n\"\"\"\n\n"
+        "Responda com UMA ÚNICA LINHA contendo só a resposta. Não explique."
+    )
+
+
+def classify_single(model: Any, instrucoes: str, texto: str) -> str:
+    """Classifica uma mensagem com uma chamada ao modelo; retorna a resposta crua."""
+    resp = model.invoke([HumanMessage(content=build_single_prompt(instrucoes, texto))])
+    return _content_to_text(resp).strip()
+
+
+def build_batch_prompt(instrucoes: str, textos: List[str], structured: bool = False) -> str:
+    """
+    Monta o prompt único que classifica várias mensagens de uma vez.
+    structured=True: a saída vem do schema VereditosLote; senão pede um objeto JSON no texto.
+    """
+    blocos = "\n\n".join(
+        f"Mensagem {i}:\n\"\"\"\n{texto}\n\"\"\"" for i, texto in enumerate(textos, start=1)
+    )
+    if structured:
+        saida = ("Devolva uma resposta por mensagem, com o número da mensagem e a resposta que você daria "
+                 "a ela isoladamente.")
+    else:
+        saida = ("Responda APENAS com um objeto JSON (sem markdown) mapeando o número de cada mensagem para a "
+                 "resposta que você daria a ela isoladamente. Exemplo: {\"1\": \"NENHUMA\", \"2\": \"<resposta>\"}")
+    return (
+        f"{instrucoes}\n\n"
+        "Você vai receber VÁRIAS mensagens de clientes diferentes. Classifique CADA uma de forma independente, "
+        "seguindo exatamente as instruções acima.\n\n"
+        f"{blocos}\n\n"
+        f"{saida}"
+    )
+
+
+def parse_batch_response(text: str, total: int) -> Optional[List[str]]:
+    """Extrai os vereditos do JSON devolvido pelo modelo. Retorna None se inválido."""
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    vereditos = []
+    for i in range(1, total + 1):
+        valor = data.get(str(i))
+        if valor is None:
+            return None
+        vereditos.append(str(valor).strip())
+    return vereditos
+
+
+def _vereditos_from_structured(result: Any, total: int) -> Optional[List[str]]:
+    """Vereditos na ordem das mensagens a partir de VereditosLote. Retorna None se faltar alguma."""
+    if not isinstance(result, VereditosLote):
+        return None
+    por_numero = {item.mensagem: item.resposta.strip() for item in result.respostas}
+    if any(i not in por_numero for i in range(1, total + 1)):
+        return None
+    return [por_numero[i] for i in range(1, total + 1)]
+
+
+class _PendingBatch:
+    """Lote em formação para um mesmo conjunto de instruções."""
+
+    def __init__(self) -> None:
+        self.items: List[Tuple[str, Future]] = []
+        self.full = threading.Event()
+        self.closed = False
+
+
+class ClassifierBatcher:
+    """
+    Agrupa classificações concorrentes em uma única chamada ao modelo.
+
+    O primeiro chamador de um lote vira o "líder": espera até max_wait_ms
+    (ou até o lote encher), fecha o lote, faz a chamada e distribui os
+    vereditos. Os demais chamadores só aguardam o Future da sua mensagem.
+    Lotes são separados por instruções (regras/tópicos podem variar por usuário).
+    """
+
+    def __init__(self, model: Any, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS) -> None:
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingBatch] = {}
+        self._structured: Any = None
+        self._structured_checked = False
+        self.stats = {"requests": 0, "batches": 0, "llm_calls": 0, "fallbacks": 0}
+
+    def _structured_model(self) -> Any:
+        """model.with_structured_output(VereditosLote), ou None se o modelo não suportar."""
+        if not self._structured_checked:
+            try:
+                self._structured = self.model.with_structured_output(VereditosLote)
+            except (NotImplementedError, AttributeError, ValueError):
+                self._structured = None
+            self._structured_checked = True
+        return self._structured
+
+    def classify(self, instrucoes: str, texto: str) -> str:
+        """
+        Classifica uma mensagem. Bloqueia até o veredito do lote estar pronto.
+        instrucoes descreve o critério e as respostas válidas, sem formato de saída.
+        Retorna a resposta crua que o modelo daria para a mensagem isolada.
+        """
+        future: Future = Future()
+        with self._lock:
+            self.stats["requests"] += 1
+            batch = self._pending.get(instrucoes)
+            leader = batch is None
+            if leader:
+                batch = _PendingBatch()
+                self._pending[instrucoes] = batch
+            batch.items.append((texto, future))
+            if len(batch.items) >= self.max_batch:
+                self._close(instrucoes, batch)
+        if leader:
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                self._close(instrucoes, batch)
+            self._run(instrucoes, batch.items)
+        return future.result()
+
+    def _close(self, instrucoes: str, batch: _PendingBatch) -> None:
+        # Chamado com self._lock: novas mensagens passam a abrir outro lote
+        if not batch.closed:
+            batch.closed = True
+            if self._pending.get(instrucoes) is batch:
+                del self._pending[instrucoes]
+            batch.full.set()
+
+    def _run(self, instrucoes: str, items: List[Tuple[str, Future]]) -> None:
+        textos = [t for t, _ in items]
+        self._count("batches")
+        try:
+            if len(items) == 1:
+                vereditos: Optional[List[str]] = [self._classify_single(instrucoes, textos[0])]
+            else:
+                vereditos = self._classify_batch(instrucoes, textos)
+                if vereditos is None:
+                    # JSON inválido: classifica uma a uma para não perder o veredito
+                    self._count("fallbacks")
+                    vereditos = [self._classify_single(instrucoes, t) for t in textos]
+        except Exception as e:
+            for _, fut in items:
+                fut.set_exception(e)
+            return
+        for (_, fut), veredito in zip(items, vereditos):
+            fut.set_result(veredito)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _classify_batch(self, instrucoes: str, textos: List[str]) -> Optional[List[str]]:
+        """Uma chamada para o lote inteiro; None se a saída não tiver todos os vereditos."""
+        self._count("llm_calls")
+        structured = self._structured_model()
+        if structured is None:
+            resp = self.model.invoke([HumanMessage(content=build_batch_prompt(instrucoes, textos))])
+            return parse_batch_response(_content_to_text(resp), len(textos))
+        try:
+            result = structured.invoke([HumanMessage(content=build_batch_prompt(instrucoes, textos, structured=True))])
+        except Exception:
+            return None  # saída fora do schema: o chamador classifica uma a uma
+        return _vereditos_from_structured(result, len(textos))
+
+    def _classify_single(self, instrucoes: str, texto: str) -> str:
+        self._count("llm_calls")
+        return classify_single(self.model, instrucoes, texto)
+
+
+def batching_enabled() -> bool:
+    """Indica se o micro-batching dos classificadores está ligado (ROUTER_BATCH_ENABLED)."""
+    return os.getenv("ROUTER_BATCH_ENABLED", "false").lower() == "true"
+
+
+def batcher_from_env(model: Any) -> Optional[ClassifierBatcher]:
+    """Cria o batcher a partir das variáveis de ambiente, ou None se desligado."""
+    if not batching_enabled():
+        return None
+    return ClassifierBatcher(
+        model,
+        max_batch=int(os.getenv("ROUTER_BATCH_MAX_SIZE", str(DEFAULT_MAX_BATCH))),
+        max_wait_ms=float(os.getenv("ROUTER_BATCH_MAX_WAIT_MS", str(DEFAULT_MAX_WAIT_MS))),
+    )
@@ -6,9 +6,29 @@ Uma única chamada ao mesmo endpoint traz regras + respostas (fonte S3).
 IMPORTANTE: No deploy do LangSmith (Cloud), defina a variável BACKEND_URL com a URL
 base do backend Flask (ex: https://seu-backend.onrender.com). Sem BACKEND_URL,
 o agente usa sempre as 4 regras padrão e não reflete o que foi salvo na página Autonomia.
+
+Cache: should_route_after_init e handoff_node consultam as regras a cada turno
+(duas vezes em turnos de handoff); cada consulta era um GET bloqueante de até 10 s.
+fetch_regras_redirecionamento guarda o resultado por (user_id, backend_url):
+- até REGRAS_CACHE_TTL segundos (padrão 60) responde do cache;
+- depois disso, por mais REGRAS_CACHE_STALE segundos (padrão 600), responde o valor
+  antigo e atualiza em segundo plano (stale-while-revalidate);
+- falhas do backend ficam em cache por REGRAS_CACHE_NEGATIVE_TTL segundos (padrão 15):
+  serve o último valor bom (ou o padrão) sem repetir o GET a cada mensagem;
+- invalidate_regras_redirecionamento() descarta o cache; o backend chama
+  POST /cache/regras_redirecionamento/invalidate (application.py) ao salvar ou
+  resetar a Autonomia;
+- user_id vem do config de cada run: o cache é LRU com no máximo
+  REGRAS_CACHE_MAX_ENTRIES chaves (padrão 256), e os locks por chave saem junto
+  com as entradas.
+REGRAS_CACHE_TTL=0 desliga o cache.
 """
+import copy
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from langchain_core.tools import tool
 
 REGRAS_REDIRECIONAMENTO_PADRAO = [
@@ -31,15 +51,12 @@ RESPOSTAS_PADRAO: Dict[str, bool] = {
 DEFAULT_BACKEND_URL = "http://Alphaadvisor-v6-env.eba-2mpu5bfe.us-east-2.elasticbeanstalk.com"
 
 
-def fetch_regras_redirecionamento(user_id: str = "default", backend_url: Optional[str] = None) -> Dict[str, Any]:
-    """
-    Obtém regras de redirecionamento e respostas permitidas do backend (mesmo endpoint, fonte S3).
-    Retorna {"regras_redirecionamento": list, "respostas": dict}. Se a API não retornar respostas, usa tudo permitido.
-    """
-    base = (backend_url or os.getenv("BACKEND_URL") or DEFAULT_BACKEND_URL or "").strip().rstrip("/")
-    if not base:
-        print("[RegrasHandoff] BACKEND_URL nao definida (env ou config); usando regras e respostas padrao.")
-        return {"regras_redirecionamento": list(REGRAS_REDIRECIONAMENTO_PADRAO), "respostas": dict(RESPOSTAS_PADRAO)}
+def _padrao() -> Dict[str, Any]:
+    return {"regras_redirecionamento": list(REGRAS_REDIRECIONAMENTO_PADRAO), "respostas": dict(RESPOSTAS_PADRAO)}
+
+
+def _get_regras_backend(user_id: str, base: str) -> Tuple[Dict[str, Any], bool]:
+    """GET no backend. Retorna (regras e respostas, ok); em falha, (padrão, False)."""
     url = f"{base}/api/configuracoes/regras_redirecionamento?user_id={user_id}"
     print(f"[RegrasHandoff] GET {url[:90]}{'...' if len(url) > 90 else ''}")
     try:
@@ -60,12 +77,167 @@ def fetch_regras_redirecionamento(user_id: str = "default", backend_url: Optiona
                     if k not in respostas:
                         respostas[k] = v
             print(f"[RegrasHandoff] Backend OK status={r.status_code} regras_count={len(regras)}")
-            return {"regras_redirecionamento": regras, "respostas": respostas}
+            return {"regras_redirecionamento": regras, "respostas": respostas}, True
         print(f"[RegrasHandoff] Backend error status={r.status_code} body={r.text[:300]}")
     except Exception as e:
         print(f"[RegrasHandoff] Exception: {type(e).__name__} {e}")
     print("[RegrasHandoff] Fallback: usando regras e respostas padrao.")
-    return {"regras_redirecionamento": list(REGRAS_REDIRECIONAMENTO_PADRAO), "respostas": dict(RESPOSTAS_PADRAO)}
+    return _padrao(), False
+
+
+class RegrasCache:
+    """Cache TTL (LRU) das regras por (user_id, backend_url), com stale-while-revalidate e cache de falhas."""
+
+    def __init__(
+        self,
+        fetch: Any = _get_regras_backend,
+        ttl: float = 60.0,
+        stale: float = 600.0,
+        negative_ttl: float = 15.0,
+        max_entries: int = 256,
+    ) -> None:
+        self.fetch = fetch
+        self.ttl = max(0.0, float(ttl))
+        self.stale = max(0.0, float(stale))
+        self.negative_ttl = max(0.0, float(negative_ttl))
+        self.max_entries = max(1, int(max_entries))
+        # chave -> {"value", "ok", "fresh_until", "stale_until"}, da menos para a mais usada
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        # Geração do cache: invalidações descartam respostas de GETs iniciados antes delas
+        self._generation = 0
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "negative_hits": 0, "refreshes": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls) -> "RegrasCache":
+        """Cria o cache a partir de REGRAS_CACHE_TTL, REGRAS_CACHE_STALE, REGRAS_CACHE_NEGATIVE_TTL e REGRAS_CACHE_MAX_ENTRIES."""
+        return cls(
+            ttl=float(os.getenv("REGRAS_CACHE_TTL", "60")),
+            stale=float(os.getenv("REGRAS_CACHE_STALE", "600")),
+            negative_ttl=float(os.getenv("REGRAS_CACHE_NEGATIVE_TTL", "15")),
+            max_entries=int(os.getenv("REGRAS_CACHE_MAX_ENTRIES", "256")),
+        )
+
+    def get(self, user_id: str, base: str) -> Dict[str, Any]:
+        """Regras e respostas de (user_id, base), buscando no backend só quando necessário."""
+        if self.ttl <= 0:
+            return self.fetch(user_id, base)[0]
+        key = (user_id, base)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            if entry is not None and now < entry["fresh_until"]:
+                self.stats["hits" if entry["ok"] else "negative_hits"] += 1
+                return copy.deepcopy(entry["value"])
+            if entry is not None and entry["ok"] and now < entry["stale_until"]:
+                self.stats["stale_hits"] += 1
+                start_refresh = key not in self._refreshing
+                if start_refresh:
+                    self._refreshing.add(key)
+                value = copy.deepcopy(entry["value"])
+            else:
+                value = None
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+        if value is not None:
+            if start_refresh:
+                threading.Thread(target=self._refresh, args=(key,), name="regras-refresh", daemon=True).start()
+            return value
+        # Sem valor utilizável: uma busca por chave, as demais esperam e reaproveitam
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() < entry["fresh_until"]:
+                    self.stats["hits" if entry["ok"] else "negative_hits"] += 1
+                    return copy.deepcopy(entry["value"])
+                self.stats["misses"] += 1
+            value = self._load(key)
+        with self._lock:
+            if key not in self._entries:
+                # Invalidado durante a busca: o lock não tem entrada que o libere depois
+                self._forget_lock(key)
+        return copy.deepcopy(value)
+
+    def _load(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        generation = self._generation
+        value, ok = self.fetch(*key)
+        now = time.monotonic()
+        with self._lock:
+            previous = self._entries.get(key)
+            if not ok:
+                self.stats["errors"] += 1
+                if previous is not None and previous["ok"]:
+                    # Backend fora: continua servindo o último valor bom, sem repetir o GET a cada turno
+                    value = previous["value"]
+                entry = {"value": value, "ok": previous is not None and previous["ok"],
+                         "fresh_until": now + self.negative_ttl,
+                         "stale_until": max(now + self.negative_ttl, previous["stale_until"] if previous else 0)}
+            else:
+                entry = {"value": value, "ok": True, "fresh_until": now + self.ttl,
+                         "stale_until": now + self.ttl + self.stale}
+            if generation == self._generation:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._forget_lock(self._entries.popitem(last=False)[0])
+        return value
+
+    def _forget_lock(self, key: Tuple[str, str]) -> None:
+        """Remove o lock da chave (com self._lock), a não ser que uma busca o esteja usando."""
+        key_lock = self._key_locks.get(key)
+        if key_lock is not None and not key_lock.locked():
+            del self._key_locks[key]
+
+    def _refresh(self, key: Tuple[str, str]) -> None:
+        try:
+            with self._lock:
+                self.stats["refreshes"] += 1
+            self._load(key)
+        except Exception as e:
+            print(f"[RegrasHandoff] Atualizacao em segundo plano falhou: {type(e).__name__} {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, user_id: Optional[str] = None, backend_url: Optional[str] = None) -> int:
+        """Descarta as entradas do user_id/backend_url informados (sem filtros: todas). Retorna quantas."""
+        base = backend_url.strip().rstrip("/") if backend_url else None
+        with self._lock:
+            keys = [k for k in self._entries if (user_id is None or k[0] == user_id) and (base is None or k[1] == base)]
+            for key in keys:
+                del self._entries[key]
+                self._forget_lock(key)
+            self._generation += 1
+        return len(keys)
+
+
+_regras_cache = RegrasCache.from_env()
+
+
+def fetch_regras_redirecionamento(user_id: str = "default", backend_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Obtém regras de redirecionamento e respostas permitidas do backend (mesmo endpoint, fonte S3).
+    Retorna {"regras_redirecionamento": list, "respostas": dict}. Se a API não retornar respostas, usa tudo permitido.
+    Resultado em cache por (user_id, backend_url): ver RegrasCache.
+    """
+    base = (backend_url or os.getenv("BACKEND_URL") or DEFAULT_BACKEND_URL or "").strip().rstrip("/")
+    if not base:
+        print("[RegrasHandoff] BACKEND_URL nao definida (env ou config); usando regras e respostas padrao.")
+        return _padrao()
+    return _regras_cache.get(user_id, base)
+
+
+def invalidate_regras_redirecionamento(user_id: Optional[str] = None, backend_url: Optional[str] = None) -> int:
+    """
+    Descarta regras em cache (chamado quando a Autonomia é salva no backend).
+    Sem argumentos descarta tudo: o backend serve as regras de 'default' para qualquer user_id.
+    """
+    removidas = _regras_cache.invalidate(user_id, backend_url)
+    print(f"[RegrasHandoff] Cache invalidado user_id={user_id} backend_url={backend_url} entradas={removidas}")
+    return removidas
 
 
 @tool
@@ -0,0 +1,222 @@
+"""Gerenciamento da janela de contexto e resumo incremental de threads longas.
+
+Sem isso o agent_node reenviava todo o histórico a cada turno, incluindo
+ToolMessages grandes (carteira completa, textos de regulação), e o tempo
+de prompt crescia linearmente com a thread. O nó de contexto:
+
+- mantém um orçamento de tokens por chamada ao modelo;
+- trunca saídas de tools antigas (as do turno atual ficam inteiras);
+- move o início da janela para frente quando o orçamento estoura e
+  acumula as mensagens que saíram em um resumo guardado no estado.
+
+O início da janela só anda de turno em turno (em mensagens do usuário), então
+o prefixo enviado ao modelo é estável entre chamadas e o resumo só é
+refeito quando a janela enche de novo (histerese via CONTEXT_TARGET_RATIO).
+
+Configuração via .env:
+- CONTEXT_MAX_TOKENS (padrão 6000; 0 desliga o gerenciamento)
+- CONTEXT_TARGET_RATIO (padrão 0.6: ao estourar, a janela volta a ~60% do orçamento)
+- CONTEXT_TOOL_OUTPUT_MAX_CHARS (padrão 1500)
+- CONTEXT_SUMMARY_ENABLED (padrão true)
+
+Cópia idêntica em backend/app/services/context_window.py e
+langgraph-app/src/agent/context_window.py: os dois apps são implantados
+separadamente e não têm pacote comum. Altere os dois arquivos juntos
+(tests/unit_tests/test_context_window.py compara as cópias).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph import MessagesState
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "Você mantém o resumo de uma conversa entre um cliente e o AlphaAdvisor (assessor de investimentos). "
+    "Atualize o resumo existente incorporando as novas mensagens. Preserve fatos relevantes: perfil e "
+    "objetivos do cliente, dados de carteira citados, recomendações feitas, decisões e pendências. "
+    "Seja conciso (no máximo 15 linhas) e escreva em português.\n\n"
+    "Resumo atual:\n{resumo}\n\n"
+    "Novas mensagens:\n{mensagens}\n\n"
+    "Responda apenas com o resumo atualizado."
+)
+
+
+class ContextState(MessagesState):
+    """MessagesState com o resumo incremental das mensagens fora da janela."""
+
+    context_summary: str
+    context_start: int
+
+
+@dataclass(frozen=True)
+class ContextWindowSettings:
+    """Parâmetros da janela de contexto."""
+
+    max_tokens: int = 6000
+    target_ratio: float = 0.6
+    tool_output_max_chars: int = 1500
+    summary_enabled: bool = True
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens > 0
+
+    @classmethod
+    def from_env(cls) -> "ContextWindowSettings":
+        """Lê as configurações das variáveis de ambiente."""
+        return cls(
+            max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "6000")),
+            target_ratio=float(os.getenv("CONTEXT_TARGET_RATIO", "0.6")),
+            tool_output_max_chars=int(os.getenv("CONTEXT_TOOL_OUTPUT_MAX_CHARS", "1500")),
+            summary_enabled=os.getenv("CONTEXT_SUMMARY_ENABLED", "true").lower() == "true",
+        )
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(
+            item if isinstance(item, str) else str(item.get("text", ""))
+            for item in content
+            if isinstance(item, (str, dict))
+        )
+    return str(content) if content is not None else ""
+
+
+def _last_human_index(messages: Sequence[BaseMessage]) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return 0
+
+
+def trim_tool_outputs(messages: Sequence[BaseMessage], max_chars: int) -> List[BaseMessage]:
+    """Trunca ToolMessages anteriores à última mensagem do usuário (as do turno atual ficam inteiras)."""
+    if max_chars <= 0:
+        return list(messages)
+    current_turn = _last_human_index(messages)
+    result: List[BaseMessage] = []
+    for i, msg in enumerate(messages):
+        if i < current_turn and isinstance(msg, ToolMessage):
+            texto = _text(msg.content)
+            if len(texto) > max_chars:
+                msg = msg.model_copy(
+                    update={
+                        "content": texto[:max_chars]
+                        + f"\n... [saída da ferramenta truncada: {len(texto)} caracteres]"
+                    }
+                )
+        result.append(msg)
+    return result
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Conta tokens de forma aproximada (sem chamar o tokenizer do provedor)."""
+    return count_tokens_approximately(messages) if messages else 0
+
+
+def select_window_start(
+    messages: Sequence[BaseMessage], current_start: int, settings: ContextWindowSettings
+) -> int:
+    """Escolhe o índice da primeira mensagem da janela.
+
+    Mantém current_start enquanto a janela couber em max_tokens. Quando estoura,
+    avança para a primeira mensagem do usuário a partir da qual a janela cabe em
+    max_tokens * target_ratio; o turno atual nunca sai da janela. O início sempre
+    cai em uma HumanMessage, para não separar tool_calls das ToolMessages.
+    """
+    current_start = max(0, min(current_start, len(messages)))
+    if not settings.enabled or not messages:
+        return current_start
+    trimmed = trim_tool_outputs(messages, settings.tool_output_max_chars)
+    if count_tokens(trimmed[current_start:]) <= settings.max_tokens:
+        return current_start
+    target = int(settings.max_tokens * settings.target_ratio)
+    last_human = _last_human_index(messages)
+    for i in range(current_start + 1, last_human + 1):
+        if isinstance(messages[i], HumanMessage) and count_tokens(trimmed[i:]) <= target:
+            return i
+    return max(current_start, last_human)
+
+
+def format_for_summary(messages: Sequence[BaseMessage], max_chars: int) -> str:
+    """Serializa mensagens em texto simples para o prompt de resumo."""
+    linhas = []
+    for msg in trim_tool_outputs(messages, max_chars):
+        if isinstance(msg, HumanMessage):
+            papel = "Cliente"
+        elif isinstance(msg, ToolMessage):
+            papel = f"Ferramenta {msg.name or ''}".strip()
+        elif isinstance(msg, AIMessage):
+            papel = "Assessor"
+        else:
+            continue
+        texto = _text(msg.content).strip()
+        if not texto and isinstance(msg, AIMessage) and msg.tool_calls:
+            texto = "(chamou " + ", ".join(tc["name"] for tc in msg.tool_calls) + ")"
+        if texto:
+            linhas.append(f"{papel}: {texto}")
+    return "\n".join(linhas)
+
+
+def summarize(model: Any, previous_summary: str, messages: Sequence[BaseMessage], max_chars: int) -> str:
+    """Incorpora as mensagens ao resumo existente com uma chamada ao modelo."""
+    novas = format_for_summary(messages, max_chars)
+    if not novas:
+        return previous_summary
+    prompt = SUMMARY_PROMPT.format(resumo=previous_summary or "(vazio)", mensagens=novas)
+    resp = model.invoke([HumanMessage(content=prompt)])
+    return _text(getattr(resp, "content", resp)).strip() or previous_summary
+
+
+def update_context(
+    state: dict, model: Optional[Any], settings: ContextWindowSettings
+) -> dict:
+    """Atualização de estado do nó de contexto: novo início da janela e resumo, se mudaram."""
+    messages = state.get("messages", [])
+    start = int(state.get("context_start") or 0)
+    new_start = select_window_start(messages, start, settings)
+    if new_start == start:
+        return {}
+    update: dict = {"context_start": new_start}
+    logger.info("[ContextWindow] Janela avançou de %d para %d (%d mensagens no estado)", start, new_start, len(messages))
+    if settings.summary_enabled and model is not None:
+        update["context_summary"] = summarize(
+            model,
+            state.get("context_summary") or "",
+            messages[start:new_start],
+            settings.tool_output_max_chars,
+        )
+    return update
+
+
+def build_prompt_messages(
+    system_prompt: str, state: dict, settings: ContextWindowSettings
+) -> List[AnyMessage]:
+    """Monta as mensagens enviadas ao agente: system (+ resumo) e a janela com tools antigas truncadas."""
+    messages = state.get("messages", [])
+    summary = state.get("context_summary") or ""
+    if not settings.enabled:
+        return [SystemMessage(content=system_prompt)] + list(messages)
+    start = max(0, min(int(state.get("context_start") or 0), len(messages)))
+    system = system_prompt
+    if summary:
+        system += "\n\nResumo da conversa anterior (mensagens mais antigas não estão mais no contexto):\n" + summary
+    window = trim_tool_outputs(messages[start:], settings.tool_output_max_chars)
+    return [SystemMessage(content=system)] + window
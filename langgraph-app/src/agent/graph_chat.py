@@ -1,6 +1,7 @@
 """Agente LangGraph com ferramentas (ReAct) — módulo usado pelo Studio para Chat.
 
-Estado: MessagesState (chave "messages") para o Studio ativar a interface de Chat.
+Estado: MessagesState (chave "messages") para o Studio ativar a interface de Chat,
+estendido com o resumo da janela de contexto (ContextState).
 Usa as tools do backend Flask para análise de carteira e recomendações.
 """
 
@@ -37,11 +38,15 @@ from agent.backend_tools import (
 from agent.config_tools import obter_regras_redirecionamento, REGRAS_REDIRECIONAMENTO_PADRAO, RESPOSTAS_PADRAO
 from agent.regulacoes_tools import consultar_regulacao
 from agent.compliance_tools import COMPLIANCE_TOOLS
+from agent.classifier_batch import batcher_from_env, classify_single
+from agent.model_registry import BoundModelRegistry
+from agent.context_window import ContextState, ContextWindowSettings, build_prompt_messages, update_context
 
 # Usar modelo configurável via .env ou padrão gpt-4o
 import os
 model_name = os.getenv('AI_MODEL', 'gpt-4o')
-model = ChatOpenAI(model=model_name, temperature=0.7)
+model_temperature = 0.7
+model = ChatOpenAI(model=model_name, temperature=model_temperature)
 
 # Todas as tools do backend + tool de regras de handoff + regulacoes
 tools = [
@@ -59,6 +64,23 @@ tools = [
 
 tool_node = ToolNode(tools)
 
+# Modelos com tools pré-vinculadas por (modelo, temperatura, tools habilitadas); reutilizados entre turnos
+bound_models = BoundModelRegistry(
+    tools,
+    lambda name, temperature: ChatOpenAI(model=name, temperature=temperature),
+    model_name,
+    model_temperature,
+    # Modelos que o cliente pode pedir em configurable.model_name (além de AI_MODEL)
+    allowed_models=os.getenv("AI_MODEL_ALLOWLIST", "").split(","),
+)
+bound_models.register_model(model_name, model_temperature, model)
+
+# Janela de contexto: orçamento de tokens, truncamento de tools antigas e resumo incremental
+context_settings = ContextWindowSettings.from_env()
+
+# Micro-batching opcional dos classificadores de roteamento (ROUTER_BATCH_ENABLED=true)
+_router_batcher = batcher_from_env(model)
+
 SYSTEM = (
     "Você é o AlphaAdvisor, assessor virtual de investimentos do Banco Inter. "
     "Você ajuda clientes a entender e otimizar suas carteiras de investimentos. "
@@ -107,9 +129,17 @@ def end_node(state: MessagesState) -> dict:
     return state
 
 
-def agent_node(state: MessagesState) -> dict:
-    messages = [SystemMessage(content=SYSTEM)] + state["messages"]
-    response = model.bind_tools(tools).invoke(messages)
+def context_node(state: ContextState) -> dict:
+    """
+    Nó de gerenciamento de contexto (antes de cada chamada do agent).
+    Avança o início da janela quando o orçamento de tokens estoura e resume o que saiu.
+    """
+    return update_context(state, model, context_settings)
+
+
+def agent_node(state: ContextState, config: Optional[RunnableConfig] = None) -> dict:
+    messages = build_prompt_messages(SYSTEM, state, context_settings)
+    response = bound_models.get_for_config(config).invoke(messages)
     return {"messages": [response]}
 
 
@@ -147,6 +177,16 @@ def _extract_text_plain(content: Any) -> str:
     return str(content or "").strip()
 
 
+def _classificar(instrucoes: str, texto_usuario: str) -> str:
+    """
+    Classificador de handoff: instrucoes traz o critério e as respostas válidas; o formato da
+    saída fica com classifier_batch (uma linha isolada, saída estruturada em lote).
+    """
+    if _router_batcher is not None:
+        return _router_batcher.classify(instrucoes, texto_usuario).strip()
+    return classify_single(model, instrucoes, texto_usuario)
+
+
 def _deve_redirecionar(messages: list, regras: list) -> Tuple[bool, Optional[str]]:
     """
     Usa o LLM para decidir se a última mensagem do usuário se enquadra em alguma
@@ -164,20 +204,15 @@ def _deve_redirecionar(messages: list, regras: list) -> Tuple[bool, Optional[str
     texto_usuario = _extract_text_plain(getattr(last_user, "content", None) or "")
     if not texto_usuario:
         return False, None
-    prompt = (
+    regras_str = "\n".join(f"- {r}" for r in regras)
+    instrucoes = (
         "Você é um classificador. Avalie se a mensagem do cliente se enquadra em ALGUMA das regras abaixo.\n\n"
-        "Mensagem do cliente:\n\"\"\"\n" + texto_usuario + "\n\"\"\"\n\n"
-        "Regras (redirecionar para humano quando se aplicar):\n"
-        + "\n".join(f"- {r}" for r in regras)
-        + "\n\n"
-        "Responda com UMA ÚNICA LINHA:\n"
-        "- Se a mensagem se enquadrar em alguma regra, repita EXATAMENTE o texto dessa regra (uma das listadas).\n"
-        "- Se não se enquadrar em nenhuma, responda apenas: NENHUMA\n"
-        "Não invente regras. Não explique. Só a regra exata ou NENHUMA."
+        "Regras (redirecionar para humano quando se aplicar):\n" + regras_str + "\n\n"
+        "Resposta: se a mensagem se enquadrar em alguma regra, o texto EXATO dessa regra (uma das listadas); "
+        "se não se enquadrar em nenhuma, NENHUMA. Não invente regras."
     )
     try:
-        resp = model.invoke([HumanMessage(content=prompt)])
-        out = (getattr(resp, "content", None) or str(resp)).strip()
+        out = _classificar(instrucoes, texto_usuario)
         if not out or out.upper() == "NENHUMA":
             return False, None
         for r in regras:
@@ -329,18 +364,15 @@ def _deve_handoff_por_respostas(state: MessagesState, respostas: dict) -> Tuple[
         "comparar_produtos": "comparação de produtos",
     }
     labels_str = ", ".join(topic_labels.get(t, t) for t in topicos_nao_permitidos)
-    prompt = (
+    instrucoes = (
         "Você é um classificador. A mensagem do cliente pede informação ou ação sobre algum destes tópicos?\n"
         f"Tópicos (não permitidos para o agente responder): {labels_str}\n\n"
-        f"Mensagem do cliente:\n\"\"\"\n{texto_usuario}\n\"\"\"\n\n"
-        "Responda com UMA ÚNICA LINHA:\n"
-        "- Se a mensagem pedir algo sobre um desses tópicos, responda apenas a CHAVE do tópico: falar_sobre_precos, falar_sobre_risco, recomendar_produtos, fornecer_projecoes ou comparar_produtos.\n"
-        "- Se não pedir sobre nenhum deles, responda apenas: NENHUM\n"
-        "Não invente. Só a chave exata ou NENHUM."
+        "Resposta: se a mensagem pedir algo sobre um desses tópicos, a CHAVE do tópico (falar_sobre_precos, "
+        "falar_sobre_risco, recomendar_produtos, fornecer_projecoes ou comparar_produtos); se não pedir sobre "
+        "nenhum deles, NENHUM. Não invente."
     )
     try:
-        resp = model.invoke([HumanMessage(content=prompt)])
-        out = (getattr(resp, "content", None) or str(resp)).strip().lower()
+        out = _classificar(instrucoes, texto_usuario).lower()
         if not out or out == "nenhum":
             return False, None
         for t in topicos_nao_permitidos:
@@ -908,13 +940,17 @@ def should_continue(state: MessagesState, config: Optional[RunnableConfig] = Non
     return "compliance_check"
 
 
+# Vincula a combinação padrão antes de compilar (o primeiro turno não paga o bind_tools)
+bound_models.warmup()
+
 graph = (
-    StateGraph(MessagesState)
+    StateGraph(ContextState)
     # Adicionar nós
     .add_node("init", init_node)
     .add_node("calculation", calculation_node)  # Nó de cálculo determinístico
     .add_node("check_feedback", check_feedback_node)  # NOVO: nó de decisão explícito (visível no grafo)
     .add_node("webhook", webhook_node)  # Nó de webhook visível no grafo
+    .add_node("context", context_node)  # Janela de contexto / resumo antes do agent
     .add_node("agent", agent_node)
     .add_node("tools", tool_node)
     .add_node("handoff", handoff_node)
@@ -929,7 +965,7 @@ graph = (
         {
             "calculate": "calculation",
             "handoff": "handoff",
-            "agent": "agent"
+            "agent": "context"
         }
     )
     # calculation → check_feedback (nó de decisão explícito)
@@ -953,7 +989,8 @@ graph = (
             "compliance_check": "compliance_check"
         }
     )
-    .add_edge("tools", "agent")
+    .add_edge("context", "agent")
+    .add_edge("tools", "context")
     .add_edge("compliance_check", "end")
     .add_edge("handoff", END)  # Handoff termina o fluxo
     .add_edge("end", END)
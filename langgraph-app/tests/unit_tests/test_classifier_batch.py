@@ -0,0 +1,132 @@
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from agent.classifier_batch import (
+    ClassifierBatcher,
+    VereditoMensagem,
+    VereditosLote,
+    build_batch_prompt,
+    build_single_prompt,
+    parse_batch_response,
+)
+
+REGRA = "Solicitação de cancelamento de conta"
+
+
+def _veredito(texto: str) -> str:
+    return REGRA if "cancelar" in texto.lower() else "NENHUMA"
+
+
+class FakeRouterModel(BaseChatModel):
+    """Modelo local: responde ao prompt em lote com JSON e ao prompt único com uma linha."""
+
+    calls: int = 0
+    lock: Any = None
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-router"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        with self.lock:
+            self.calls += 1
+        prompt = str(messages[-1].content)
+        blocos = re.findall(r'Mensagem (\d+):\n"""\n(.*?)\n"""', prompt, re.DOTALL)
+        if blocos:
+            content = json.dumps({n: _veredito(t) for n, t in blocos})
+        else:
+            content = _veredito(prompt)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def test_parse_batch_response_requires_every_index() -> None:
+    assert parse_batch_response('{"1": "NENHUMA", "2": "x"}', 2) == ["NENHUMA", "x"]
+    assert parse_batch_response('```json\n{"1": "a"}\n```', 1) == ["a"]
+    assert parse_batch_response('{"1": "a"}', 2) is None
+    assert parse_batch_response("NENHUMA", 1) is None
+
+
+def test_build_batch_prompt_numbers_messages() -> None:
+    prompt = build_batch_prompt("Instruções", ["a", "b"])
+    assert 'Mensagem 1:\n"""\na\n"""' in prompt
+    assert 'Mensagem 2:\n"""\nb\n"""' in prompt
+
+
+def test_concurrent_requests_share_one_call() -> None:
+    model = FakeRouterModel()
+    batcher = ClassifierBatcher(model, max_batch=4, max_wait_ms=200)
+    textos = ["quero cancelar minha conta", "qual meu saldo?", "vou cancelar tudo", "oi"]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda t: batcher.classify("regras", t), textos))
+    assert results == [REGRA, "NENHUMA", REGRA, "NENHUMA"]
+    assert model.calls == 1
+    assert batcher.stats["batches"] == 1
+
+
+def test_batches_are_split_by_instructions_and_max_size() -> None:
+    model = FakeRouterModel()
+    batcher = ClassifierBatcher(model, max_batch=2, max_wait_ms=100)
+    jobs = [("A", "cancelar"), ("A", "oi"), ("A", "cancelar já"), ("B", "oi")]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda j: batcher.classify(*j), jobs))
+    assert results == [REGRA, "NENHUMA", REGRA, "NENHUMA"]
+    assert batcher.stats["requests"] == 4
+    assert batcher.stats["batches"] >= 3
+
+
+def test_single_request_uses_plain_prompt() -> None:
+    model = FakeRouterModel()
+    batcher = ClassifierBatcher(model, max_batch=8, max_wait_ms=1)
+    assert batcher.classify("regras", "quero cancelar") == REGRA
+    assert model.calls == 1
+
+
+class FakeStructuredRouterModel(FakeRouterModel):
+    """Modelo com saída estruturada: o lote devolve VereditosLote em vez de texto."""
+
+    structured_prompts: List[str] = []
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Any:
+        assert schema is VereditosLote
+
+        def responder(messages: List[BaseMessage]) -> VereditosLote:
+            with self.lock:
+                self.calls += 1
+            prompt = str(messages[-1].content)
+            self.structured_prompts.append(prompt)
+            blocos = re.findall(r'Mensagem (\d+):\n"""\n(.*?)\n"""', prompt, re.DOTALL)
+            return VereditosLote(respostas=[
+                VereditoMensagem(mensagem=int(n), resposta=_veredito(t)) for n, t in reversed(blocos)
+            ])
+
+        return RunnableLambda(responder)
+
+
+def test_batch_uses_structured_output_when_available() -> None:
+    model = FakeStructuredRouterModel(structured_prompts=[])
+    batcher = ClassifierBatcher(model, max_batch=3, max_wait_ms=200)
+    textos = ["quero cancelar", "oi", "cancelar agora"]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = list(pool.map(lambda t: batcher.classify("regras", t), textos))
+    assert results == [REGRA, "NENHUMA", REGRA]
+    assert model.calls == 1 and batcher.stats["fallbacks"] == 0
+    # O prompt do lote não pede uma linha nem JSON no texto: o formato vem do schema
+    assert "UMA ÚNICA LINHA" not in model.structured_prompts[0] and "JSON" not in model.structured_prompts[0]
+
+
+def test_output_format_is_defined_per_path() -> None:
+    assert "UMA ÚNICA LINHA" in build_single_prompt("Critério", "oi")
+    assert "UMA ÚNICA LINHA" not in build_batch_prompt("Critério", ["a", "b"])
+    assert "JSON" in build_batch_prompt("Critério", ["a", "b"])
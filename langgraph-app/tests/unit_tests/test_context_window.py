@@ -0,0 +1,97 @@
+from typing import Any, List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agent.context_window import (
+    ContextWindowSettings,
+    build_prompt_messages,
+    select_window_start,
+    trim_tool_outputs,
+    update_context,
+)
+
+
+def _turno(i: int, tool_chars: int = 4000) -> List[BaseMessage]:
+    call_id = f"call_{i}"
+    return [
+        HumanMessage(content=f"pergunta {i}"),
+        AIMessage(content="", tool_calls=[{"name": "obter_carteira", "args": {}, "id": call_id}]),
+        ToolMessage(content="x" * tool_chars, tool_call_id=call_id, name="obter_carteira"),
+        AIMessage(content=f"resposta {i}"),
+    ]
+
+
+def _thread(turnos: int) -> List[BaseMessage]:
+    msgs: List[BaseMessage] = []
+    for i in range(turnos):
+        msgs += _turno(i)
+    return msgs + [HumanMessage(content="pergunta atual")]
+
+
+class FakeSummarizer:
+    def __init__(self) -> None:
+        self.prompts: List[str] = []
+
+    def invoke(self, messages: List[BaseMessage]) -> Any:
+        self.prompts.append(str(messages[-1].content))
+        return AIMessage(content=f"resumo {len(self.prompts)}")
+
+
+def test_trim_keeps_current_turn_tool_outputs() -> None:
+    msgs = _turno(0) + [HumanMessage(content="nova")] + _turno(1)[1:]
+    trimmed = trim_tool_outputs(msgs, 100)
+    assert "truncada" in trimmed[2].content
+    assert trimmed[2].tool_call_id == "call_0"
+    assert trimmed[-2].content == "x" * 4000
+
+
+def test_window_starts_on_human_message_and_fits_budget() -> None:
+    settings = ContextWindowSettings(max_tokens=1000, tool_output_max_chars=200)
+    msgs = _thread(20)
+    start = select_window_start(msgs, 0, settings)
+    assert start > 0
+    assert isinstance(msgs[start], HumanMessage)
+    # Enquanto a janela couber no orçamento, o início não se move
+    assert select_window_start(msgs + [AIMessage(content="ok")], start, settings) == start
+
+
+def test_update_context_summarizes_only_when_window_moves() -> None:
+    settings = ContextWindowSettings(max_tokens=1000, tool_output_max_chars=200)
+    model = FakeSummarizer()
+    state: dict = {"messages": _thread(20)}
+    update = update_context(state, model, settings)
+    assert update["context_summary"] == "resumo 1"
+    assert "pergunta 0" in model.prompts[0]
+    state.update(update)
+    assert update_context(state, model, settings) == {}
+    assert len(model.prompts) == 1
+
+
+def test_build_prompt_includes_summary_and_window() -> None:
+    settings = ContextWindowSettings(max_tokens=1000, tool_output_max_chars=200)
+    msgs = _thread(3)
+    state = {"messages": msgs, "context_summary": "cliente moderado", "context_start": 4}
+    prompt = build_prompt_messages("SYSTEM", state, settings)
+    assert isinstance(prompt[0], SystemMessage)
+    assert "cliente moderado" in prompt[0].content
+    assert prompt[1].content == "pergunta 1"
+    assert len(prompt) == 1 + len(msgs) - 4
+
+
+def test_disabled_settings_send_full_history() -> None:
+    settings = ContextWindowSettings(max_tokens=0)
+    msgs = _thread(2)
+    assert build_prompt_messages("S", {"messages": msgs}, settings)[1:] == msgs
+    assert update_context({"messages": msgs}, FakeSummarizer(), settings) == {}
+
+
+def test_backend_copy_is_identical() -> None:
+    """backend/app/services/context_window.py é cópia deste módulo (apps implantados separadamente)."""
+    from pathlib import Path
+
+    import agent.context_window
+
+    backend_copy = Path(__file__).resolve().parents[3] / "backend" / "app" / "services" / "context_window.py"
+    if not backend_copy.exists():
+        return
+    assert backend_copy.read_text(encoding="utf-8") == Path(agent.context_window.__file__).read_text(encoding="utf-8")
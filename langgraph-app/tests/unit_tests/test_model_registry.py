@@ -0,0 +1,111 @@
+from typing import Any, List
+
+from langchain_core.tools import tool
+
+from agent.model_registry import BoundModelRegistry
+
+
+@tool
+def ferramenta_a(x: str) -> str:
+    """Ferramenta A."""
+    return x
+
+
+@tool
+def ferramenta_b(x: str) -> str:
+    """Ferramenta B."""
+    return x
+
+
+class FakeModel:
+    """Conta quantas vezes bind_tools foi chamado e com quais tools."""
+
+    def __init__(self, name: str, temperature: float) -> None:
+        self.name = name
+        self.temperature = temperature
+        self.bind_calls: List[List[str]] = []
+
+    def bind_tools(self, tools: List[Any]) -> Any:
+        self.bind_calls.append([t.name for t in tools])
+        return ("bound", self.name, self.temperature, tuple(t.name for t in tools))
+
+
+def _registry() -> tuple[BoundModelRegistry, List[FakeModel]]:
+    criados: List[FakeModel] = []
+
+    def factory(name: str, temperature: float) -> FakeModel:
+        m = FakeModel(name, temperature)
+        criados.append(m)
+        return m
+
+    return BoundModelRegistry([ferramenta_a, ferramenta_b], factory, "gpt-4o", 0.7), criados
+
+
+def test_bind_tools_happens_once_per_key() -> None:
+    registry, criados = _registry()
+    first = registry.get_for_config({"configurable": {}})
+    second = registry.get_for_config(None)
+    assert first is second
+    assert len(criados) == 1
+    assert criados[0].bind_calls == [["ferramenta_a", "ferramenta_b"]]
+
+
+def test_tools_enabled_filters_and_keys_cache() -> None:
+    registry, criados = _registry()
+    only_a = registry.get_for_config({"configurable": {"tools_enabled": {"ferramenta_b": False}}})
+    assert only_a[3] == ("ferramenta_a",)
+    registry.get_for_config({"configurable": {"tools_enabled": {"ferramenta_a": True}}})
+    assert len(registry) == 2
+    # Mesmo modelo/temperatura: a instância é reaproveitada entre conjuntos de tools
+    assert len(criados) == 1
+
+
+def test_register_model_and_warmup() -> None:
+    registry, criados = _registry()
+    existente = FakeModel("gpt-4o", 0.7)
+    registry.register_model("gpt-4o", 0.7, existente)
+    assert registry.warmup([{}, {"temperature": 0.2}]) == 2
+    assert existente.bind_calls == [["ferramenta_a", "ferramenta_b"]]
+    assert [m.temperature for m in criados] == [0.2]
+    registry.clear()
+    assert len(registry) == 0
+
+
+def test_client_config_is_normalized_and_cache_is_bounded() -> None:
+    criados: List[FakeModel] = []
+
+    def factory(name: str, temperature: float) -> FakeModel:
+        criados.append(FakeModel(name, temperature))
+        return criados[-1]
+
+    registry = BoundModelRegistry([ferramenta_a], factory, "gpt-4o", 0.7,
+                                  allowed_models=["gpt-4o-mini", ""], max_entries=2)
+    # Valores inválidos usam a temperatura padrão em vez de levantar; demais são limitados a [0, 2]
+    for invalida in ("quente", float("nan"), float("inf"), [1]):
+        assert registry.key_for(temperature=invalida)[1] == 0.7
+    assert registry.key_for(temperature="5")[1] == 2.0
+    assert registry.key_for(temperature=-1)[1] == 0.0
+    assert registry.key_for(temperature=0.300001)[1] == 0.3
+    # Modelo fora da allowlist usa o padrão
+    assert registry.key_for(model_name="modelo-caro")[0] == "gpt-4o"
+    assert registry.key_for(model_name="gpt-4o-mini")[0] == "gpt-4o-mini"
+
+    for i in range(10):
+        registry.get_for_config({"configurable": {"temperature": i / 10}})
+    assert len(registry) == 2 and len(registry._models) == 2
+    # LRU: a entrada usada por último continua no cache
+    recente = registry.get(temperature=0.9)
+    registry.get(temperature=0.1)
+    assert registry.get(temperature=0.9) is recente
+
+
+def test_backend_copy_is_identical() -> None:
+    """backend/app/services/model_registry.py é cópia deste módulo (apps implantados separadamente)."""
+    from pathlib import Path
+
+    import agent.model_registry
+
+    backend_copy = Path(__file__).resolve().parents[3] / "backend" / "app" / "services" / "model_registry.py"
+    if not backend_copy.exists():
+        return
+    assert backend_copy.read_text(encoding="utf-8") == Path(agent.model_registry.__file__).read_text(encoding="utf-8")
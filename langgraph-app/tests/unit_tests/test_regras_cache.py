@@ -0,0 +1,124 @@
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from agent.config_tools import RegrasCache
+
+
+class FakeBackend:
+    """Fetch local: devolve regras numeradas pela chamada e pode falhar ou demorar."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.calls: List[Tuple[str, str]] = []
+        self.ok = True
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, user_id: str, base: str) -> Tuple[Dict[str, Any], bool]:
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((user_id, base))
+            n = len(self.calls)
+        if not self.ok:
+            return {"regras_redirecionamento": ["padrao"], "respostas": {}}, False
+        return {"regras_redirecionamento": [f"regra {n}"], "respostas": {}}, True
+
+
+def _wait_for(cond: Any, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_cache_hits_per_user_and_backend() -> None:
+    backend = FakeBackend()
+    cache = RegrasCache(backend, ttl=60)
+    first = cache.get("default", "http://a")
+    first["regras_redirecionamento"].append("mutado")
+    assert cache.get("default", "http://a") == {"regras_redirecionamento": ["regra 1"], "respostas": {}}
+    cache.get("outro", "http://a")
+    cache.get("default", "http://b")
+    assert backend.calls == [("default", "http://a"), ("outro", "http://a"), ("default", "http://b")]
+    assert cache.stats["hits"] == 1
+
+
+def test_stale_while_revalidate_refreshes_in_background() -> None:
+    backend = FakeBackend(delay=0.05)
+    cache = RegrasCache(backend, ttl=0.05, stale=10)
+    assert cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 1"]
+    time.sleep(0.06)
+    started = time.monotonic()
+    # Expirado: responde o valor antigo na hora e atualiza em segundo plano (uma vez só)
+    assert cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 1"]
+    assert cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 1"]
+    assert time.monotonic() - started < 0.04
+    _wait_for(lambda: cache.stats["refreshes"] == 1 and len(backend.calls) == 2)
+    _wait_for(lambda: cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 2"])
+    assert cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 2"]
+    assert len(backend.calls) == 2
+
+
+def test_failures_are_cached_and_keep_last_good_value() -> None:
+    backend = FakeBackend()
+    backend.ok = False
+    cache = RegrasCache(backend, ttl=0.05, stale=10, negative_ttl=0.1)
+    for _ in range(5):
+        assert cache.get("default", "http://a")["regras_redirecionamento"] == ["padrao"]
+    assert len(backend.calls) == 1 and cache.stats["negative_hits"] == 4
+    time.sleep(0.11)
+    backend.ok = True
+    assert cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 2"]
+    # Backend cai depois de um sucesso: segue servindo o último valor bom
+    backend.ok = False
+    time.sleep(0.06)
+    cache.get("default", "http://a")
+    _wait_for(lambda: len(backend.calls) == 3)
+    assert cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 2"]
+
+
+def test_concurrent_misses_share_one_request() -> None:
+    backend = FakeBackend(delay=0.05)
+    cache = RegrasCache(backend, ttl=60)
+    results: List[Dict[str, Any]] = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("default", "http://a"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(backend.calls) == 1
+    assert all(r["regras_redirecionamento"] == ["regra 1"] for r in results)
+
+
+def test_invalidate() -> None:
+    backend = FakeBackend()
+    cache = RegrasCache(backend, ttl=60)
+    cache.get("default", "http://a")
+    cache.get("outro", "http://a")
+    cache.get("default", "http://b")
+    assert cache.invalidate(user_id="outro") == 1
+    assert cache.invalidate(backend_url="http://b/") == 1
+    assert cache.invalidate() == 1
+    assert cache.get("default", "http://a")["regras_redirecionamento"] == ["regra 4"]
+
+
+
+def test_cache_is_bounded_and_drops_key_locks() -> None:
+    backend = FakeBackend()
+    cache = RegrasCache(backend, ttl=60, max_entries=3)
+    for i in range(10):
+        cache.get(f"user-{i}", "http://a")
+    cache.get("user-7", "http://a")  # mais usada: sobrevive à próxima remoção
+    cache.get("novo", "http://a")
+    assert list(cache._entries) == [("user-9", "http://a"), ("user-7", "http://a"), ("novo", "http://a")]
+    assert set(cache._key_locks) <= set(cache._entries)
+    assert cache.invalidate() == 3
+    assert cache._key_locks == {}
+    assert len(backend.calls) == 11
+
+
+def test_ttl_zero_disables_cache() -> None:
+    backend = FakeBackend()
+    cache = RegrasCache(backend, ttl=0)
+    cache.get("default", "http://a")
+    cache.get("default", "http://a")
+    assert len(backend.calls) == 2